@@ -1,270 +1,572 @@
-import requests
-from bs4 import BeautifulSoup
-import re
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from urllib.parse import urlparse
-import json
+from fetch_engine import AsyncFetchEngine
+from http_client import HttpClient, MAX_BODY_BYTES
+from politeness import PoliteScheduler
+from response_cache import ResponseCache, CACHE_FILE
+from page_features import FEATURE_GROUPS, extract_features, resolve_backend
+from keyword_matcher import get_matcher, MATCH_MODES
+from fingerprint import content_fingerprint, keyword_signature
+from feature_store import FeatureStore, FEATURES_FILE
+from renderer import RENDER_NEEDS, RenderError, looks_client_rendered
+from rules import DEFAULT_RULES
+from metrics import PHASE_FIELDS, BYTES_FIELD, NETWORK_PHASES
+
+# Bump whenever analyze_html() starts producing different results for the same page,
+# so incremental audits re-analyze everything once instead of reusing stale results
+ANALYSIS_VERSION = 1
+
+# Per-URL timings (ms) and bytes transferred, see metrics.PHASE_FIELDS
+TIMING_FIELDS = tuple(PHASE_FIELDS.values()) + (BYTES_FIELD,)
+
+# Result fields that describe the fetch rather than the page (not part of a stored analysis)
+FETCH_FIELDS = ('Status_Code', 'Fetch_Source', 'Retries', 'Content_Fingerprint', 'Analysis') + TIMING_FIELDS
+
+# --- Layered Schema Classification ---
+# Layer 1: Page-Defining Schema (Primary Intent)
+PAGE_DEFINING = frozenset({
+    'Article', 'BlogPosting', 'NewsArticle', 'TechArticle',
+    'Product', 'LocalBusiness', 'Service', 'Restaurant',
+    'FAQPage', 'QAPage', 'Event', 'JobPosting', 'Recipe', 'Review',
+    'WebPage', 'MedicalWebPage', 'Course'
+})
+# Layer 2: Entity Schema (Supporting - Report Separately)
+ENTITY_SCHEMAS = frozenset({'Person', 'Organization'})
+# Layer 3: Helper / Structural / Ignored (Do not report as primary)
+# WebSite is site-level context, not page intent.
+IGNORED_SCHEMAS = frozenset({
+    'PostalAddress', 'GeoCoordinates', 'ContactPoint', 'ImageObject',
+    'SearchAction', 'EntryPoint', 'ReadAction', 'AuthorizeAction',
+    'Thing', 'Place', 'ListItem', 'BreadcrumbList', 'WebSite',
+    'Offer', 'AggregateRating', 'Rating', 'OpeningHoursSpecification',
+    'ItemList', 'CollectionPage', 'ProfilePage'
+})
+
+# Report fields that come from each feature group: "N/A" when the rule profile didn't need it
+GROUP_FIELDS = {
+    'headings': ('H1', 'H1_Count'),
+    'text': ('Word_Count',),
+    'links': ('Internal_Links',),
+    'images': ('Images', 'Missing_Alt_Count', 'Missing_Alt_Files'),
+    'schema': ('Schema_Types', 'Schema_Present'),
+}
+
+
+def analyze_html(url, body, primary_keyword, secondary_keywords, parser='auto', keyword_mode='substring', rules=None):
+    """
+    Analysis stage: runs the on-page checks over an already downloaded document (bytes or str).
+    Pure function (no network, no shared state), so it can run in a worker process.
+    secondary_keywords: list of strings
+    rules: rules.RuleSet to check with (default: the full profile)
+    """
+    return analyze_page(url, body, primary_keyword, secondary_keywords, parser, keyword_mode, rules)[0]
+
+
+def analyze_page(url, body, primary_keyword, secondary_keywords, parser='auto', keyword_mode='substring', rules=None):
+    """
+    Same as analyze_html(), but returns (results, page): `page` is the extract_page() record
+    the results were scored from, for the feature store.
+    """
+    rules = rules or DEFAULT_RULES
+    page = extract_page(url, body, parser, rules.needs)
+    return score_page(url, page, primary_keyword, secondary_keywords, keyword_mode, rules), page
+
+
+def analyze_page_timed(url, body, primary_keyword, secondary_keywords, parser='auto', keyword_mode='substring', rules=None):
+    """analyze_page(), with the time spent parsing and scoring added to the results (Parse_ms / Analyze_ms)."""
+    rules = rules or DEFAULT_RULES
+    started = time.perf_counter()
+    page = extract_page(url, body, parser, rules.needs)
+    parsed = time.perf_counter()
+    results = score_page(url, page, primary_keyword, secondary_keywords, keyword_mode, rules)
+    results[PHASE_FIELDS['parse']] = round((parsed - started) * 1000, 1)
+    results[PHASE_FIELDS['analyze']] = round((time.perf_counter() - parsed) * 1000, 1)
+    return results, page
+
+
+def timing_results(timings):
+    """HttpClient timings (seconds, see HttpClient.get) -> result fields (ms, plus Bytes_Transferred)."""
+    if not timings:
+        return {}
+    results = {PHASE_FIELDS[phase]: round(timings[phase] * 1000, 1) for phase in NETWORK_PHASES + ('fetch',)}
+    results[BYTES_FIELD] = timings['wire_bytes']
+    return results
+
+
+def extract_page(url, body, parser='auto', needs=None):
+    """
+    Parse stage: everything about a page that doesn't depend on keywords.
+    Returns a JSON-serializable record: 'results' (the keyword-independent report fields)
+    plus the lowercased text regions keyword checks run over (h2, h3, first_100, content)
+    and the script payload (script_bytes, script_srcs) used to spot client-rendered pages.
+    needs: feature groups to extract (None = all, see page_features.FEATURE_GROUPS); fields
+    of the others are "N/A", and 'groups' records which ones the page has.
+    """
+    results = {}
+    features = extract_features(body, backend=parser, needs=needs)
+    
+    # --- basic Meta ---
+    results['Title'] = features.title
+    results['Title_Length'] = len(results['Title'])
+    
+    results['Meta_Description'] = features.meta_description
+    results['Meta_Desc_Length'] = len(results['Meta_Description'])
+    
+    results['Canonical_URL'] = features.canonical_url
+    results['Canonical_Type'] = "Self" if results['Canonical_URL'] == url else ("Missing" if not results['Canonical_URL'] else "Canonicalized")
+    
+    results['Meta_Robots'] = features.meta_robots
+    
+    # --- Headers ---
+    results['H1'] = features.h1_texts[0] if features.h1_texts else ""
+    results['H1_Count'] = len(features.h1_texts)
+    
+    h2_texts = features.h2_texts
+    h3_texts = features.h3_texts
+    
+    # --- Content ---
+    words = features.words
+    results['Word_Count'] = len(words)
+    
+    # Internal Links
+    domain = urlparse(url).netloc
+    results['Internal_Links'] = sum(1 for href in features.link_hrefs if href.startswith('/') or domain in href)
+    
+    # Images
+    missing_alt = features.missing_alt_files
+    results['Images'] = features.image_count
+    results['Missing_Alt_Count'] = len(missing_alt)
+    results['Missing_Alt_Files'] = ", ".join(missing_alt) if missing_alt else "None"
+    
+    # --- SCHEMA (microdata, falling back to @type declarations anywhere in the page) ---
+    # Classified with the PAGE_DEFINING / ENTITY_SCHEMAS layers above
+    schemas = features.schema_types
+    
+    primary_schemas = []
+    entity_schemas = []
+    
+    for s in schemas:
+        if not s: continue
+    
+        if s in PAGE_DEFINING:
+            primary_schemas.append(s)
+        elif s in ENTITY_SCHEMAS:
+            entity_schemas.append(s)
+        # else: assumes it's either in IGNORED or some unknown helper we don't care about
+    
+    # Deduplicate and Sort
+    unique_primary = sorted(list(set(primary_schemas)))
+    unique_entities = sorted(list(set(entity_schemas)))
+    
+    results['Schema_Types'] = ", ".join(unique_primary) if unique_primary else "None"
+    results['Schema_Present'] = "Yes" if unique_primary else "No"
+    
+    # Add Entity info to a new field (optional display support)
+    if unique_entities:
+        results['Entity_Schema_Present'] = ", ".join(unique_entities)
+
+    for group, fields in GROUP_FIELDS.items():
+        if group not in features.groups:
+            results.update(dict.fromkeys(fields, "N/A"))
+    
+    return {
+        'version': ANALYSIS_VERSION,
+        'groups': sorted(features.groups),
+        'results': results,
+        'h2': " ".join(h2_texts).lower(),
+        'h3': " ".join(h3_texts).lower(),
+        'first_100': " ".join(words[:100]).lower(),
+        'content': features.text_content.lower(),
+        'script_bytes': features.script_bytes,
+        'script_srcs': features.script_srcs,
+    }
+
+
+def score_page(url, page, primary_keyword, secondary_keywords, keyword_mode='substring', rules=None):
+    """
+    Keyword stage: keyword checks and the issues list (rules: rules.RuleSet, default the full
+    profile), computed from an extract_page() record alone (no HTML needed), so stored pages
+    can be re-scored against new keywords.
+    """
+    results = dict(page['results'])
+    # Records stored before feature groups existed were always extracted in full
+    groups = page.get('groups', FEATURE_GROUPS)
+    
+    # --- KEYWORD ANALYSIS ---
+    results['Primary_Keyword'] = primary_keyword
+    pk_lower = primary_keyword.lower() if primary_keyword else ""
+    sk_lowers = [sk.strip().lower() for sk in secondary_keywords]
+    
+    # One compiled matcher for all keywords, one scan per (extracted) region
+    matcher = get_matcher([pk_lower] + sk_lowers, keyword_mode)
+    regions = {
+        'title': results['Title'].lower(),
+        'meta_description': results['Meta_Description'].lower(),
+        'url': url.lower(),
+    }
+    if 'headings' in groups:
+        regions.update(h1=results['H1'].lower(), h2=page['h2'], h3=page['h3'])
+    if 'text' in groups:
+        regions.update(first_100=page['first_100'], content=page['content'])
+    hits = matcher.scan(regions)
+    
+    def primary_in(region):
+        if region not in hits:
+            return "N/A"
+        return "Yes" if hits[region][pk_lower] else "No"
+    
+    if pk_lower:
+        results['Primary_in_Title'] = primary_in('title')
+        results['Primary_in_H1'] = primary_in('h1')
+        results['Primary_in_URL'] = primary_in('url')
+        results['Primary_in_Content'] = primary_in('content')
+        results['Primary_in_First_100'] = primary_in('first_100')
+        results['Primary_in_Meta_Desc'] = primary_in('meta_description')
+    else:
+        # Fill with N/A if no keyword provided
+        for k in ['Primary_in_Title', 'Primary_in_H1', 'Primary_in_URL', 'Primary_in_Content', 'Primary_in_First_100', 'Primary_in_Meta_Desc']:
+            results[k] = "N/A"
+    
+    # Secondary Analysis
+    results['Secondary_Keywords'] = ", ".join(secondary_keywords)
+    sec_in_h2 = []
+    sec_in_h3 = []
+    sec_in_content = []
+    
+    for sk, sk_lower in zip(secondary_keywords, sk_lowers):
+        if not sk_lower: continue
+    
+        if 'h2' in hits and hits['h2'][sk_lower]:
+            sec_in_h2.append(sk)
+        if 'h3' in hits and hits['h3'][sk_lower]:
+            sec_in_h3.append(sk)
+        # Count occurrences in content
+        count = hits['content'][sk_lower] if 'content' in hits else 0
+        if count > 0:
+            sec_in_content.append(f"{sk} ({count})")
+    
+    results['Secondary_in_H2'] = ", ".join(sec_in_h2) if sec_in_h2 else "None"
+    results['Secondary_in_H3'] = ", ".join(sec_in_h3) if sec_in_h3 else "None"
+    results['Secondary_in_Content_List'] = ", ".join(sec_in_content) if sec_in_content else "None"
+    if 'headings' not in groups:
+        results['Secondary_in_H2'] = results['Secondary_in_H3'] = "N/A"
+    if 'text' not in groups:
+        results['Secondary_in_Content_List'] = "N/A"
+    
+    # --- Issues / Missing Report (see rules.RULES) ---
+    issues = (rules or DEFAULT_RULES).issues(results)
+    
+    results['Issues_List'] = issues
+    results['Has_Critical_Issues'] = True if issues else False
+    
+    return results
+
+
+def _worker_context():
+    # Worker processes start while fetch threads are running; forking a threaded process
+    # can deadlock the child, so start them from a clean server process instead
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
 
 class SEOAnalyzer:
-    def __init__(self):
+    def __init__(self, pool_connections=32, pool_maxsize=8, http2=False, cache_path=CACHE_FILE, cache_ttl=3600, parser='auto', keyword_mode='substring',
+                 features_path=FEATURES_FILE, scheduler=None, max_body_bytes=MAX_BODY_BYTES, renderer=None, rules=None):
         # Use a very common, modern User-Agent to avoid being blocked
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5'
         }
+        # On-disk response cache (set cache_path=None to disable)
+        self.cache = ResponseCache(cache_path, ttl=cache_ttl) if cache_path else None
+        # Per-host pacing, robots.txt crawl-delay and retries for everything that hits the network
+        self.scheduler = scheduler or PoliteScheduler()
+        # Shared keep-alive connection pool (reused for every URL this analyzer fetches);
+        # bodies are streamed and abandoned past max_body_bytes or when they aren't HTML
+        self.client = HttpClient(self.headers, pool_connections=pool_connections, pool_maxsize=pool_maxsize, http2=http2, cache=self.cache, scheduler=self.scheduler,
+                                 max_bytes=max_body_bytes)
+        # Extracted features of every analyzed page, for re-scoring without refetching (None to disable)
+        self.features = FeatureStore(features_path) if features_path else None
+        # Optional renderer.BrowserPool: pages whose static HTML looks client-rendered are
+        # rendered in a headless browser and the DOM is analyzed instead
+        self.renderer = renderer
+        # HTML parser backend: 'auto' (fastest installed), 'lxml', 'selectolax' or 'html.parser'
+        resolve_backend(parser)  # fail fast on a typo / missing package
+        self.parser = parser
+        # Keyword matching: 'substring' (default), 'word' or 'stem' (see keyword_matcher)
+        if keyword_mode not in MATCH_MODES:
+            raise ValueError(f"Unknown keyword match mode: {keyword_mode}")
+        self.keyword_mode = keyword_mode
+        # Checks to run (rules.RuleSet) for URLs without a profile of their own; only the page
+        # features they need are extracted
+        self.rules = rules or DEFAULT_RULES
+
+    def _rules(self, rules=None):
+        """The RuleSet to analyze with: the URL's own or the default, plus what rendering needs"""
+        rules = rules or self.rules
+        return rules.requiring(RENDER_NEEDS) if self.renderer is not None else rules
 
-    def analyze_url(self, url, primary_keyword, secondary_keywords):
+    def analyze_url(self, url, primary_keyword, secondary_keywords, previous=None, rules=None):
         """
         Analyzes a single URL for all SEO metrics.
         secondary_keywords: list of strings
+        previous: optional (fingerprint, analysis_key, analysis) of the last audit; if the page
+        and keywords are unchanged that analysis is reused instead of parsing the page again.
+        rules: optional rules.RuleSet for this URL (default: the analyzer's)
         """
-        results = {}
+        results, body = self.fetch_page(url)
+        if body is None or self._reuse(results, primary_keyword, secondary_keywords, previous, rules):
+            return results
+        results['Analysis'] = "Analyzed"
+        rules = self._rules(rules)
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
-            results['Status_Code'] = response.status_code
-            
-            if response.status_code != 200:
-                return self._get_error_result(url, response.status_code)
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # --- basic Meta ---
-            results['Title'] = soup.title.string.strip() if soup.title else ""
-            results['Title_Length'] = len(results['Title'])
-            
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            results['Meta_Description'] = meta_desc['content'].strip() if meta_desc and meta_desc.get('content') else ""
-            results['Meta_Desc_Length'] = len(results['Meta_Description'])
-            
-            canonical = soup.find('link', attrs={'rel': 'canonical'})
-            results['Canonical_URL'] = canonical['href'] if canonical else ""
-            results['Canonical_Type'] = "Self" if results['Canonical_URL'] == url else ("Missing" if not results['Canonical_URL'] else "Canonicalized")
-            
-            meta_robots = soup.find('meta', attrs={'name': 'robots'})
-            results['Meta_Robots'] = meta_robots['content'] if meta_robots else "index, follow" 
-            
-            # --- Headers ---
-            h1_tags = soup.find_all('h1')
-            results['H1'] = h1_tags[0].get_text(strip=True) if h1_tags else ""
-            results['H1_Count'] = len(h1_tags)
-            
-            h2_tags = soup.find_all('h2')
-            h2_texts = [h.get_text(strip=True) for h in h2_tags]
-            
-            h3_tags = soup.find_all('h3')
-            h3_texts = [h.get_text(strip=True) for h in h3_tags]
-
-            # --- Content ---
-            for script in soup(["script", "style"]):
-                script.decompose()
-            text_content = soup.get_text(separator=' ')
-            words = [w for w in text_content.split() if w.strip()]
-            results['Word_Count'] = len(words)
-            
-            first_100_words = " ".join(words[:100]).lower()
-            
-            # Internal Links
-            domain = urlparse(url).netloc
-            links = soup.find_all('a', href=True)
-            internal_links_count = 0
-            for link in links:
-                href = link['href']
-                if href.startswith('/') or domain in href:
-                    internal_links_count += 1
-            results['Internal_Links'] = internal_links_count
-            
-            # Images
-            images = soup.find_all('img')
-            results['Images'] = len(images)
-            missing_alt = []
-            for img in images:
-                if not img.get('alt'):
-                    src = img.get('src', 'unknown_src')
-                    missing_alt.append(src.split('/')[-1])
-            
-            results['Missing_Alt_Count'] = len(missing_alt)
-            results['Missing_Alt_Files'] = ", ".join(missing_alt) if missing_alt else "None"
-
-            # --- SCHEMA (Robust) ---
-            schemas = []
-            
-            def extract_types(obj):
-                if isinstance(obj, dict):
-                    if '@type' in obj:
-                        t = obj['@type']
-                        if isinstance(t, list): schemas.extend(t)
-                        else: schemas.append(t)
-                    for k, v in obj.items(): extract_types(v)
-                elif isinstance(obj, list):
-                    for item in obj: extract_types(item)
-
-            # 1. Parse JSON-LD
-            json_ld_scripts = soup.find_all('script', type='application/ld+json')
-            for script in json_ld_scripts:
-                try:
-                    if script.string:
-                        data = json.loads(script.string)
-                        extract_types(data)
-                except: pass
-            
-            # 2. Parse Microdata
-            for item in soup.find_all(attrs={"itemtype": True}):
-                try: schemas.append(item['itemtype'].split('/')[-1])
-                except: pass
-                
-            # 3. Fallback: Regex Search for Schema.org types if none found
-            if not schemas:
-                schema_matches = re.findall(r'"@type":\s*"([^"]+)"', response.text)
-                if schema_matches:
-                    schemas.extend(schema_matches)
-
-            # --- Layered Schema Classification ---
-            
-            # Layer 1: Page-Defining Schema (Primary Intent)
-            PAGE_DEFINING = {
-                'Article', 'BlogPosting', 'NewsArticle', 'TechArticle',
-                'Product', 'LocalBusiness', 'Service', 'Restaurant', 
-                'FAQPage', 'QAPage', 'Event', 'JobPosting', 'Recipe', 'Review',
-                'WebPage', 'MedicalWebPage', 'Course'
-            }
-
-            # Layer 2: Entity Schema (Supporting - Report Separately)
-            ENTITY_SCHEMAS = {'Person', 'Organization'}
-
-            # Layer 3: Helper / Structural / Ignored (Do not report as primary)
-            # WebSite is site-level context, not page intent.
-            IGNORED_SCHEMAS = {
-                'PostalAddress', 'GeoCoordinates', 'ContactPoint', 'ImageObject', 
-                'SearchAction', 'EntryPoint', 'ReadAction', 'AuthorizeAction',
-                'Thing', 'Place', 'ListItem', 'BreadcrumbList', 'WebSite',
-                'Offer', 'AggregateRating', 'Rating', 'OpeningHoursSpecification',
-                'ItemList', 'CollectionPage', 'ProfilePage' 
-            }
-
-            primary_schemas = []
-            entity_schemas = []
-
-            for s in schemas:
-                if not s: continue
-                
-                if s in PAGE_DEFINING:
-                    primary_schemas.append(s)
-                elif s in ENTITY_SCHEMAS:
-                    entity_schemas.append(s)
-                # else: assumes it's either in IGNORED or some unknown helper we don't care about
-
-            # Deduplicate and Sort
-            unique_primary = sorted(list(set(primary_schemas)))
-            unique_entities = sorted(list(set(entity_schemas)))
-
-            results['Schema_Types'] = ", ".join(unique_primary) if unique_primary else "None"
-            results['Schema_Present'] = "Yes" if unique_primary else "No"
-            
-            # Add Entity info to a new field (optional display support)
-            if unique_entities:
-                results['Entity_Schema_Present'] = ", ".join(unique_entities)
-
-            # --- KEYWORD ANALYSIS ---
-            results['Primary_Keyword'] = primary_keyword
-            pk_lower = primary_keyword.lower() if primary_keyword else ""
-            
-            if pk_lower:
-                results['Primary_in_Title'] = "Yes" if pk_lower in results['Title'].lower() else "No"
-                results['Primary_in_H1'] = "Yes" if pk_lower in results['H1'].lower() else "No"
-                results['Primary_in_URL'] = "Yes" if pk_lower in url.lower() else "No"
-                results['Primary_in_Content'] = "Yes" if pk_lower in text_content.lower() else "No"
-                results['Primary_in_First_100'] = "Yes" if pk_lower in first_100_words else "No"
-                results['Primary_in_Meta_Desc'] = "Yes" if pk_lower in results['Meta_Description'].lower() else "No"
-            else:
-                # Fill with N/A if no keyword provided
-                for k in ['Primary_in_Title', 'Primary_in_H1', 'Primary_in_URL', 'Primary_in_Content', 'Primary_in_First_100', 'Primary_in_Meta_Desc']:
-                    results[k] = "N/A"
-
-            # Secondary Analysis
-            results['Secondary_Keywords'] = ", ".join(secondary_keywords)
-            sec_in_h2 = []
-            sec_in_h3 = []
-            sec_in_content = []
-            
-            h2_full_text = " ".join(h2_texts).lower()
-            h3_full_text = " ".join(h3_texts).lower()
-            content_lower = text_content.lower()
-            
-            for sk in secondary_keywords:
-                sk_lower = sk.strip().lower()
-                if not sk_lower: continue
-                
-                if sk_lower in h2_full_text:
-                    sec_in_h2.append(sk)
-                if sk_lower in h3_full_text:
-                    sec_in_h3.append(sk)
-                # Count occurrences in content
-                count = content_lower.count(sk_lower)
-                if count > 0:
-                    sec_in_content.append(f"{sk} ({count})")
-            
-            results['Secondary_in_H2'] = ", ".join(sec_in_h2) if sec_in_h2 else "None"
-            results['Secondary_in_H3'] = ", ".join(sec_in_h3) if sec_in_h3 else "None"
-            results['Secondary_in_Content_List'] = ", ".join(sec_in_content) if sec_in_content else "None"
-
-            # --- Issues / Missing Report ---
-            issues = []
-            
-            # 1. Meta / Basic
-            if not results['Title']:
-                issues.append("Missing Page Title")
-            elif len(results['Title']) < 30:
-                issues.append(f"Title too short ({len(results['Title'])} chars)")
-            elif len(results['Title']) > 60:
-                issues.append(f"Title too long ({len(results['Title'])} chars)")
-                
-            if not results['Meta_Description']:
-                issues.append("Missing Meta Description")
-            elif len(results['Meta_Description']) < 50:
-                 issues.append(f"Meta Description too short ({len(results['Meta_Description'])} chars)")
-            elif len(results['Meta_Description']) > 160:
-                 issues.append(f"Meta Description too long ({len(results['Meta_Description'])} chars)")
-                 
-            if not results['Canonical_URL']:
-                issues.append("Missing Canonical URL")
-            elif results['Canonical_Type'] == "Canonicalized":
-                issues.append(f"Page is canonicalized to: {results['Canonical_URL']}")
-
-            # 2. Content
-            if not results['H1']:
-                issues.append("Missing H1 Tag")
-            elif results['H1_Count'] > 1:
-                issues.append(f"Multiple H1 Tags found ({results['H1_Count']})")
-                
-            if results['Word_Count'] < 300:
-                issues.append(f"Thin Content (Only {results['Word_Count']} words)")
-                
-            if results['Missing_Alt_Count'] > 0:
-                issues.append(f"Missing Alt Text on {results['Missing_Alt_Count']} images")
-
-            # 3. Schema
-            if results['Schema_Present'] == "No":
-                issues.append("No Schema Markup detected")
-
-            # 4. Keyword Checks
-            if pk_lower:
-                if results['Primary_in_Title'] == "No":
-                    issues.append("Primary Keyword missing from Title")
-                if results['Primary_in_H1'] == "No":
-                    issues.append("Primary Keyword missing from H1")
-                if results['Primary_in_First_100'] == "No":
-                   issues.append("Primary Keyword missing from First 100 Words")
-                if results['Primary_in_Meta_Desc'] == "No":
-                   issues.append("Primary Keyword missing from Meta Description")
-
-            results['Issues_List'] = issues
-            results['Has_Critical_Issues'] = True if issues else False
+            analysis, page = analyze_page_timed(url, body, primary_keyword, secondary_keywords, self.parser, self.keyword_mode, rules)
+            if self._should_render(analysis, page):
+                analysis, page = self._render_page(url, primary_keyword, secondary_keywords, (analysis, page), analyze_page_timed, rules)
+        except Exception as e:
+            error = self._get_error_result(url, f"Error: {str(e)}")
+            error.update({k: v for k, v in results.items() if k in TIMING_FIELDS})
+            return error
+        results.update(analysis)
+        self._store_page(url, results, page)
+        return results
 
+    def fetch_page(self, url):
+        """
+        Fetch stage (I/O only). Returns (results, body): results holds Status_Code, Fetch_Source,
+        Retries, Content_Fingerprint and the fetch timings, body is the raw page bytes. On
+        errors / non-200 responses body is None and results is the finished error result.
+        """
+        try:
+            response = self.client.get(url, timeout=15)
         except Exception as e:
-            return self._get_error_result(url, f"Error: {str(e)}")
-            
+            results = self._get_error_result(url, f"Error: {str(e)}")
+            results['Retries'] = getattr(e, 'retries', 0)
+            results.update(timing_results(getattr(e, 'timings', None)))
+            return results, None
+        if response.status_code != 200:
+            results = self._get_error_result(url, response.status_code)
+            results['Retries'] = response.retries
+            results.update(timing_results(response.timings))
+            return results, None
+        results = {
+            'Status_Code': response.status_code,
+            'Fetch_Source': response.fetch_source,
+            'Retries': response.retries,
+            'Content_Fingerprint': content_fingerprint(response.content),
+        }
+        results.update(timing_results(response.timings))
+        return results, response.content
+
+    def analysis_key(self, primary_keyword, secondary_keywords, rules=None):
+        """
+        Identifies what a page was analyzed against: keywords, match mode, analyzer version
+        (and rendering, and the rule profile unless it's the default one).
+        """
+        settings = (self.keyword_mode, ANALYSIS_VERSION) + (('render',) if self.renderer is not None else ())
+        rules = rules or self.rules
+        if rules.signature != DEFAULT_RULES.signature:
+            settings += (rules.signature,)
+        return keyword_signature(primary_keyword, secondary_keywords, *settings)
+
+    def _reuse(self, results, primary_keyword, secondary_keywords, previous, rules=None):
+        """Fills `results` from the previous analysis if the page, keywords and rules are unchanged."""
+        if not previous:
+            return False
+        fingerprint, key, analysis = previous
+        if fingerprint != results['Content_Fingerprint'] or key != self.analysis_key(primary_keyword, secondary_keywords, rules):
+            return False
+        if analysis.get('Rendered') == "Failed":
+            return False  # give the browser another try
+        results['Analysis'] = "Reused"
+        results.update(analysis)
+        return True
+
+    def _should_render(self, analysis, page):
+        return self.renderer is not None and 'Rendered' not in analysis and looks_client_rendered(page)
+
+    def _render_page(self, url, primary_keyword, secondary_keywords, static, analyze, rules):
+        """
+        Renders `url` in the browser pool and runs the same analysis over the rendered DOM
+        (`analyze` has analyze_page's signature; rules: the RuleSet the static page was
+        analyzed with), so scores compare with static pages.
+        If rendering fails the static analysis is kept, marked Rendered: Failed.
+        """
+        started = time.perf_counter()
+        try:
+            html = self.renderer.render(url)
+        except RenderError:
+            analysis, page = static
+            analysis['Rendered'] = "Failed"
+            analysis[PHASE_FIELDS['render']] = round((time.perf_counter() - started) * 1000, 1)
+            return analysis, page
+        render_ms = round((time.perf_counter() - started) * 1000, 1)
+        analysis, page = analyze(url, html, primary_keyword, secondary_keywords, self.parser, self.keyword_mode, rules)
+        # Kept in the stored page too, so re-scored results still show it
+        analysis['Rendered'] = page['results']['Rendered'] = "Yes"
+        analysis[PHASE_FIELDS['render']] = render_ms
+        # The static page was parsed and scored as well
+        for phase in ('parse', 'analyze'):
+            field = PHASE_FIELDS[phase]
+            analysis[field] = round(analysis.get(field, 0) + static[0].get(field, 0), 1)
+        return analysis, page
+
+    def _store_page(self, url, results, page):
+        if self.features is not None:
+            self.features.put(url, results['Content_Fingerprint'], page)
+
+    def rescore(self, url, primary_keyword, secondary_keywords, rules=None):
+        """
+        Re-runs the keyword checks for a URL against its stored features: no network, no parsing.
+        Returns None if the page was never analyzed (or by an older analyzer version, or
+        without features the rules need, e.g. stored from a meta-only profile).
+        """
+        stored = self.features.get(url) if self.features is not None else None
+        if stored is None or stored[1].get('version') != ANALYSIS_VERSION:
+            return None
+        fingerprint, page = stored
+        rules = rules or self.rules
+        if not rules.needs <= set(page.get('groups', FEATURE_GROUPS)):
+            return None
+        results = {'Status_Code': 200, 'Fetch_Source': "stored features", 'Content_Fingerprint': fingerprint, 'Analysis': "Re-scored"}
+        results.update(score_page(url, page, primary_keyword, secondary_keywords, self.keyword_mode, rules))
         return results
 
+    def rescore_many(self, tasks, rules=None):
+        """
+        tasks: iterable of (key, url, primary_keyword, secondary_keywords).
+        rules: optional {key: rules.RuleSet} (keys without one use the analyzer's).
+        Yields (key, results) in order; results is None for URLs without stored features.
+        """
+        rules = rules or {}
+        for key, url, pk, sks in tasks:
+            yield key, self.rescore(url, pk, sks, rules.get(key))
+
+    def analyze_html(self, url, body, primary_keyword, secondary_keywords):
+        """
+        Analysis stage only, with this analyzer's parser / keyword / rule settings.
+        """
+        return analyze_html(url, body, primary_keyword, secondary_keywords, parser=self.parser, keyword_mode=self.keyword_mode,
+                            rules=self.rules)
+
+    def analyze_many(self, tasks, concurrency=16, per_host=4, workers=0, deadline=None, previous=None, rules=None):
+        """
+        Analyzes many URLs concurrently.
+        tasks: iterable of (key, url, primary_keyword, secondary_keywords)
+        Yields (key, results) as each URL finishes, in completion order.
+
+        workers: 0 fetches and analyzes in threads (fine for a few URLs; analysis then shares
+        one core). With N > 0 it becomes a two-stage pipeline: `concurrency` threads fetch
+        and hand the raw bytes to N worker processes that run analyze_html(), so analysis
+        uses N cores. Both hand-offs are bounded, so fetching pauses when analysis falls behind.
+        deadline: time.monotonic() value after which no new URL is started; URLs skipped
+        that way are yielded with results None.
+        previous: optional {key: (fingerprint, analysis_key, analysis)} from the last audit
+        (see analyze_url); unchanged pages come back with Analysis "Reused".
+        With a renderer set, pages that look client-rendered are rendered and re-analyzed
+        (Rendered: "Yes", or "Failed" with the static analysis kept).
+        rules: optional {key: rules.RuleSet}, e.g. each client's profile (keys without one use
+        the analyzer's rules).
+        """
+        previous = previous or {}
+        rules = rules or {}
+
+        def expired():
+            return deadline is not None and time.monotonic() >= deadline
+
+        if not workers:
+            def job(key, url, pk, sks):
+                return None if expired() else self.analyze_url(url, pk, sks, previous.get(key), rules.get(key))
+
+            engine = AsyncFetchEngine(concurrency=concurrency, per_host=per_host)
+            yield from engine.run(
+                (key, url, lambda key=key, url=url, pk=pk, sks=sks: job(key, url, pk, sks)) for key, url, pk, sks in tasks
+            )
+            return
+
+        yield from self._pipeline(tasks, concurrency, per_host, workers, expired, previous, rules)
+
+    def _pipeline(self, tasks, concurrency, per_host, workers, expired, previous, rules):
+        # Pages fetched but not yet handed to a worker, and pages handed over but not analyzed.
+        # Keeping both small bounds memory to roughly (fetch buffer + in-flight) page bodies.
+        max_in_flight = workers * 2
+        engine = AsyncFetchEngine(concurrency=concurrency, per_host=per_host, max_buffered=max_in_flight)
+        task_info = {}
+        # Client-rendered pages go through a second stage: render in the browser pool, then
+        # analyze the DOM in a worker (threads only wait on those two)
+        renders = ThreadPoolExecutor(max_workers=self.renderer.size) if self.renderer is not None else None
+
+        def fetch_jobs():
+            for key, url, pk, sks in tasks:
+                task_info[key] = (url, pk, sks)
+                yield key, url, lambda url=url: None if expired() else self.fetch_page(url)
+
+        def analyze_in_worker(*args):
+            return pool.submit(analyze_page_timed, *args).result()
+
+        def finished(future):
+            """(key, result) for a finished analysis, or None if the page went on to be rendered"""
+            key, head = in_flight.pop(future)
+            url, pk, sks = task_info[key]
+            try:
+                analysis, page = future.result()
+            except Exception as e:
+                task_info.pop(key)
+                error = self._get_error_result(url, f"Error: {str(e)}")
+                error.update({k: v for k, v in head.items() if k in TIMING_FIELDS})
+                return key, error
+            if self._should_render(analysis, page):
+                render = renders.submit(self._render_page, url, pk, sks, (analysis, page), analyze_in_worker, self._rules(rules.get(key)))
+                in_flight[render] = (key, head)
+                return None
+            task_info.pop(key)
+            head.update(analysis)
+            self._store_page(url, head, page)
+            return key, head
+
+        def drain(done):
+            for future in done:
+                item = finished(future)
+                if item is not None:
+                    yield item
+
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context()) as pool:
+            try:
+                for key, fetched in engine.run(fetch_jobs()):
+                    if fetched is None or fetched[1] is None:
+                        # Skipped (deadline) or failed fetch: nothing to analyze
+                        task_info.pop(key, None)
+                        yield key, fetched[0] if fetched else None
+                        continue
+                    head, body = fetched
+                    url, pk, sks = task_info[key]
+                    if self._reuse(head, pk, sks, previous.get(key), rules.get(key)):
+                        # Unchanged page: no need to ship it to a worker
+                        task_info.pop(key)
+                        yield key, head
+                        continue
+                    head['Analysis'] = "Analyzed"
+                    future = pool.submit(analyze_page_timed, url, body, pk, sks, self.parser, self.keyword_mode, self._rules(rules.get(key)))
+                    in_flight[future] = (key, head)
+
+                    # Hand back whatever is done; block only when every worker slot is taken
+                    if len(in_flight) >= max_in_flight:
+                        wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from drain([f for f in in_flight if f.done()])
+
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from drain(done)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+                if renders is not None:
+                    renders.shutdown(wait=True, cancel_futures=True)
+
     def _get_error_result(self, url, error_msg):
         """Returns a dict structure with empty values but showing the error"""
         keys = ['Title', 'Title_Length', 'Meta_Description', 'Meta_Desc_Length', 'Canonical_URL', 
@@ -1,10 +1,19 @@
 import streamlit as st
 import pandas as pd
-from data_manager import DataManager
-from analyzer import SEOAnalyzer
+from data_manager import DB_FILE, PRIORITIES, STATUSES, DataManager
+from history_store import HISTORY_FILE, HistoryStore
+from metrics import RerunTimer, RunMetrics
+from report_writer import ReportWriter, report_columns
+from keyword_matcher import MATCH_MODES
+from rules import DEFAULT_PROFILE, PROFILES, RULES, rule_set
 from datetime import datetime
+import os
+import tempfile
 import time
+# The analyzer (fetching, parsing, rendering), audit runner and Excel import are imported
+# where an audit or import actually runs: plain dashboard reruns never need them
 
+rerun_timer = RerunTimer()
 st.set_page_config(page_title="SEO Audit Manager", layout="wide", page_icon="🔍")
 
 # --- CSS Styling for "Modern Premium" Look ---
@@ -88,105 +97,474 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
     
-def render_audit_results(results):
+# --- Audit Results View ---
+RESULT_STATUSES = ("✅ Passed", "⚠️ Needs Review", "❌ Failed Fetch")
+RESULTS_PAGE_SIZES = (25, 50, 100, 250)
+RESULTS_SORTS = {
+    "Most issues": ("Issues", False), "Lowest score": ("Score", True), "Highest score": ("Score", False),
+    "URL": ("URL", True), "Client": ("Client", True), "Status": ("HTTP", False),
+}
+MAX_DETAIL_PANELS = 10
+
+def result_status(res):
+    if res.get('Status_Code') != 200: return RESULT_STATUSES[2]
+    return RESULT_STATUSES[1] if res.get('Has_Critical_Issues', False) else RESULT_STATUSES[0]
+
+def store_audit_results(scope, results, check_counts, reports, file_stem):
     """
-    Renders the new vertical-friendly card layout for audit results.
+    Keeps a finished run in the session for the results view: the result rows plus a summary
+    table (one row per URL) and the headline counts, computed once here instead of on every
+    rerun. check_counts[i] is how many checks results[i] was scored against (for its score).
     """
-    if not results: return
-    
-    # Run Summary
-    passed = sum(1 for r in results if not r.get('Has_Critical_Issues', False) and r.get('Status_Code') == 200)
-    failed_fetch = sum(1 for r in results if r.get('Status_Code') != 200)
-    issues_found = len(results) - passed - failed_fetch
-    
+    rows = []
+    for res, checks in zip(results, check_counts):
+        issues = res.get('Issues_List') if isinstance(res.get('Issues_List'), list) else []
+        fetched = res.get('Status_Code') == 200
+        rows.append({
+            "Client": res.get('Client', ""),
+            "URL": res.get('url'),
+            "Status": result_status(res),
+            "HTTP": res.get('Status_Code'),
+            "Issues": len(issues),
+            # Share of the client's checks the page passed; failed fetches aren't scored
+            "Score": round(100 * max(checks - len(issues), 0) / checks) if fetched and checks else None,
+            "Primary Keyword": res.get('Primary_Keyword', ""),
+            "Words": res.get('Word_Count') if isinstance(res.get('Word_Count'), int) else None,
+        })
+    summary = pd.DataFrame(rows, columns=["Client", "URL", "Status", "HTTP", "Issues", "Score", "Primary Keyword", "Words"])
+    summary = summary.astype({"HTTP": "Int64", "Score": "Int64", "Words": "Int64"})
+    st.session_state['audit_view'] = {
+        'scope': scope,
+        'run': time.time_ns(),  # widget keys: a new run starts on page 1 with fresh filters
+        'results': results,
+        'summary': summary,
+        'counts': summary["Status"].value_counts().to_dict(),
+        'reports': reports,
+        'file_stem': file_stem,
+    }
+
+def check_counts(dm, analyzer, tasks):
+    """How many checks each task is scored against: its client's rule profile, else the analyzer's."""
+    from audit_runner import task_rules
+    try:
+        per_task = task_rules(dm, tasks)
+    except ValueError:
+        per_task = {}
+    return [len(per_task.get(i, analyzer.rules).checks) for i in range(len(tasks))]
+
+def render_audit_results(view):
+    """
+    Results of the last run kept by store_audit_results(): one filterable, sortable summary
+    table, a page at a time, with the full analysis only for the rows selected in it. What is
+    drawn per rerun depends on the page size, not on how many URLs the run had.
+    """
+    if not view or view['summary'].empty: return
+    summary, run = view['summary'], view['run']
+
     c1, c2, c3 = st.columns(3)
-    c1.metric("✅ Passed Health Check", passed)
-    c2.metric("⚠️ Needs Review", issues_found)
-    c3.metric("❌ Failed Fetch", failed_fetch)
-    
-    st.markdown("---")
-    
-    for i, res in enumerate(results):
-        # Card Header
-        status_color = "green" if res.get('Status_Code') == 200 else "red"
-        has_issues = res.get('Has_Critical_Issues', False)
-        icon = "⚠️" if has_issues else "✅"
-        if res.get('Status_Code') != 200: icon = "❌"
-        
-        # Display Name
-        client_label = f"[{res.get('Client')}] " if 'Client' in res else ""
-        
-        with st.container():
-            # Summary Line (Always Visible)
-            col_main, col_stat = st.columns([4, 1])
-            with col_main:
-                st.markdown(f"**{icon} {client_label}[{res.get('url')}]({res.get('url')})**")
-            with col_stat:
-                st.caption(f"Status: {res.get('Status_Code')}")
-
-            # Expandable Details
-            # Default expanded if there are issues or error
-            start_expanded = has_issues or res.get('Status_Code') != 200
-            
-            with st.expander("🔻 View Analysis Details", expanded=start_expanded):
-                
-                # SECTION: MISSING / ISSUES REPORT (Vertical List)
-                if has_issues:
-                    st.error("🚨 **Critical Issues Detected:**")
-                    issues = res.get('Issues_List', [])
-                    if isinstance(issues, list):
-                        for issue in issues:
-                            st.markdown(f"- {issue}")
-                    else:
-                        st.write(str(issues))
-                elif res.get('Status_Code') == 200:
-                    st.success("✅ No critical on-page issues detected.")
-                
-                st.divider()
-                
-                # SECTION: DETAILED METRICS GRID
-                g1, g2, g3 = st.columns(3)
-                
-                with g1:
-                    st.markdown("##### 📝 Meta Data")
-                    st.write(f"**Title**: {res.get('Title', 'N/A')}")
-                    st.caption(f"Length: {res.get('Title_Length', 0)}")
-                    st.write(f"**Desc**: {res.get('Meta_Description', 'N/A')}")
-                    st.caption(f"Length: {res.get('Meta_Desc_Length', 0)}")
-                    st.write(f"**Canon**: {res.get('Canonical_Type', 'N/A')}")
-                
-                with g2:
-                    st.markdown("##### 📄 Content")
-                    st.write(f"**Words**: {res.get('Word_Count', 0)}")
-                    st.write(f"**H1**: {res.get('H1', 'N/A')}")
-                    st.write(f"**Images**: {res.get('Images', 0)}")
-                    if res.get('Missing_Alt_Count', 0) > 0:
-                        st.caption(f"⚠️ {res['Missing_Alt_Count']} missing alt")
-                    st.write(f"**Links**: {res.get('Internal_Links', 0)}")
-                    
-                with g3:
-                    st.markdown("##### 🔑 Keywords")
-                    pk = res.get('Primary_Keyword', 'N/A')
-                    st.write(f"**Target**: `{pk}`")
-                    
-                    # Mini checks for primary
-                    checks = []
-                    if res.get('Primary_in_Title') == 'Yes': checks.append("Title")
-                    if res.get('Primary_in_H1') == 'Yes': checks.append("H1")
-                    if res.get('Primary_in_Content') == 'Yes': checks.append("Body")
-                    st.write(f"**Found In**: {', '.join(checks) if checks else 'None'}")
-                    
-                    st.write("**Secondary**:")
-                    sec_found = res.get('Secondary_in_Content_List', 'None')
-                    st.caption(sec_found)
+    c1.metric("✅ Passed Health Check", view['counts'].get(RESULT_STATUSES[0], 0))
+    c2.metric("⚠️ Needs Review", view['counts'].get(RESULT_STATUSES[1], 0))
+    c3.metric("❌ Failed Fetch", view['counts'].get(RESULT_STATUSES[2], 0))
+
+    # Filters + sorting (applied to the whole run, before paging)
+    by_client = view['scope'] is None
+    f1, f2, f3 = st.columns([2, 2, 1.2])
+    statuses = f1.multiselect("Status", RESULT_STATUSES, default=RESULT_STATUSES, key=f"results_status_{run}")
+    search = f2.text_input("Search URL / keyword", key=f"results_search_{run}")
+    sorts = [s for s in RESULTS_SORTS if by_client or s != "Client"]
+    sort = f3.selectbox("Sort by", sorts, key=f"results_sort_{run}")
+    clients = []
+    if by_client:
+        clients = st.multiselect("Clients", sorted(summary["Client"].unique()), key=f"results_clients_{run}", placeholder="All clients")
+
+    mask = summary["Status"].isin(statuses)
+    if clients:
+        mask &= summary["Client"].isin(clients)
+    if search:
+        mask &= (summary["URL"].str.contains(search, case=False, regex=False, na=False)
+                 | summary["Primary Keyword"].str.contains(search, case=False, regex=False, na=False))
+    column, ascending = RESULTS_SORTS[sort]
+    # Stable sort, so ties keep the run's (database) order
+    filtered = summary[mask].sort_values(column, ascending=ascending, kind="stable", na_position="last")
+
+    # Pagination
+    p1, p2, p3 = st.columns([1, 1, 3])
+    page_size = p1.selectbox("Rows per page", RESULTS_PAGE_SIZES, key=f"results_page_size_{run}")
+    pages = max(1, -(-len(filtered) // page_size))
+    # Keyed by the filters too: changing them goes back to page 1
+    view_state = hash((tuple(statuses), search, sort, tuple(clients), page_size))
+    page = p2.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"results_page_{run}_{view_state}")
+    start = (page - 1) * page_size
+    shown = filtered.iloc[start:start + page_size]
+    p3.caption(f"Showing {start + 1 if len(shown) else 0}–{start + len(shown)} of {len(filtered)} URLs "
+               f"({len(summary)} in this run) · select rows to see their analysis")
+
+    columns = [c for c in summary.columns if by_client or c != "Client"]
+    event = st.dataframe(
+        shown[columns], hide_index=True, on_select="rerun", selection_mode="multi-row",
+        # A different page/filter is a different table: don't carry row selections over
+        key=f"results_table_{run}_{hash(tuple(shown.index))}",
+        column_config={
+            "URL": st.column_config.LinkColumn("URL"),
+            "Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%d"),
+        },
+    )
+
+    # Detail panels, only for what was selected
+    selected = [shown.index[i] for i in event.selection.rows]
+    if len(selected) > MAX_DETAIL_PANELS:
+        st.caption(f"Showing the first {MAX_DETAIL_PANELS} of {len(selected)} selected URLs.")
+    for idx in selected[:MAX_DETAIL_PANELS]:
+        render_result_detail(view['results'][idx])
+
+    # Downloads (written while the audit ran)
+    if view['reports']:
+        render_report_downloads(view['reports'], view['file_stem'])
+
+def render_result_detail(res):
+    """
+    The full analysis of one URL: its issues, then meta data, content and keyword findings.
+    """
+    client_label = f"[{res.get('Client')}] " if 'Client' in res else ""
+    has_issues = res.get('Has_Critical_Issues', False)
+
+    with st.container(border=True):
+        # Summary Line
+        col_main, col_stat = st.columns([4, 1])
+        with col_main:
+            st.markdown(f"**{result_status(res)[0]} {client_label}[{res.get('url')}]({res.get('url')})**")
+        with col_stat:
+            st.caption(f"Status: {res.get('Status_Code')}")
+
+        # SECTION: MISSING / ISSUES REPORT (Vertical List)
+        if has_issues:
+            st.error("🚨 **Critical Issues Detected:**")
+            issues = res.get('Issues_List', [])
+            if isinstance(issues, list):
+                for issue in issues:
+                    st.markdown(f"- {issue}")
+            else:
+                st.write(str(issues))
+        elif res.get('Status_Code') == 200:
+            st.success("✅ No critical on-page issues detected.")
 
-            st.write("") # Spacer between cards
+        st.divider()
+
+        # SECTION: DETAILED METRICS GRID
+        g1, g2, g3 = st.columns(3)
+
+        with g1:
+            st.markdown("##### 📝 Meta Data")
+            st.write(f"**Title**: {res.get('Title', 'N/A')}")
+            st.caption(f"Length: {res.get('Title_Length', 0)}")
+            st.write(f"**Desc**: {res.get('Meta_Description', 'N/A')}")
+            st.caption(f"Length: {res.get('Meta_Desc_Length', 0)}")
+            st.write(f"**Canon**: {res.get('Canonical_Type', 'N/A')}")
+
+        with g2:
+            st.markdown("##### 📄 Content")
+            st.write(f"**Words**: {res.get('Word_Count', 0)}")
+            st.write(f"**H1**: {res.get('H1', 'N/A')}")
+            st.write(f"**Images**: {res.get('Images', 0)}")
+            if isinstance(res.get('Missing_Alt_Count'), int) and res['Missing_Alt_Count'] > 0:
+                st.caption(f"⚠️ {res['Missing_Alt_Count']} missing alt")
+            st.write(f"**Links**: {res.get('Internal_Links', 0)}")
+
+        with g3:
+            st.markdown("##### 🔑 Keywords")
+            pk = res.get('Primary_Keyword', 'N/A')
+            st.write(f"**Target**: `{pk}`")
+
+            # Mini checks for primary
+            checks = []
+            if res.get('Primary_in_Title') == 'Yes': checks.append("Title")
+            if res.get('Primary_in_H1') == 'Yes': checks.append("H1")
+            if res.get('Primary_in_Content') == 'Yes': checks.append("Body")
+            st.write(f"**Found In**: {', '.join(checks) if checks else 'None'}")
+
+            st.write("**Secondary**:")
+            sec_found = res.get('Secondary_in_Content_List', 'None')
+            st.caption(sec_found)
+
+def render_cache_summary(cache):
+    """Shows how many pages were served from the response cache during the last run."""
+    if cache is None: return
+    stats = cache.stats
+    st.caption(
+        f"🗄️ Fetch sources: {stats['network']} network, {stats['revalidated']} revalidated (304), "
+        f"{stats['cache']} from cache · {stats['bytes_saved'] / (1024 * 1024):.1f} MB not downloaded"
+    )
+
+def render_outcome_summary(outcomes, scheduler=None):
+    """Shows how many URLs were re-analyzed, reused unchanged or failed in the last run."""
+    from audit_runner import OUTCOMES
+    counts = {o: outcomes.count(o) for o in OUTCOMES}
+    st.caption(f"🔁 {counts['analyzed']} re-analyzed, {counts['unchanged']} unchanged (analysis skipped), {counts['failed']} failed")
+    if scheduler is not None and scheduler.stats['retries']:
+        st.caption(f"⏳ {scheduler.stats['retries']} retries, {scheduler.stats['throttled']} throttled (429/503) responses")
+
+def render_performance(metrics):
+    """Shows the run's throughput and where the time went: slowest phases and slowest hosts."""
+    if metrics is None or not metrics.pages:
+        return
+    summary = metrics.summary()
+    url_ms = summary['url_ms']
+    title = f"⏱️ Performance: {summary['pages_per_sec']} pages/s · per URL p50 {url_ms['p50']} ms, p95 {url_ms['p95']} ms, p99 {url_ms['p99']} ms"
+    with st.expander(title, expanded=False):
+        c1, c2 = st.columns(2)
+        c1.markdown("**Slowest phases**")
+        c1.dataframe(pd.DataFrame([r for r in summary['phases'] if r['share'] is not None]), hide_index=True)
+        c2.markdown("**Slowest hosts**")
+        c2.dataframe(pd.DataFrame(summary['slowest_hosts']), hide_index=True)
+        c1, c2 = st.columns(2)
+        c1.download_button("📥 Run Summary (JSON)", metrics.to_json(), "audit_metrics.json", "application/json")
+        c2.download_button("📥 Metrics (Prometheus)", metrics.to_prometheus(), "audit_metrics.prom", "text/plain")
+
+def render_history_diff(history, clients):
+    """Shows which URLs gained or lost issues compared with each client's previous run."""
+    rows = [
+        {"Client": client, "URL": c["url"], "New Issues": "; ".join(c["gained"]), "Resolved Issues": "; ".join(c["lost"])}
+        for client in clients for c in history.diff(client)
+    ]
+    with st.expander(f"📈 Changes since the previous run ({len(rows)} URLs)", expanded=False):
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        else:
+            st.write("No URLs gained or lost issues.")
+
+def render_rule_profile(dm, client):
+    """Per-client audit rules: a base profile, which checks run and their thresholds."""
+    stored = dm.get_client_profile(client)
+    try:
+        current = rule_set(stored)
+    except ValueError as e:
+        st.error(f"Stored audit rules are invalid ({e}); using the {DEFAULT_PROFILE} profile.")
+        stored, current = None, rule_set()
+    stored_base = stored if isinstance(stored, str) else (stored or {}).get('profile') or DEFAULT_PROFILE
+
+    with st.expander(f"⚙️ Audit Rules: {current.name}", expanded=False):
+        base = st.selectbox("Profile", list(PROFILES), index=list(PROFILES).index(stored_base), key=f"profile_{client}",
+                            help="full: every check · technical: no keyword checks · meta-only: head tags only (body text, headings and schema aren't extracted, much faster)")
+        base_rules = rule_set(base)
+        # Switching profile starts from that profile's checks and default thresholds
+        start = current if base == stored_base else base_rules
+        enabled = st.multiselect("Checks", list(RULES), default=start.rule_names, format_func=lambda name: RULES[name].label,
+                                 key=f"rules_{client}_{base}")
+        start_params = {rule.name: params for rule, params in start.checks}
+        overrides = {}
+        for name in enabled:
+            rule = RULES[name]
+            for param, default in rule.params.items():
+                value = st.number_input(f"{rule.label}: {param.replace('_', ' ')}", min_value=0, step=1,
+                                        value=int(start_params.get(name, rule.params)[param]), key=f"param_{client}_{base}_{name}_{param}")
+                if value != default:
+                    overrides.setdefault(name, {})[param] = int(value)
+
+        profile = {'profile': base}
+        disable = [name for name in base_rules.rule_names if name not in enabled]
+        enable = [name for name in enabled if name not in base_rules.rule_names]
+        if disable: profile['disable'] = disable
+        if enable: profile['enable'] = enable
+        if overrides: profile['params'] = overrides
+        if len(profile) == 1:
+            profile = None if base == DEFAULT_PROFILE else base
+        st.caption(f"Page features extracted: {', '.join(sorted(rule_set(profile).needs))}")
+        if st.button("💾 Save Rules", key=f"save_rules_{client}"):
+            dm.set_client_profile(client, profile)
+            st.rerun()
+
+# --- URL Workspace ---
+WORKSPACE_FIELDS = {
+    "Primary Keyword": "primary_keyword", "Secondary Keywords": "secondary_keywords",
+    "Priority": "priority", "Status": "status", "Notes": "notes",
+}
+KEEP = "(unchanged)"
+
+def workspace_changes(grid, edited, bulk_priority=KEEP, bulk_status=KEEP, bulk_delete=False):
+    """
+    Pending workspace edits as (updates, removals) for DataManager.save_edits(): cells edited
+    in the grid plus the bulk actions, which apply to the rows ticked in its Select column.
+    """
+    edited = edited.copy()
+    editable = list(WORKSPACE_FIELDS)
+    edited[editable] = edited[editable].fillna("")
+    selected = edited["Select"].fillna(False).astype(bool)
+    if bulk_priority != KEEP: edited.loc[selected, "Priority"] = bulk_priority
+    if bulk_status != KEEP: edited.loc[selected, "Status"] = bulk_status
+
+    removals = list(grid.loc[selected, "URL"]) if bulk_delete else []
+    changed = edited[editable] != grid[editable]
+    updates = {}
+    for row in changed.index[changed.any(axis=1)]:
+        fields = {}
+        for column in editable:
+            if changed.at[row, column]:
+                value = edited.at[row, column]
+                if column == "Secondary Keywords":
+                    value = [kw.strip() for kw in value.split(",") if kw.strip()]
+                fields[WORKSPACE_FIELDS[column]] = value
+        updates[grid.at[row, "URL"]] = fields
+    return updates, removals
+
+def render_url_workspace(dm, client, client_urls):
+    """
+    The client's URLs in one editable grid. It sits in a form, so edits and bulk actions stay
+    in the browser (no rerun, no database write) until "Save Changes" stores them all in one
+    transaction.
+    """
+    version = st.session_state.setdefault(f"workspace_version_{client}", 0)
+    saved_message = st.session_state.pop(f"workspace_saved_{client}", None)
+    if saved_message:
+        st.success(saved_message)
+
+    grid = pd.DataFrame({
+        "Select": [False] * len(client_urls),
+        "URL": [item['url'] for item in client_urls],
+        "Primary Keyword": [item.get('primary_keyword', "") for item in client_urls],
+        "Secondary Keywords": [", ".join(item.get('secondary_keywords', [])) for item in client_urls],
+        "Priority": [item.get('priority', "Medium") for item in client_urls],
+        "Status": [item.get('status', "Pending") for item in client_urls],
+        "Last Audit": [item.get('last_audit', "Never") for item in client_urls],
+        "Notes": [item.get('notes', "") for item in client_urls],
+    })
+
+    with st.form(f"workspace_{client}_{version}", border=False):
+        edited = st.data_editor(
+            grid, key=f"workspace_grid_{client}_{version}", hide_index=True, num_rows="fixed",
+            disabled=["URL", "Last Audit"],
+            column_config={
+                "Select": st.column_config.CheckboxColumn("Select", help="Rows the bulk actions below apply to"),
+                "URL": st.column_config.LinkColumn("URL"),
+                "Secondary Keywords": st.column_config.TextColumn("Secondary Keywords", help="Comma-separated"),
+                "Priority": st.column_config.SelectboxColumn("Priority", options=PRIORITIES, required=True),
+                "Status": st.column_config.SelectboxColumn("Status", options=STATUSES, required=True),
+            },
+        )
+        b1, b2, b3, b4 = st.columns([1.5, 1.5, 1, 1])
+        bulk_priority = b1.selectbox("Set priority of selected", [KEEP, *PRIORITIES])
+        bulk_status = b2.selectbox("Set status of selected", [KEEP, *STATUSES])
+        bulk_delete = b3.checkbox("Delete selected")
+        save = b4.form_submit_button("💾 Save Changes", type="primary")
+
+    if not save: return
+    updates, removals = workspace_changes(grid, edited, bulk_priority, bulk_status, bulk_delete)
+    if not updates and not removals:
+        st.info("No changes to save.")
+        return
+    updated, removed = dm.save_edits(client, updates, removals)
+    # A new grid key drops the editor's pending edits, now that they're stored
+    st.session_state[f"workspace_version_{client}"] = version + 1
+    st.session_state[f"workspace_saved_{client}"] = f"✅ Saved: {updated} URLs updated, {removed} removed."
+    st.rerun()
+
+def open_reports(name, items, client_column=False):
+    """CSV + XLSX report writers for one run, streaming into this session's temp folder."""
+    folder = st.session_state.setdefault('reports_dir', tempfile.mkdtemp(prefix="seo_reports_"))
+    columns = report_columns(items, client_column=client_column)
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return [
+        ReportWriter(os.path.join(folder, f"{name}.csv"), columns),
+        ReportWriter(os.path.join(folder, f"{name}.xlsx"), columns, sheet_by='Client' if client_column else None),
+    ]
+
+def _read_file(path):
+    def read():
+        with open(path, 'rb') as f:
+            return f.read()
+    return read
+
+def render_report_downloads(reports, file_stem):
+    """
+    Download buttons for the files written by open_reports() (read from disk, not rebuilt,
+    and only when a button is clicked, so reruns don't re-send large reports).
+    """
+    csv_report, xlsx_report = reports
+    c1, c2 = st.columns(2)
+    c1.download_button("📥 Download CSV Report", _read_file(csv_report.path), f"{file_stem}.csv", "text/csv")
+    c2.download_button("📥 Download Excel Report", _read_file(xlsx_report.path), f"{file_stem}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 # --- Init Modules ---
-dm = DataManager()
-analyzer = SEOAnalyzer()
+# Rerun-invariant pieces are cached: every widget interaction reruns this whole script, and
+# these needn't be rebuilt for it (see the Rerun Profiler at the bottom of the sidebar)
+@st.cache_resource(show_spinner=False)
+def get_stores(db_path, history_path):
+    """
+    The client store and audit history, shared by every session. Each session's script runs
+    on its own thread: DataManager keeps connections and batch() buffers per thread, and
+    HistoryStore buffers rows under a lock, keyed by run.
+    """
+    return DataManager(db_path), HistoryStore(history_path)
 
-data = dm.load_data()
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_client_data(_dm, db_path, version):
+    """
+    dm.load_data() for one storage version: read once and shared by every rerun and session
+    until something is written. Read-only: callers copy before changing anything in it.
+    """
+    return _dm.load_data()
+
+@st.cache_data(show_spinner=False)
+def excel_template():
+    """The import template as .xlsx bytes, built once instead of on every rerun."""
+    from io import BytesIO
+    template_data = {
+        'Client_ID': ['C1', 'C1'],
+        'Target_URL': ['https://example.com/page1', 'https://example.com/page2'],
+        'Primary_Keyword': ['main keyword', 'secondary keyword'],
+        'Secondary_Keyword_1': ['kw1', 'kwa'],
+        'Secondary_Keyword_2': ['kw2', 'kwb']
+    }
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame(template_data).to_excel(writer, index=False)
+    return buffer.getvalue()
+
+def session_analyzer(settings):
+    """
+    This session's analyzer, with the sidebar settings applied. Created by the session's
+    first audit (the fetch / parse / render stack is only imported then) and kept across
+    reruns, so its connection pool's keep-alive survives them.
+    """
+    if st.session_state.get('analyzer_http2', settings['http2']) != settings['http2']:
+        # The HTTP/2 client is set up when the analyzer is built: start over with a new one
+        st.session_state.pop('analyzer').client.close()
+        st.session_state.pop('browser_pool').close()
+    if 'analyzer' not in st.session_state:
+        from analyzer import SEOAnalyzer
+        from http_client import HTTP2_AVAILABLE
+        from renderer import BrowserPool
+        if settings['http2'] and not HTTP2_AVAILABLE:
+            st.warning("HTTP/2 needs the optional httpx[http2] package (pip install 'httpx[http2]'); fetching over HTTP/1.1.")
+        st.session_state['analyzer'] = SEOAnalyzer(http2=settings['http2'])
+        st.session_state['analyzer_http2'] = settings['http2']
+        # Same for the headless browser: started on the first page that needs rendering, then kept
+        st.session_state['browser_pool'] = BrowserPool(scheduler=st.session_state['analyzer'].scheduler)
+    analyzer = st.session_state['analyzer']
+    analyzer.client.offline = settings['offline']
+    analyzer.keyword_mode = settings['keyword_mode']
+    analyzer.renderer = st.session_state['browser_pool'] if settings['render_js'] and not settings['offline'] else None
+    return analyzer
+
+# Rerun profiler: every interaction should stay under this
+RERUN_BUDGET_MS = 100
+RERUN_HISTORY = 20
+
+def render_rerun_profile(slot, timer):
+    """Sidebar read-out of this rerun's wall time by phase, against the RERUN_BUDGET_MS target."""
+    recent = st.session_state.setdefault('rerun_ms', [])
+    recent.append(timer.total_ms)
+    del recent[:-RERUN_HISTORY]
+    icon = "✅" if timer.total_ms <= RERUN_BUDGET_MS else "🐢"
+    with slot.expander(f"{icon} Rerun Profiler: {timer.total_ms:.0f} ms", expanded=False):
+        for phase, ms in timer.phases:
+            st.caption(f"{phase}: {ms:.1f} ms")
+        ordered = sorted(recent)
+        st.caption(f"Last {len(recent)} reruns: median {ordered[len(ordered) // 2]:.0f} ms, max {ordered[-1]:.0f} ms "
+                   f"(target {RERUN_BUDGET_MS} ms)")
+
+dm, history = get_stores(os.path.abspath(DB_FILE), os.path.abspath(HISTORY_FILE))
+data = load_client_data(dm, dm.db_path, dm.storage_version())
+rerun_timer.mark("data")
 
 # --- Sidebar: Client Manager ---
 with st.sidebar:
@@ -198,6 +576,18 @@ with st.sidebar:
         st.session_state['run_global'] = True
     else:
             st.session_state['run_global'] = False
+
+    concurrency = st.slider("Concurrent Requests", min_value=1, max_value=32, value=8, help="URLs fetched in parallel (max 4 at a time per host)")
+    # Applied to the analyzer when an audit runs (see session_analyzer)
+    analyzer_settings = {}
+    analyzer_settings['offline'] = st.toggle("Offline Mode (cache only)", value=False, help="Re-render reports from cached pages without any network requests")
+    analyzer_settings['keyword_mode'] = st.selectbox(
+        "Keyword Matching", MATCH_MODES, index=0,
+        help="substring: any occurrence (original behaviour) · word: whole words only · stem: whole words incl. singular/plural",
+    )
+    incremental = st.toggle("Skip Unchanged Pages", value=True, help="Reuse the last analysis when a page's content and keywords haven't changed (pages are still fetched)")
+    analyzer_settings['http2'] = st.toggle("HTTP/2", value=False, help="Fetch over HTTP/2 where the server supports it (needs the optional httpx[http2] package)")
+    analyzer_settings['render_js'] = st.toggle("Render JavaScript Pages", value=False, help="Pages whose HTML looks client-rendered (empty body / no H1 next to lots of script) are rendered in headless Chromium and the rendered page is analyzed")
             
     if st.button("🗑️ Clear All Data", type="secondary"):
         dm.save_data({}) # Wipe file
@@ -210,24 +600,9 @@ with st.sidebar:
     st.markdown("Upload Excel (`.xlsx`) to add or update clients.")
     
     # Template Download
-    template_data = {
-        'Client_ID': ['C1', 'C1'],
-        'Target_URL': ['https://example.com/page1', 'https://example.com/page2'],
-        'Primary_Keyword': ['main keyword', 'secondary keyword'],
-        'Secondary_Keyword_1': ['kw1', 'kwa'],
-        'Secondary_Keyword_2': ['kw2', 'kwb']
-    }
-    df_template = pd.DataFrame(template_data)
-    
-    # Convert to Bytes
-    from io import BytesIO
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        df_template.to_excel(writer, index=False)
-    
     st.download_button(
         label="📄 Download Excel Template",
-        data=buffer.getvalue(),
+        data=excel_template,  # built on the first click
         file_name="seo_audit_template.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -237,61 +612,23 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Choose Excel File", type=['xlsx', 'xls'])
     
     if uploaded_file is not None and st.button("Process Excel Import"):
+        from excel_import import read_import_rows
         try:
-            # Clear existing data to enforce "Clean and Fill" behavior
-            dm.save_data({})
-            
-            df_upload = pd.read_excel(uploaded_file)
-            
-            # Normalize columns to lowercase for easier matching
-            df_upload.columns = df_upload.columns.str.strip()
-            
-            count_clients = 0
-            count_urls = 0
-            
-            for index, row in df_upload.iterrows():
-                # Extract basic info
-                c_id = str(row.get('Client_ID', '')).strip()
-                if not c_id or c_id.lower() == 'nan': continue
-                
-                t_url = str(row.get('Target_URL', '')).strip()
-                p_kw = str(row.get('Primary_Keyword', '')).strip()
-                
-                # Collect Secondary Keywords (dynamic columns starting with Secondary_Keyword)
-                s_kws = []
-                for col in df_upload.columns:
-                    if 'Secondary_Keyword' in col and pd.notna(row[col]):
-                        val = str(row[col]).strip()
-                        if val: s_kws.append(val)
-                
-                # Add Client if missing
-                if dm.add_client(c_id):
-                    count_clients += 1
-                    
-                # Add URL
-                u_data = {
-                    "url": t_url,
-                    "primary_keyword": p_kw,
-                    "secondary_keywords": s_kws,
-                    "status": "Pending",
-                    "priority": "Medium",
-                    "last_audit": "Never",
-                    "notes": ""
-                }
-                
-                # Add URL (Logic handles duplicates inside DataManager)
-                if dm.add_url(c_id, u_data):
-                    count_urls += 1
-                    
+            # "Clean and Fill": existing data is replaced in the same transaction
+            # (and kept if the import fails). The sheet is streamed, not loaded whole.
+            count_clients, count_urls = dm.import_rows(read_import_rows(uploaded_file), replace=True)
+
             st.success(f"✅ Imported {count_clients} new clients and {count_urls} new URLs!")
             time.sleep(2)
             st.rerun()
             
         except Exception as e:
             st.error(f"Error processing file: {e}")
-            
-
 
+    st.divider()
+    # Filled in at the end of the script, once the whole rerun has been timed
+    profiler_slot = st.empty()
+rerun_timer.mark("sidebar")
 
 
 # --- Main Content ---
@@ -318,54 +655,71 @@ st.write("") # Spacer
 
 # Logic for Global vs Single
 run_global = st.session_state.get('run_global', False)
+# The last global run's results stay on screen (paging / filtering them reruns the script) until dismissed
+audit_view = st.session_state.get('audit_view')
+show_global = run_global or (audit_view is not None and audit_view['scope'] is None)
 
-if run_global:
-    st.subheader("🌍 running Global Audit (All Clients)...")
+if show_global:
+    st.subheader("🌍 running Global Audit (All Clients)..." if run_global else "🌍 Global Audit Results (All Clients)")
     if st.button("Stop / Return to Dashboard"):
         st.session_state['run_global'] = False
+        st.session_state.pop('audit_view', None)
         st.rerun()
     
-    # Calculate total for progress
-    all_tasks = []
-    for client, urls in data.items():
-        for i, item in enumerate(urls):
-            all_tasks.append((client, i, item))
+    if run_global:
+        from audit_runner import collect_tasks, outcome, run_audit
+        analyzer = session_analyzer(analyzer_settings)
+        # Calculate total for progress
+        all_tasks = collect_tasks(data)
     
-    if not all_tasks:
+    if not run_global:
+        render_audit_results(audit_view)
+    elif not all_tasks:
         st.warning("No URLs found in database.")
     else:
         progress_bar = st.progress(0)
         status_text = st.empty()
-        results_list = []
+        results_by_task = [None] * len(all_tasks)
+        outcomes = []
+        reports = open_reports("global_audit", (t[2] for t in all_tasks), client_column=True)
+        if analyzer.cache: analyzer.cache.reset_stats()
+        analyzer.scheduler.reset_stats()
+        metrics = RunMetrics()
         
-        for idx, (client, url_idx, item) in enumerate(all_tasks):
-            status_text.text(f"[{idx+1}/{len(all_tasks)}] Analyzing {client}: {item['url']}...")
-            
-            # Run Analysis
-            audit_res = analyzer.analyze_url(item['url'], item['primary_keyword'], item['secondary_keywords'])
-            
-            # Merge
-            combined_res = {**item, **audit_res}
-            combined_res['Client'] = client # Keep Client Name
-            # combined_res['Your_Secondary_Keywords'] removed to avoid duplication
-            
-            results_list.append(combined_res)
+        # Run Analysis (concurrently, results arrive as they finish; last_audit is saved in batches)
+        audit = run_audit(dm, analyzer, all_tasks, concurrency=concurrency, incremental=incremental, history=history, metrics=metrics)
+        try:
+            for done, (idx, audit_res) in enumerate(audit, start=1):
+                client, url_idx, item = all_tasks[idx]
+                status_text.text(f"[{done}/{len(all_tasks)}] Analyzed {client}: {item['url']}")
             
-            # Update Timestamp (Save to file)
-            now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-            dm.update_url_status(client, url_idx, "last_audit", now_str)
+                # Merge
+                combined_res = {**item, **audit_res}
+                combined_res['Client'] = client # Keep Client Name
+                # combined_res['Your_Secondary_Keywords'] removed to avoid duplication
             
-            progress_bar.progress((idx + 1) / len(all_tasks))
+                results_by_task[idx] = combined_res
+                outcomes.append(outcome(audit_res))
+                for report in reports: report.write(combined_res)
             
+                progress_bar.progress(done / len(all_tasks))
+        finally:
+            # Also on errors / Stop: the generator's cleanup runs now and the reports are complete files
+            audit.close()
+            for report in reports: report.close()
+        # Keep the results view in database order
+        finished = [i for i, r in enumerate(results_by_task) if r is not None]
         status_text.text("Global Analysis Complete! ✅")
+        render_cache_summary(analyzer.cache)
+        render_outcome_summary(outcomes, analyzer.scheduler)
+        render_performance(metrics)
+        render_history_diff(history, list(data.keys()))
         
-        if results_list:
-            # Render New UI
-            render_audit_results(results_list)
-            
-            # Prepare CSV Download
-            df = pd.DataFrame(results_list)
-            st.download_button("📥 Download Master Report", df.to_csv(index=False).encode('utf-8'), f"global_audit_{datetime.now().strftime('%Y%m%d')}.csv", "text/csv")
+        if finished:
+            checks = check_counts(dm, analyzer, all_tasks)
+            store_audit_results(None, [results_by_task[i] for i in finished], [checks[i] for i in finished],
+                                reports, f"global_audit_{datetime.now().strftime('%Y%m%d')}")
+            render_audit_results(st.session_state['audit_view'])
 
 elif not data:
     st.info("👋 Welcome! Use the sidebar to add your first client and target URLs.")
@@ -378,103 +732,79 @@ else:
         
         # --- Workflow / Status View ---
         st.subheader(f"Dashboard: {selected_client_view}")
+        render_rule_profile(dm, selected_client_view)
         
         if not client_urls:
             st.warning("No URLs found for this client. Add one in the sidebar!")
         else:
-            # Create a nice layout for the list
-            col1_h, col2_h, col3_h, col4_h, col5_h, col6_h = st.columns([3, 1.5, 1, 1, 1.5, 0.5])
-            col1_h.markdown("**URL**")
-            col2_h.markdown("**Primary Keyword**")
-            col3_h.markdown("**Priority**")
-            col4_h.markdown("**Status**")
-            col5_h.markdown("**Last Audit**")
-            col6_h.markdown("**Action**")
-            
-            st.divider()
-            
-            # --- URL List with Controls ---
-            urls_to_audit = []
+            # --- URL Workspace (one grid, saved in one go) ---
+            render_url_workspace(dm, selected_client_view, client_urls)
             
-            for index, item in enumerate(client_urls):
-                c1, c2, c3, c4, c5, c6 = st.columns([3, 1.5, 1, 1, 1.5, 0.5])
-                
-                c1.write(f"🔗 [{item['url']}]({item['url']})")
-                c2.write(item['primary_keyword'])
-                
-                # Priority Edit
-                new_prio = c3.selectbox("Priority", ["High", "Medium", "Low"], index=["High", "Medium", "Low"].index(item['priority']), key=f"prio_{selected_client_view}_{index}", label_visibility="collapsed")
-                if new_prio != item['priority']:
-                    dm.update_url_status(selected_client_view, index, "priority", new_prio)
-                    st.rerun()
-                
-                # Status Edit
-                new_status = c4.selectbox("Status", ["Pending", "In Progress", "Optimized", "Review"], index=["Pending", "In Progress", "Optimized", "Review"].index(item['status']), key=f"stat_{selected_client_view}_{index}", label_visibility="collapsed")
-                if new_status != item['status']:
-                    dm.update_url_status(selected_client_view, index, "status", new_status)
-                    st.rerun()
-                    
-                c5.write(item['last_audit'])
-                
-                # Delete Button
-                if c6.button("🗑️", key=f"del_{selected_client_view}_{index}"):
-                    dm.remove_url(selected_client_view, index)
-                    st.rerun()
-
             st.divider()
             
             # --- Audit Action Area (Single Client) ---
             st.subheader("⚡ Run Audit")
             run_btn = st.button(f"Analyze All URLs for {selected_client_view}", type="primary")
-            if run_btn and client_urls:
+            rescore_btn = st.button("🎯 Re-score Keywords Only", help="Re-run the keyword checks from stored page features after changing keywords: no fetching, only URLs audited before")
+            if (run_btn or rescore_btn) and client_urls:
+                from audit_runner import outcome, rescore_audit, run_audit
+                analyzer = session_analyzer(analyzer_settings)
                 st.write("Starting analysis...")
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-                results_list = []
-                
                 total = len(client_urls)
+                results_by_url = [None] * total
+                outcomes = []
+                reports = open_reports(f"audit_report_{selected_client_view}", client_urls)
+                if analyzer.cache: analyzer.cache.reset_stats()
+                analyzer.scheduler.reset_stats()
                 
-                for i, item in enumerate(client_urls):
-                    status_text.text(f"Analyzing {item['url']}...")
-                    
-                    # Run Analysis
-                    audit_res = analyzer.analyze_url(item['url'], item['primary_keyword'], item['secondary_keywords'])
-                    
-                    # Merge static data (Status, Priority) with Audit Results
-                    combined_res = {**item, **audit_res}
-                    # combined_res['Your_Secondary_Keywords'] removed to avoid duplication
+                tasks = [(selected_client_view, i, item) for i, item in enumerate(client_urls)]
+                
+                # Run Analysis (concurrently, results arrive as they finish; last_audit is saved in batches)
+                metrics = None
+                if rescore_btn:
+                    audit = rescore_audit(dm, analyzer, tasks, history=history)
+                else:
+                    metrics = RunMetrics()
+                    audit = run_audit(dm, analyzer, tasks, concurrency=concurrency, incremental=incremental, history=history, metrics=metrics)
+                try:
+                    for done, (i, audit_res) in enumerate(audit, start=1):
+                        item = client_urls[i]
+                        status_text.text(f"[{done}/{total}] Analyzed {item['url']}")
                     
-                    results_list.append(combined_res)
+                        # Merge static data (Status, Priority) with Audit Results
+                        combined_res = {**item, **audit_res}
+                        # combined_res['Your_Secondary_Keywords'] removed to avoid duplication
                     
-                    # Update 'Last Audit'
-                    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    dm.update_url_status(selected_client_view, i, "last_audit", now_str)
+                        results_by_url[i] = combined_res
+                        outcomes.append(outcome(audit_res))
+                        for report in reports: report.write(combined_res)
                     
-                    progress_bar.progress((i + 1) / total)
-                
+                        progress_bar.progress(done / total)
+                finally:
+                    # Also on errors / Stop: the generator's cleanup runs now and the reports are complete files
+                    audit.close()
+                    for report in reports: report.close()
+                finished = [i for i, r in enumerate(results_by_url) if r is not None]
                 status_text.text("Analysis Complete! ✅")
+                render_cache_summary(analyzer.cache)
+                render_outcome_summary(outcomes, analyzer.scheduler)
+                render_performance(metrics)
+                render_history_diff(history, [selected_client_view])
                 time.sleep(1)
                 
-                # --- Results Display ---
-                if results_list:
-                    st.subheader("📊 Audit Results")
-                    
-                    # Render New UI
-                    render_audit_results(results_list)
-                    
-                    df = pd.DataFrame(results_list)
-                    
-                    # Clean up columns for export
-                    # Clean up columns for export
-                    cols_to_drop = ['secondary_keywords', 'Config_Secondary_Keywords', 'Missing_Alt_Files', 'notes', 'Your_Secondary_Keywords']
-                    for c in cols_to_drop:
-                        if c in df.columns:
-                            df = df.drop(columns=[c])
-
-                    st.download_button(
-                        label="📥 Download Excel Report",
-                        data=df.to_csv(index=False).encode('utf-8'),
-                        file_name=f"audit_report_{selected_client_view}_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
+                if finished:
+                    checks = check_counts(dm, analyzer, tasks)
+                    store_audit_results(selected_client_view, [results_by_url[i] for i in finished], [checks[i] for i in finished],
+                                        reports, f"audit_report_{selected_client_view}_{datetime.now().strftime('%Y%m%d')}")
+            
+            # --- Results Display (this client's last run, kept while paging / filtering) ---
+            audit_view = st.session_state.get('audit_view')
+            if audit_view is not None and audit_view['scope'] == selected_client_view:
+                st.subheader("📊 Audit Results")
+                render_audit_results(audit_view)
 
+# --- Rerun Profiler ---
+rerun_timer.mark("main view")
+render_rerun_profile(profiler_slot, rerun_timer)
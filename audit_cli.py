@@ -0,0 +1,182 @@
+"""
+Headless audit runner (for cron / scheduled jobs), separate from the Streamlit dashboard.
+
+    python audit_cli.py                                  # every client
+    python audit_cli.py --client C1 --client C2 -c 32 --executor process
+    python audit_cli.py --time-budget 3600 --output reports/nightly.xlsx
+    python audit_cli.py --client C1 --rescore               # new keywords, no refetch
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from analyzer import SEOAnalyzer
+from audit_runner import EXECUTORS, OUTCOMES, collect_tasks, outcome, rescore_audit, run_audit
+from data_manager import DataManager, DB_FILE
+from history_store import HistoryStore, HISTORY_FILE
+from http_client import HTTP2_AVAILABLE
+from metrics import RunMetrics
+from politeness import PoliteScheduler
+from renderer import BrowserPool
+from report_writer import ReportWriter, report_columns
+from keyword_matcher import MATCH_MODES
+from rules import PROFILES, rule_set
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run SEO audits for stored clients without the dashboard.")
+    parser.add_argument("--client", action="append", dest="clients", metavar="NAME",
+                        help="Only audit this client (repeatable). Default: every client.")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="URLs in flight at once (default: 16)")
+    parser.add_argument("--per-host", type=int, default=4, help="Max URLs in flight per host (default: 4)")
+    parser.add_argument("--executor", choices=EXECUTORS, default="thread",
+                        help="thread: everything in one process; process: fetch in threads, analyze in worker processes (default: thread)")
+    parser.add_argument("--workers", type=int, help="Analysis processes for --executor process (default: one per CPU core)")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS",
+                        help="Stop starting new URLs after this many seconds; unfinished URLs keep their old last_audit")
+    parser.add_argument("-o", "--output", help="Report path (.csv or .xlsx). Default: audit_<timestamp>.csv")
+    parser.add_argument("--db", default=DB_FILE, help=f"Client database (default: {DB_FILE})")
+    parser.add_argument("--parser", default="auto", help="HTML parser backend (default: auto)")
+    parser.add_argument("--keyword-mode", choices=MATCH_MODES, default="substring")
+    parser.add_argument("--profile", choices=PROFILES,
+                        help="Rule profile for every client, ignoring the clients' own (e.g. meta-only: head tags "
+                             "only, much faster). Default: each client's stored profile, else full")
+    parser.add_argument("--offline", action="store_true", help="Serve pages from the response cache only")
+    parser.add_argument("--http2", action="store_true",
+                        help="Fetch over HTTP/2 where the server supports it (needs the optional httpx[http2] extra)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="Starting requests/second per host; adapts to 429/503 and robots.txt Crawl-delay (default: 10)")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries per URL for timeouts, 429 and 5xx (default: 3)")
+    parser.add_argument("--max-size", type=float, default=10, metavar="MB",
+                        help="Abandon page downloads larger than this (default: 10)")
+    parser.add_argument("--render", action="store_true",
+                        help="Render pages that look client-rendered (JavaScript) in headless Chromium before analyzing them")
+    parser.add_argument("--render-pages", type=int, default=2, metavar="N",
+                        help="Browser pages rendering at once with --render (default: 2)")
+    parser.add_argument("--obey-robots", action="store_true", help="Skip URLs disallowed by the host's robots.txt")
+    parser.add_argument("--metrics", action="append", default=[], metavar="PATH",
+                        help="Write the run's timing metrics: .json for a JSON run summary, anything else "
+                             "(e.g. .prom) in Prometheus text format. Repeatable")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"Audit history store (default: {HISTORY_FILE})")
+    parser.add_argument("--no-history", action="store_true", help="Don't record this run in the history store")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-analyze every page, even if its content and keywords are unchanged since the last audit")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Only re-run keyword checks from the stored page features (no network); "
+                             "URLs never audited are left out")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.monotonic()
+
+    dm = DataManager(db_path=args.db)
+    data = dm.load_data()
+    if args.clients:
+        unknown = [c for c in args.clients if c not in data]
+        if unknown:
+            print(f"Unknown client(s): {', '.join(unknown)}", file=sys.stderr)
+            return 2
+    tasks = collect_tasks(data, clients=set(args.clients) if args.clients else None)
+    if not tasks:
+        print("No URLs to audit.")
+        return 0
+
+    scheduler = PoliteScheduler(rate=args.rate, max_retries=args.max_retries, obey_robots=args.obey_robots)
+    renderer = BrowserPool(size=args.render_pages, scheduler=scheduler) if args.render and not args.offline else None
+    try:
+        return _run(args, dm, tasks, scheduler, renderer, started)
+    finally:
+        # Whatever happens in the audit or the reporting, don't leave Chromium running
+        if renderer:
+            renderer.close()
+
+
+def _run(args, dm, tasks, scheduler, renderer, started):
+    """The audit itself, the report and the summary; returns the exit code."""
+    if args.http2 and not HTTP2_AVAILABLE:
+        print("--http2: httpx[http2] is not installed; fetching over HTTP/1.1", file=sys.stderr)
+    analyzer = SEOAnalyzer(parser=args.parser, keyword_mode=args.keyword_mode, scheduler=scheduler, http2=args.http2,
+                           max_body_bytes=int(args.max_size * 1024 * 1024), renderer=renderer, rules=rule_set(args.profile))
+    analyzer.client.offline = args.offline
+    history = None if args.no_history else HistoryStore(args.history)
+    metrics = None if args.rescore else RunMetrics()
+
+    if args.rescore:
+        print(f"Re-scoring {len(tasks)} URLs from stored features...")
+        audit = rescore_audit(dm, analyzer, tasks, history=history, client_profiles=not args.profile)
+    else:
+        print(f"Auditing {len(tasks)} URLs ({args.executor} executor, concurrency {args.concurrency})...")
+        audit = run_audit(
+            dm, analyzer, tasks,
+            concurrency=args.concurrency, per_host=args.per_host, executor=args.executor,
+            workers=args.workers, time_budget=args.time_budget, incremental=not args.full, history=history,
+            metrics=metrics, client_profiles=not args.profile,
+        )
+    output = args.output or f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    counts = dict.fromkeys(OUTCOMES, 0)
+    retried = 0
+    # Rows go to the report as they finish (completion order; .xlsx gets one sheet per client)
+    with ReportWriter(output, report_columns((t[2] for t in tasks), client_column=True), sheet_by='Client') as report:
+        try:
+            for done, (idx, audit_res) in enumerate(audit, start=1):
+                client, url_idx, item = tasks[idx]
+                combined_res = {**item, **audit_res}
+                combined_res['Client'] = client
+                report.write(combined_res)
+                result = outcome(audit_res)
+                counts[result] += 1
+                retried += bool(audit_res.get('Retries'))
+                print(f"[{done}/{len(tasks)}] {client}: {item['url']} -> {audit_res.get('Status_Code')} ({result})")
+        except KeyboardInterrupt:
+            print("Interrupted; writing what finished so far.", file=sys.stderr)
+        finally:
+            # Runs the generator's cleanup now (flush last_audit, finish the history run and
+            # metrics), so the summary and diff below see the whole run, not a GC-time one
+            audit.close()
+    if not report.rows:
+        os.remove(output)
+
+    not_run = len(tasks) - report.rows
+    print()
+    print("--- Summary ---")
+    print(f"Clients:   {len({t[0] for t in tasks})}")
+    print(f"Audited:   {counts['analyzed']} re-analyzed, {counts['unchanged']} unchanged (analysis skipped), {counts['failed']} failed")
+    if not_run:
+        reason = "no stored features, run a normal audit first" if args.rescore else "time budget / interrupted"
+        print(f"Not run:   {not_run} ({reason})")
+    print(f"Elapsed:   {time.monotonic() - started:.1f}s")
+    if analyzer.cache:
+        s = analyzer.cache.stats
+        print(f"Fetches:   {s['network']} network, {s['revalidated']} revalidated, {s['cache']} from cache")
+    s = scheduler.stats
+    print(f"Retries:   {s['retries']} ({retried} URLs needed at least one), {s['throttled']} throttled responses")
+    if metrics and metrics.pages:
+        url_ms = metrics.summary()['url_ms']
+        print(f"Speed:     {metrics.pages_per_sec:.1f} pages/s, per URL p50 {url_ms['p50']} ms, "
+              f"p95 {url_ms['p95']} ms, p99 {url_ms['p99']} ms, {metrics.bytes / 1048576:.1f} MB downloaded")
+        slowest = metrics.slowest_phase()
+        print(f"Slowest:   {slowest['phase']} phase ({slowest['share']:.0%} of URL time, p95 {slowest['p95_ms']} ms)")
+        for path in args.metrics:
+            metrics.write(path)
+            print(f"Metrics:   {path}")
+    if renderer:
+        print(f"Rendered:  {renderer.stats['rendered']} pages in the browser, {renderer.stats['failed']} renders failed")
+    print(f"Report:    {output if report.rows else '(nothing to write)'}")
+    if history and report.rows:
+        for client in sorted({t[0] for t in tasks}):
+            if len(history.runs(client, limit=2)) < 2:
+                print(f"Changes:   {client}: first recorded run")
+                continue
+            changes = list(history.diff(client))
+            gained = sum(1 for c in changes if c['gained'])
+            lost = sum(1 for c in changes if c['lost'])
+            print(f"Changes:   {client}: {gained} URLs gained issues, {lost} lost issues since the previous run")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
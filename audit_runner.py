@@ -0,0 +1,152 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from analyzer import FETCH_FIELDS
+from rules import rule_set
+
+EXECUTORS = ("thread", "process")
+# How each audited URL went (see outcome())
+OUTCOMES = ("analyzed", "unchanged", "failed")
+
+
+def collect_tasks(data, clients=None):
+    """
+    Flattens load_data() output into (client, url_index, item) audit tasks.
+    clients: optional collection of client names to keep (None = every client).
+    """
+    tasks = []
+    for client, urls in data.items():
+        if clients is not None and client not in clients:
+            continue
+        for url_idx, item in enumerate(urls):
+            tasks.append((client, url_idx, item))
+    return tasks
+
+
+def task_rules(dm, tasks):
+    """
+    {task_index: rules.RuleSet} for tasks whose client has its own rule profile (the others
+    use the analyzer's rules). Raises ValueError if a stored profile is no longer valid.
+    """
+    profiles = dm.load_profiles()
+    compiled = {}
+    for client, profile in profiles.items():
+        try:
+            compiled[client] = rule_set(profile)
+        except ValueError as e:
+            raise ValueError(f"Rule profile of client {client}: {e}") from None
+    return {idx: compiled[client] for idx, (client, url_idx, item) in enumerate(tasks) if client in compiled}
+
+
+def outcome(audit_res):
+    """"failed" (fetch / analysis error), "unchanged" (previous analysis reused) or "analyzed" (incl. re-scored)."""
+    if audit_res.get('Status_Code') != 200:
+        return "failed"
+    return "unchanged" if audit_res.get('Analysis') == "Reused" else "analyzed"
+
+
+def run_audit(dm, analyzer, tasks, concurrency=8, per_host=4, executor="thread", workers=None, time_budget=None,
+              incremental=True, history=None, metrics=None, client_profiles=True):
+    """
+    Audits (client, url_index, item) tasks and yields (task_index, audit_result) as each URL
+    finishes, writing `last_audit` for every audited URL (batched, flushed even if the run
+    is interrupted).
+
+    executor: "thread" fetches and analyzes in the analyzer's threads; "process" fetches in
+    threads and analyzes in `workers` processes (default: one per CPU core).
+    time_budget: seconds; once spent no new URL is started (those are never yielded).
+    incremental: pages whose content fingerprint and keywords match the last audit reuse its
+    analysis instead of being parsed again (still fetched, to tell whether they changed).
+    history: optional HistoryStore; every yielded result is appended to it as one run.
+    metrics: optional metrics.RunMetrics; every yielded result's timings are added to it
+    (finished when the run ends).
+    client_profiles: check each client's URLs with its stored rule profile; False runs the
+    analyzer's rules for everyone.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor: {executor} (choose from {', '.join(EXECUTORS)})")
+    if executor == "process":
+        workers = workers or os.cpu_count() or 1
+    else:
+        workers = 0
+    deadline = time.monotonic() + time_budget if time_budget else None
+    rules = task_rules(dm, tasks) if client_profiles else {}
+    previous = {}
+    if incremental:
+        state = dm.load_audit_state()
+        previous = {
+            idx: state[(client, item['url'])]
+            for idx, (client, url_idx, item) in enumerate(tasks) if (client, item['url']) in state
+        }
+
+    jobs = (
+        (idx, item['url'], item['primary_keyword'], item['secondary_keywords'])
+        for idx, (client, url_idx, item) in enumerate(tasks)
+    )
+    try:
+        with dm.batch(), _history_run(history, "audit") as record:
+            for idx, audit_res in analyzer.analyze_many(
+                jobs, concurrency=concurrency, per_host=per_host, workers=workers, deadline=deadline, previous=previous,
+                rules=rules,
+            ):
+                if audit_res is None:
+                    continue  # skipped: time budget
+                client, url_idx, item = tasks[idx]
+                dm.update_url_status(client, url_idx, "last_audit", datetime.now().strftime("%Y-%m-%d %H:%M"))
+                _save_state(dm, analyzer, client, url_idx, item, audit_res, rules.get(idx))
+                record(client, item['url'], audit_res)
+                if metrics is not None:
+                    metrics.observe(item['url'], audit_res, outcome(audit_res))
+                yield idx, audit_res
+    finally:
+        if metrics is not None:
+            metrics.finish()
+
+
+def rescore_audit(dm, analyzer, tasks, history=None, client_profiles=True):
+    """
+    Re-runs the keyword checks for (client, url_index, item) tasks from the analyzer's feature
+    store, with each item's current keywords: no fetching, no parsing. Yields
+    (task_index, audit_result) for every URL with stored features; URLs never audited
+    before are not yielded. last_audit is left alone (the pages weren't re-checked).
+    history: optional HistoryStore, as in run_audit (recorded as a "rescore" run).
+    client_profiles: as in run_audit. URLs stored with fewer page features than their rules
+    need (e.g. audited with a meta-only profile) are not yielded either.
+    """
+    rules = task_rules(dm, tasks) if client_profiles else {}
+    jobs = (
+        (idx, item['url'], item['primary_keyword'], item['secondary_keywords'])
+        for idx, (client, url_idx, item) in enumerate(tasks)
+    )
+    with dm.batch(), _history_run(history, "rescore") as record:
+        for idx, audit_res in analyzer.rescore_many(jobs, rules=rules):
+            if audit_res is None:
+                continue
+            client, url_idx, item = tasks[idx]
+            _save_state(dm, analyzer, client, url_idx, item, audit_res, rules.get(idx))
+            record(client, item['url'], audit_res)
+            yield idx, audit_res
+
+
+def _save_state(dm, analyzer, client, url_idx, item, audit_res, rules=None):
+    # Remember the analysis for incremental audits (the fingerprint isn't a report column)
+    fingerprint = audit_res.pop('Content_Fingerprint', None)
+    if fingerprint and outcome(audit_res) == "analyzed":
+        analysis = {k: v for k, v in audit_res.items() if k not in FETCH_FIELDS}
+        key = analyzer.analysis_key(item['primary_keyword'], item['secondary_keywords'], rules)
+        dm.save_audit_state(client, url_idx, fingerprint, key, analysis)
+
+
+@contextmanager
+def _history_run(history, mode):
+    """Yields record(client, url, audit_res) for one history run (a no-op without a store)."""
+    if history is None:
+        yield lambda client, url, audit_res: None
+        return
+    run_id = history.start_run(mode)
+    try:
+        yield lambda client, url, audit_res: history.add(run_id, client, url, audit_res)
+    finally:
+        history.finish_run(run_id)
@@ -0,0 +1,252 @@
+"""
+Offline micro-benchmark of the analysis path (no network): runs the parse stage
+(extract_page) and the keyword stage (score_page) over the fixture corpus for every
+installed parser backend and keyword match mode, and reports per-page stage times,
+pages/sec and peak memory. Results are compared with a stored baseline; anything that got
+slower (or bigger) than the tolerance allows is flagged and the exit status is 1.
+
+    python benchmark.py                      # run and compare with fixtures/benchmark_baseline.json
+    python benchmark.py --save-baseline      # record this run as the new baseline
+    python benchmark.py --parser lxml --min-time 2
+
+Timings are the best of several rounds, scaled by a fixed pure-Python calibration loop, so a
+baseline recorded on one machine is still a fair reference on a faster or slower one.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from analyzer import extract_page, score_page
+from keyword_matcher import MATCH_MODES
+from page_features import available_backends
+from verify_fixtures import FIXTURES_DIR, load_corpus
+
+BASELINE_FILE = os.path.join(FIXTURES_DIR, "benchmark_baseline.json")
+# Differences below this are timer noise, whatever the percentage
+MIN_DELTA_MS = 0.05
+
+
+def _calibrate(min_time=0.5):
+    """Seconds for a fixed string/dict/sort workload (best run): this machine's speed."""
+    def workload():
+        words = [f"word{i % 997}" for i in range(20000)]
+        counts = {}
+        for w in words:
+            counts[w] = counts.get(w, 0) + 1
+        " ".join(sorted(words)).lower().split()
+
+    return _time(workload, min_time)
+
+
+def _time(fn, min_time):
+    """
+    Fastest call of fn(), called until min_time has passed (at least 5 calls). The minimum,
+    not the mean: anything slower than it is interference from the rest of the machine.
+    """
+    best, calls = float("inf"), 0
+    deadline = time.perf_counter() + min_time
+    while calls < 5 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+        calls += 1
+    return best
+
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(parsers, keyword_modes, min_time=0.5, rounds=3):
+    """
+    Measures everything `rounds` times, min_time / rounds seconds per measurement each time,
+    and keeps the best of every measurement: a slow stretch of a shared machine then costs
+    one round, not the result.
+    """
+    result = None
+    for _ in range(rounds):
+        run = _run_once(parsers, keyword_modes, min_time / rounds)
+        result = run if result is None else best_of(result, run)
+    return result
+
+
+def _run_once(parsers, keyword_modes, min_time):
+    corpus = load_corpus()
+    first_calibration = _calibrate(min_time)
+    result = {
+        "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "pages": {},
+        "corpus": {},
+        "keyword_modes": {},
+    }
+
+    for parser in parsers:
+        total = 0.0
+        for entry in corpus:
+            url, body = entry["url"], entry["content"]
+            pk, sks = entry["primary_keyword"], entry["secondary_keywords"]
+            page = extract_page(url, body, parser)
+            parse = _time(lambda: extract_page(url, body, parser), min_time)
+            score = _time(lambda: score_page(url, page, pk, sks), min_time)
+            peak = _peak_kb(lambda: score_page(url, extract_page(url, body, parser), pk, sks))
+            result["pages"][f"{entry['name']} [{parser}]"] = {
+                "bytes": len(body),
+                "parse_ms": round(parse * 1000, 3),
+                "score_ms": round(score * 1000, 3),
+                "peak_kb": peak,
+            }
+            total += parse + score
+        result["corpus"][parser] = {"pages_per_sec": round(len(corpus) / total, 1), "ms_per_pass": round(total * 1000, 3)}
+
+    # Keyword engine on its own: every page's stored record re-scored (what --rescore does)
+    pages = [(entry, extract_page(entry["url"], entry["content"])) for entry in corpus]
+    for mode in keyword_modes:
+        def score_all():
+            for entry, page in pages:
+                score_page(entry["url"], page, entry["primary_keyword"], entry["secondary_keywords"], mode)
+        result["keyword_modes"][mode] = {"score_ms": round(_time(score_all, min_time) * 1000, 3)}
+
+    # Calibrated before and after the measurements: the first pass often runs on a cold CPU
+    result["calibration_s"] = min(first_calibration, _calibrate(min_time))
+    return result
+
+
+def best_of(a, b):
+    """Merges two runs, keeping the better value of every measurement."""
+    merged = dict(a, calibration_s=min(a["calibration_s"], b["calibration_s"]))
+    for section in ("pages", "corpus", "keyword_modes"):
+        merged[section] = {}
+        for name, stats in a[section].items():
+            other = b[section].get(name, stats)
+            merged[section][name] = {
+                key: (max if key == "pages_per_sec" else min)(value, other.get(key, value)) if key != "bytes" else value
+                for key, value in stats.items()
+            }
+    return merged
+
+
+def compare(result, baseline, tolerance):
+    """
+    Prints current vs baseline for every measurement both runs have; returns the regressions.
+    Times are compared after scaling by each run's calibration.
+    """
+    scale = baseline["calibration_s"] / result["calibration_s"]
+    regressions = []
+
+    def check(label, current, base, kind):
+        """kind: "ms" (time, scaled), "KB" (memory) or "pages/s" (throughput, scaled; higher is better)"""
+        if base is None:
+            print(f"   {label}: {current} {kind} (new)")
+            return
+        adjusted = {"ms": current * scale, "KB": current, "pages/s": current / scale}[kind]
+        change = (adjusted - base) / base if base else 0.0
+        if kind == "pages/s":
+            change = -change  # from here on, positive = worse
+        worse = change > tolerance and not (kind == "ms" and abs(adjusted - base) < MIN_DELTA_MS)
+        icon = "❌" if worse else ("🚀" if change < -tolerance else "✅")
+        print(f"{icon} {label}: {current} {kind} (baseline {base}, {change:+.0%} {'slower' if kind != 'KB' else 'larger'} adjusted)")
+        if worse:
+            regressions.append(label)
+
+    for name, page in result["pages"].items():
+        base = baseline["pages"].get(name, {})
+        check(f"{name} parse", page["parse_ms"], base.get("parse_ms"), "ms")
+        check(f"{name} score", page["score_ms"], base.get("score_ms"), "ms")
+        check(f"{name} peak memory", page["peak_kb"], base.get("peak_kb"), "KB")
+    for parser, corpus in result["corpus"].items():
+        base = baseline["corpus"].get(parser, {})
+        check(f"corpus [{parser}]", corpus["pages_per_sec"], base.get("pages_per_sec"), "pages/s")
+    for mode, stats in result["keyword_modes"].items():
+        base = baseline["keyword_modes"].get(mode, {})
+        check(f"keyword mode {mode} (whole corpus)", stats["score_ms"], base.get("score_ms"), "ms")
+    return regressions
+
+
+def _regressions_quietly(result, baseline, tolerance):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return compare(result, baseline, tolerance)
+
+
+def print_result(result):
+    print(f"{'page':<36} {'size':>9} {'parse ms':>10} {'score ms':>10} {'peak KB':>10}")
+    for name, page in result["pages"].items():
+        print(f"{name:<36} {page['bytes']:>9} {page['parse_ms']:>10} {page['score_ms']:>10} {page['peak_kb']:>10}")
+    for parser, corpus in result["corpus"].items():
+        print(f"corpus [{parser}]: {corpus['pages_per_sec']} pages/s ({corpus['ms_per_pass']} ms per pass)")
+    for mode, stats in result["keyword_modes"].items():
+        print(f"keyword mode {mode}: {stats['score_ms']} ms to re-score the corpus")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the parse + keyword stages over the fixture corpus.")
+    parser.add_argument("--parser", action="append", dest="parsers", metavar="NAME",
+                        help="Parser backend to benchmark (repeatable; default: every installed backend)")
+    parser.add_argument("--keyword-mode", action="append", dest="keyword_modes", choices=MATCH_MODES,
+                        help="Keyword match mode to benchmark (repeatable; default: all)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to repeat each measurement for (default: 0.5)")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Passes over the corpus, keeping each measurement's best (default: 3)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline file (default: fixtures/benchmark_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run to the baseline file instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.4,
+                        help="Allowed slowdown before a measurement counts as a regression (default: 0.4 = 40%%)")
+    parser.add_argument("--json", metavar="PATH", help="Also write this run's results as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    parsers = args.parsers or available_backends()
+    missing = [p for p in parsers if p not in available_backends()]
+    if missing:
+        print(f"Parser backend(s) not installed: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    print(f"Benchmarking {', '.join(parsers)} over the fixture corpus (min {args.min_time}s per measurement)...")
+    result = run_benchmark(parsers, args.keyword_modes or MATCH_MODES, args.min_time, args.rounds)
+    print_result(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if _regressions_quietly(result, baseline, args.tolerance):
+        # A one-off slow stretch of the machine looks just like a regression: measure again and
+        # only report what is slow in both runs
+        print("\nPossible regressions; measuring again to confirm...")
+        result = best_of(result, run_benchmark(parsers, args.keyword_modes or MATCH_MODES, args.min_time, args.rounds))
+    print(f"\nCompared with the baseline recorded {baseline['recorded_at']} (tolerance {args.tolerance:.0%}):")
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,278 @@
 import json
 import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+DB_FILE = "clients_data.db"
+# Legacy storage: migrated into the database once, still used for import/export
 DATA_FILE = "clients_data.json"
 
+# Columns of the urls table; any other field on a URL entry is kept in `extra` (JSON)
+URL_FIELDS = ("url", "primary_keyword", "status", "priority", "last_audit", "notes")
+URL_DEFAULTS = {
+    "primary_keyword": "",
+    "status": "Pending",
+    "priority": "Medium",
+    "last_audit": "Never",
+    "notes": "",
+}
+
+# Choices offered for the workflow fields in the dashboard
+PRIORITIES = ("High", "Medium", "Low")
+STATUSES = ("Pending", "In Progress", "Optimized", "Review")
+
+
+_URL_PLACEHOLDERS = ", ".join("?" * (len(URL_FIELDS) + 3))
+
+# Pseudo-field for buffering save_audit_state() next to ordinary field updates
+_AUDIT_STATE = "__audit_state__"
+
+
+def _url_values(url_data):
+    """Column values for a url_data dict: URL_FIELDS, then the JSON `extra` blob"""
+    values = [url_data.get(f, URL_DEFAULTS.get(f, "")) for f in URL_FIELDS]
+    extra = {k: v for k, v in url_data.items() if k not in URL_FIELDS and k != "secondary_keywords"}
+    return (*values, json.dumps(extra))
+
+
+def _data_rows(data):
+    """{client_name: [url_data, ...]} -> (client_name, url_data) rows for import_rows()"""
+    for client_name, urls in data.items():
+        yield client_name, None  # clients without URLs still exist
+        for url_data in urls:
+            yield client_name, url_data
+
+
 class DataManager:
-    def __init__(self):
-        self.file_path = DATA_FILE
-        self._ensure_file_exists()
+    """
+    Client / URL / keyword storage (SQLite, WAL mode).
+    Same API as the old JSON file store: load_data() still returns
+    {client_name: [url_data, ...]} and URLs are addressed by their index within a client,
+    but single-field updates now touch one row instead of rewriting everything.
+    """
 
-    def _ensure_file_exists(self):
-        if not os.path.exists(self.file_path):
-            self.save_data({}) # Initialize with empty dict
+    def __init__(self, db_path=DB_FILE, json_path=DATA_FILE):
+        self.db_path = db_path
+        self.json_path = json_path
+        # Per thread: the connection, and the write-behind buffer of a batch() block. One
+        # instance can be shared by threads (e.g. every Streamlit session) running their own batches
+        self._local = threading.local()
+        self._create_schema()
+        self._migrate_json()
 
-    def load_data(self):
+    def _conn(self):
+        # One connection per thread (Streamlit runs every session on its own thread)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two sessions can't interleave
+        # a read-check-write (e.g. the duplicate URL check) and clobber each other
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
+            yield conn
+            # Every write moves the storage version on (see storage_version)
+            conn.execute(
+                "INSERT INTO meta VALUES ('version', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _create_schema(self):
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clients (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    profile TEXT
+                )
+            """)
+            # Databases created before rule profiles existed
+            if "profile" not in {row[1] for row in conn.execute("PRAGMA table_info(clients)")}:
+                conn.execute("ALTER TABLE clients ADD COLUMN profile TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    id INTEGER PRIMARY KEY,
+                    client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    primary_keyword TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL DEFAULT 'Pending',
+                    priority TEXT NOT NULL DEFAULT 'Medium',
+                    last_audit TEXT NOT NULL DEFAULT 'Never',
+                    notes TEXT NOT NULL DEFAULT '',
+                    extra TEXT NOT NULL DEFAULT '{}',
+                    UNIQUE (client_id, url)
+                )
+            """)
+            # Databases from before positions were kept dense (0..n-1 per client) and unique
+            if any(name == "idx_urls_client_position" and not unique
+                   for _, name, unique, *_ in conn.execute("PRAGMA index_list(urls)")):
+                for (client_id,) in conn.execute("SELECT id FROM clients").fetchall():
+                    self._close_gaps(conn, client_id)
+                conn.execute("DROP INDEX idx_urls_client_position")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_urls_client_position ON urls(client_id, position)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS keywords (
+                    url_id INTEGER NOT NULL REFERENCES urls(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    keyword TEXT NOT NULL,
+                    PRIMARY KEY (url_id, position)
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Last successful analysis per URL, for incremental audits (see save_audit_state)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_state (
+                    url_id INTEGER PRIMARY KEY REFERENCES urls(id) ON DELETE CASCADE,
+                    fingerprint TEXT NOT NULL,
+                    analysis_key TEXT NOT NULL,
+                    analysis TEXT NOT NULL
+                )
+            """)
+
+    def _migrate_json(self):
+        """One-shot import of the old clients_data.json (the file itself is left in place)"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        if os.path.exists(self.json_path) and not conn.execute("SELECT 1 FROM clients LIMIT 1").fetchone():
+            self.import_json(self.json_path, replace=False)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M"),),
+            )
+
+    # --- Reads ---
+    def load_data(self):
+        self.flush()  # reads always see buffered updates
+        conn = self._conn()
+        data = {}
+        client_names = {}
+        for client_id, name in conn.execute("SELECT id, name FROM clients ORDER BY id"):
+            data[name] = []
+            client_names[client_id] = name
 
+        keywords = {}
+        for url_id, keyword in conn.execute("SELECT url_id, keyword FROM keywords ORDER BY url_id, position"):
+            keywords.setdefault(url_id, []).append(keyword)
+
+        rows = conn.execute(
+            f"SELECT id, client_id, {', '.join(URL_FIELDS)}, extra FROM urls ORDER BY client_id, position"
+        )
+        for row in rows:
+            url_id, client_id = row[0], row[1]
+            fields = dict(zip(URL_FIELDS, row[2:-1]))
+            # Same key order as the old JSON entries
+            item = {"url": fields.pop("url"), "primary_keyword": fields.pop("primary_keyword")}
+            item["secondary_keywords"] = keywords.get(url_id, [])
+            item.update(fields)
+            item.update(json.loads(row[-1]))
+            data[client_names[client_id]].append(item)
+        return data
+
+    def storage_version(self):
+        """
+        A number that changes whenever anything is written (from any process), so callers can
+        cache load_data() and reload only when it moves.
+        """
+        self.flush()
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def load_audit_state(self):
+        """
+        {(client_name, url): (fingerprint, analysis_key, analysis)} for every URL with a stored
+        analysis: the body fingerprint and keyword signature it was computed from, and the
+        analysis fields themselves.
+        """
+        self.flush()
+        rows = self._conn().execute("""
+            SELECT clients.name, urls.url, s.fingerprint, s.analysis_key, s.analysis
+            FROM audit_state s JOIN urls ON urls.id = s.url_id JOIN clients ON clients.id = urls.client_id
+        """)
+        return {(name, url): (fingerprint, key, json.loads(analysis)) for name, url, fingerprint, key, analysis in rows}
+
+    def load_profiles(self):
+        """{client_name: rule profile} for every client with its own (see rules.rule_set)"""
+        rows = self._conn().execute("SELECT name, profile FROM clients WHERE profile IS NOT NULL")
+        return {name: json.loads(profile) for name, profile in rows}
+
+    def get_client_profile(self, client_name):
+        """The client's rule profile (a profile name or customization dict), or None for the default"""
+        row = self._conn().execute("SELECT profile FROM clients WHERE name = ?", (client_name,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def _client_id(self, conn, client_name):
+        row = conn.execute("SELECT id FROM clients WHERE name = ?", (client_name,)).fetchone()
+        return row[0] if row else None
+
+    def _url_id(self, conn, client_name, url_index):
+        """Row id of the url_index-th URL of a client (None if out of range)"""
+        # Positions are dense, so the index is the position (one index lookup)
+        row = conn.execute(
+            """
+            SELECT urls.id FROM urls JOIN clients ON clients.id = urls.client_id
+            WHERE clients.name = ? AND urls.position = ?
+            """,
+            (client_name, url_index),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _close_gaps(self, conn, client_id):
+        """Renumbers a client's URL positions to 0..n-1 (same order) after deletes"""
+        rows = conn.execute(
+            "SELECT id, position FROM urls WHERE client_id = ? ORDER BY position, id", (client_id,)
+        ).fetchall()
+        # Positions only move down, so renumbering in order never collides with the unique index
+        conn.executemany(
+            "UPDATE urls SET position = ? WHERE id = ?",
+            [(index, url_id) for index, (url_id, position) in enumerate(rows) if index != position],
+        )
+
+    # --- Writes ---
     def save_data(self, data):
-        with open(self.file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        """Replaces everything with `data` ({client_name: [url_data, ...]})"""
+        self.import_rows(_data_rows(data), replace=True)
+
+    def _insert_url(self, conn, client_id, url_data):
+        """Returns False if the client already has this URL"""
+        if conn.execute("SELECT 1 FROM urls WHERE client_id = ? AND url = ?", (client_id, url_data["url"])).fetchone():
+            return False
+        position = conn.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM urls WHERE client_id = ?", (client_id,)
+        ).fetchone()[0]
+        url_id = conn.execute(
+            f"INSERT INTO urls (client_id, position, {', '.join(URL_FIELDS)}, extra) VALUES ({_URL_PLACEHOLDERS})",
+            (client_id, position, *_url_values(url_data)),
+        ).lastrowid
+        self._set_keywords(conn, url_id, url_data.get("secondary_keywords", []))
+        return True
+
+    def _set_keywords(self, conn, url_id, keywords):
+        conn.execute("DELETE FROM keywords WHERE url_id = ?", (url_id,))
+        conn.executemany(
+            "INSERT INTO keywords (url_id, position, keyword) VALUES (?, ?, ?)",
+            [(url_id, i, kw) for i, kw in enumerate(keywords)],
+        )
 
     def add_client(self, client_name):
-        data = self.load_data()
-        if client_name not in data:
-            data[client_name] = []
-            self.save_data(data)
-            return True
-        return False
+        with self._transaction() as conn:
+            return conn.execute("INSERT OR IGNORE INTO clients (name) VALUES (?)", (client_name,)).rowcount == 1
 
     def add_url(self, client_name, url_data):
         """
@@ -45,36 +287,226 @@ class DataManager:
             "notes": ""
         }
         """
-        data = self.load_data()
-        if client_name in data:
-            # Check for duplicate URL
-            if any(item['url'] == url_data['url'] for item in data[client_name]):
+        with self._transaction() as conn:
+            client_id = self._client_id(conn, client_name)
+            if client_id is None:
                 return False
-            data[client_name].append(url_data)
-            self.save_data(data)
-            return True
-        return False
-    
+            # Duplicate URLs are rejected (UNIQUE (client_id, url))
+            return self._insert_url(conn, client_id, url_data)
+
+    def set_client_profile(self, client_name, profile):
+        """Stores the client's rule profile (validate it with rules.rule_set first); None resets it"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE clients SET profile = ? WHERE name = ?",
+                (None if profile is None else json.dumps(profile), client_name),
+            ).rowcount == 1
+
     def update_url_status(self, client_name, url_index, field, value):
-        data = self.load_data()
-        if client_name in data and 0 <= url_index < len(data[client_name]):
-            data[client_name][url_index][field] = value
-            self.save_data(data)
+        url_id = self._url_id(self._conn(), client_name, url_index)
+        if url_id is None:
+            return False
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            self._buffer_update(batch, url_id, field, value)
             return True
-        return False
+        with self._transaction() as conn:
+            self._apply_update(conn, url_id, field, value)
+        return True
 
-    def remove_client(self, client_name):
-        data = self.load_data()
-        if client_name in data:
-            del data[client_name]
-            self.save_data(data)
+    def save_audit_state(self, client_name, url_index, fingerprint, analysis_key, analysis):
+        """Stores a URL's latest analysis (buffered like update_url_status inside batch())"""
+        url_id = self._url_id(self._conn(), client_name, url_index)
+        if url_id is None:
+            return False
+        value = (fingerprint, analysis_key, json.dumps(analysis))
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            self._buffer_update(batch, url_id, _AUDIT_STATE, value)
             return True
-        return False
+        with self._transaction() as conn:
+            self._apply_update(conn, url_id, _AUDIT_STATE, value)
+        return True
+
+    def _apply_update(self, conn, url_id, field, value):
+        if field == _AUDIT_STATE:
+            conn.execute("INSERT OR REPLACE INTO audit_state VALUES (?, ?, ?, ?)", (url_id, *value))
+        elif field in URL_FIELDS:
+            conn.execute(f"UPDATE urls SET {field} = ? WHERE id = ?", (value, url_id))
+        elif field == "secondary_keywords":
+            self._set_keywords(conn, url_id, value)
+        else:
+            conn.execute(
+                "UPDATE urls SET extra = json_set(extra, ?, json(?)) WHERE id = ?",
+                (f'$."{field}"', json.dumps(value), url_id),
+            )
+
+    def bulk_update(self, updates):
+        """
+        Applies many (client_name, url_index, field, value) updates in one transaction.
+        Returns how many of them matched a URL.
+        """
+        conn = self._conn()
+        resolved = []
+        for client_name, url_index, field, value in updates:
+            url_id = self._url_id(conn, client_name, url_index)
+            if url_id is not None:
+                resolved.append((url_id, field, value))
+        if resolved:
+            with self._transaction() as conn:
+                for url_id, field, value in resolved:
+                    self._apply_update(conn, url_id, field, value)
+        return len(resolved)
+
+    def save_edits(self, client_name, updates, removals=()):
+        """
+        Applies a batch of edits to one client's URLs in a single transaction (all or nothing):
+        `updates` is {url: {field: value}}, `removals` the URLs to delete. URLs are addressed
+        by address rather than index, so edits made against an older load_data() still land
+        on the right rows; URLs that are gone by now are skipped.
+        Returns (updated, removed) URL counts.
+        """
+        self.flush()
+        removals = set(removals)
+        with self._transaction() as conn:
+            client_id = self._client_id(conn, client_name)
+            if client_id is None:
+                return 0, 0
+            url_ids = dict(conn.execute("SELECT url, id FROM urls WHERE client_id = ?", (client_id,)))
+            updated = 0
+            for url, fields in updates.items():
+                url_id = url_ids.get(url)
+                if url_id is None or url in removals:
+                    continue
+                for field, value in fields.items():
+                    self._apply_update(conn, url_id, field, value)
+                updated += 1
+            removed = [(url_ids[url],) for url in removals if url in url_ids]
+            conn.executemany("DELETE FROM urls WHERE id = ?", removed)
+            if removed:
+                self._close_gaps(conn, client_id)
+        return updated, len(removed)
+
+    # --- Write-behind batching (audit runs) ---
+    @contextmanager
+    def batch(self, flush_every=50, flush_interval=5.0):
+        """
+        Buffers update_url_status() calls and writes them in one transaction every
+        `flush_every` updates or `flush_interval` seconds. Whatever is left is flushed
+        when the block exits, including on errors or when the run is stopped.
+        The buffer belongs to the calling thread: batches in other threads are independent.
+
+            with dm.batch():
+                for ...:
+                    dm.update_url_status(client, idx, "last_audit", now_str)
+        """
+        if getattr(self._local, "batch", None) is not None:
+            yield self  # already batching: the outer block flushes
+            return
+        self._local.batch = {
+            "every": flush_every, "interval": flush_interval, "last_flush": time.monotonic(), "pending": [],
+        }
+        try:
+            yield self
+        finally:
+            try:
+                self.flush()
+            finally:
+                self._local.batch = None
+
+    def _buffer_update(self, batch, url_id, field, value):
+        # URLs are buffered by row id, so later removals can't shift updates onto the wrong URL
+        batch["pending"].append((url_id, field, value))
+        if len(batch["pending"]) >= batch["every"] or time.monotonic() - batch["last_flush"] >= batch["interval"]:
+            self.flush()
+
+    def flush(self):
+        """Writes this thread's buffered updates now"""
+        batch = getattr(self._local, "batch", None)
+        if batch is None or not batch["pending"]:
+            return
+        pending, batch["pending"] = batch["pending"], []
+        batch["last_flush"] = time.monotonic()
+        with self._transaction() as conn:
+            for url_id, field, value in pending:
+                self._apply_update(conn, url_id, field, value)
+
+    def remove_client(self, client_name):
+        with self._transaction() as conn:
+            # urls and keywords go with it (ON DELETE CASCADE)
+            return conn.execute("DELETE FROM clients WHERE name = ?", (client_name,)).rowcount == 1
 
     def remove_url(self, client_name, url_index):
-        data = self.load_data()
-        if client_name in data and 0 <= url_index < len(data[client_name]):
-            data[client_name].pop(url_index)
-            self.save_data(data)
+        with self._transaction() as conn:
+            url_id = self._url_id(conn, client_name, url_index)
+            if url_id is None:
+                return False
+            conn.execute("DELETE FROM urls WHERE id = ?", (url_id,))
+            self._close_gaps(conn, self._client_id(conn, client_name))
             return True
-        return False
+
+    # --- Bulk import ---
+    def import_rows(self, rows, replace=False, chunk_size=1000):
+        """
+        Imports an iterable of (client_name, url_data) pairs in a single transaction.
+        url_data may be None to only create the client. Duplicate URLs (already stored or
+        repeated in `rows`) are skipped via a hash set; rows are consumed lazily and written
+        in chunks, so a streamed sheet never has to be held in memory.
+        replace=True wipes existing data first (rolled back too if the import fails).
+        Returns (new_clients, new_urls).
+        """
+        new_clients = new_urls = 0
+        with self._transaction() as conn:
+            if replace:
+                conn.execute("DELETE FROM clients")
+            client_ids = dict(conn.execute("SELECT name, id FROM clients"))
+            next_position = dict(conn.execute("SELECT client_id, MAX(position) + 1 FROM urls GROUP BY client_id"))
+            seen = set(conn.execute("SELECT client_id, url FROM urls"))
+            # We hold the write lock, so row ids can be assigned up front (needed for the keyword rows)
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM urls").fetchone()[0]
+            url_rows, keyword_rows = [], []
+
+            for client_name, url_data in rows:
+                client_id = client_ids.get(client_name)
+                if client_id is None:
+                    client_id = conn.execute("INSERT INTO clients (name) VALUES (?)", (client_name,)).lastrowid
+                    client_ids[client_name] = client_id
+                    new_clients += 1
+                if url_data is None or (client_id, url_data["url"]) in seen:
+                    continue
+                seen.add((client_id, url_data["url"]))
+
+                position = next_position.get(client_id, 0)
+                next_position[client_id] = position + 1
+                url_rows.append((next_id, client_id, position, *_url_values(url_data)))
+                keyword_rows.extend((next_id, i, kw) for i, kw in enumerate(url_data.get("secondary_keywords", [])))
+                next_id += 1
+                new_urls += 1
+                if len(url_rows) >= chunk_size:
+                    self._write_url_rows(conn, url_rows, keyword_rows)
+                    url_rows, keyword_rows = [], []
+
+            self._write_url_rows(conn, url_rows, keyword_rows)
+        return new_clients, new_urls
+
+    def _write_url_rows(self, conn, url_rows, keyword_rows):
+        conn.executemany(
+            f"INSERT INTO urls (id, client_id, position, {', '.join(URL_FIELDS)}, extra) VALUES (?, {_URL_PLACEHOLDERS})",
+            url_rows,
+        )
+        conn.executemany("INSERT INTO keywords (url_id, position, keyword) VALUES (?, ?, ?)", keyword_rows)
+
+    # --- JSON import / export (portability, backups) ---
+    def import_json(self, path=DATA_FILE, replace=True):
+        """Loads a clients_data.json-style file. replace=False merges (existing URLs are kept)."""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return False
+        self.import_rows(_data_rows(data), replace=replace)
+        return True
+
+    def export_json(self, path=DATA_FILE):
+        with open(path, 'w') as f:
+            json.dump(self.load_data(), f, indent=4)
@@ -0,0 +1,87 @@
+from openpyxl import load_workbook
+
+# Sheet layout (see the template offered in the sidebar)
+CLIENT_COLUMN = "Client_ID"
+URL_COLUMN = "Target_URL"
+PRIMARY_COLUMN = "Primary_Keyword"
+SECONDARY_MARKER = "Secondary_Keyword"  # any column containing this: Secondary_Keyword_1, _2, ...
+
+
+def _cell_text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _cell(row, i):
+    return _cell_text(row[i]) if i is not None and i < len(row) else ""
+
+
+def read_import_rows(file):
+    """
+    Streams (client_id, url_data) pairs out of an uploaded sheet, ready for
+    DataManager.import_rows(). .xlsx files are read in openpyxl's read-only mode, row by row,
+    so memory stays flat however big the sheet is; legacy .xls goes through pandas.
+    """
+    name = getattr(file, "name", "") or ""
+    if name.lower().endswith(".xls"):
+        yield from _rows_from_dataframe(file)
+        return
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [_cell_text(c) for c in header]
+        # Resolve column positions once instead of looking them up on every row
+        client_i, url_i, primary_i = (
+            columns.index(c) if c in columns else None for c in (CLIENT_COLUMN, URL_COLUMN, PRIMARY_COLUMN)
+        )
+        secondary_i = [i for i, c in enumerate(columns) if SECONDARY_MARKER in c]
+
+        for row in rows:
+            client_id = _cell(row, client_i)
+            if not client_id:
+                continue
+            secondary = [kw for kw in (_cell(row, i) for i in secondary_i) if kw]
+            yield client_id, _url_data(_cell(row, url_i), _cell(row, primary_i), secondary)
+    finally:
+        wb.close()
+
+
+def _rows_from_dataframe(file):
+    import pandas as pd
+
+    df = pd.read_excel(file)
+    df.columns = df.columns.astype(str).str.strip()
+    df = df[df[CLIENT_COLUMN].notna()] if CLIENT_COLUMN in df.columns else df.iloc[0:0]
+
+    def text_column(name):
+        if name not in df.columns:
+            return [""] * len(df)
+        # Blank cells are NaN here: same "" as on the openpyxl path, not "nan"
+        return [_cell_text(v) for v in df[name].astype(object).where(df[name].notna(), None)]
+
+    clients = text_column(CLIENT_COLUMN)
+    urls = text_column(URL_COLUMN)
+    primaries = text_column(PRIMARY_COLUMN)
+    # All secondary keyword columns at once: blanks/NaN dropped, everything else stripped
+    secondary_cols = [c for c in df.columns if SECONDARY_MARKER in c]
+    secondary = df[secondary_cols].astype(object).where(df[secondary_cols].notna(), None).to_numpy()
+
+    for client_id, url, primary, kws in zip(clients, urls, primaries, secondary):
+        if not client_id:
+            continue
+        yield client_id, _url_data(url, primary, [kw for kw in (_cell_text(v) for v in kws) if kw])
+
+
+def _url_data(url, primary_keyword, secondary_keywords):
+    return {
+        "url": url,
+        "primary_keyword": primary_keyword,
+        "secondary_keywords": secondary_keywords,
+        "status": "Pending",
+        "priority": "Medium",
+        "last_audit": "Never",
+        "notes": "",
+    }
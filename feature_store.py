@@ -0,0 +1,66 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from response_cache import normalize_url
+
+FEATURES_FILE = "page_features.db"
+
+
+class FeatureStore:
+    """
+    On-disk store of extracted page features (SQLite), keyed by normalized URL.
+    Each entry is the keyword-independent part of a page's analysis plus the text regions
+    keyword checks run over (see analyzer.extract_page), zlib-compressed JSON. That is
+    everything needed to re-score a page against new keywords without fetching or parsing it.
+    """
+
+    def __init__(self, path=FEATURES_FILE):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS features (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                data BLOB NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        # Same as ResponseCache: one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, url, fingerprint, page):
+        data = zlib.compress(json.dumps(page, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)",
+            (normalize_url(url), fingerprint, data, time.time()),
+        )
+        conn.commit()
+
+    def get(self, url):
+        """Returns (fingerprint, page) or None"""
+        row = self._conn().execute(
+            "SELECT fingerprint, data FROM features WHERE key = ?", (normalize_url(url),)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM features")
+        conn.commit()
@@ -0,0 +1,141 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+_DONE = object()
+
+
+class AsyncFetchEngine:
+    """
+    Runs blocking fetch/analyze jobs on an asyncio event loop so many URLs are in flight at once.
+    In-flight work is capped globally (`concurrency`) and per host (`per_host`).
+    """
+
+    def __init__(self, concurrency=16, per_host=4, max_buffered=None, max_pending=None):
+        """
+        max_buffered: cap on finished results waiting for the consumer. When the consumer
+        falls behind, finished jobs wait for room and no new jobs start (backpressure).
+        max_pending: jobs read from the input but not started yet. Reading ahead lets idle
+        slots go to other hosts when the input comes sorted by host (one client's URLs
+        after another's); the cap keeps memory flat for huge task lists.
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.per_host = max(1, int(per_host))
+        self.max_pending = max(1, int(max_pending or self.concurrency * 256))
+        self.max_buffered = max_buffered
+
+    def run(self, jobs):
+        """
+        jobs: iterable of (key, url, fn) where fn() does the blocking work for that url.
+        Yields (key, result) in completion order. Runs the event loop in a background
+        thread so it can be consumed from plain synchronous code (e.g. Streamlit).
+        """
+        out = queue.Queue(maxsize=self.max_buffered or 0)
+        stop = threading.Event()
+
+        worker = threading.Thread(target=self._thread_main, args=(jobs, out, stop), daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    break
+                key, result, error = item
+                if error is not None:
+                    raise error
+                yield key, result
+        finally:
+            # Consumer stopped early (finished, error or interrupted): stop scheduling new jobs
+            stop.set()
+
+    @staticmethod
+    def _put(out, item, stop):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _thread_main(self, jobs, out, stop):
+        try:
+            asyncio.run(self._main(jobs, out, stop))
+        except BaseException as e:
+            self._put(out, (None, None, e), stop)
+        finally:
+            # Gives up once the consumer has stopped reading (stop is set), so a full queue can't hang us
+            self._put(out, _DONE, stop)
+
+    async def _main(self, jobs, out, stop):
+        loop = asyncio.get_running_loop()
+        jobs = iter(jobs)
+        # Jobs not started yet, queued per host. Slots are handed to whichever host has room, so a long run of one host's URLs in the input
+        # can't hold the global slots idle behind its per-host limit.
+        waiting = {}
+        active = {}
+        running = {}
+        queued = 0
+        exhausted = False
+
+        async def run_job(key, fn):
+            try:
+                result = await loop.run_in_executor(executor, fn)
+            except Exception as e:
+                result, error = None, e
+            else:
+                error = None
+            if self.max_buffered:
+                # Blocking put off the event loop; the job keeps its slots until there's room
+                await loop.run_in_executor(None, self._put, out, (key, result, error), stop)
+            else:
+                out.put((key, result, error))
+
+        def start_ready():
+            nonlocal queued
+            started = True
+            # One job per host per pass, and a host that got one goes to the back, so hosts
+            # share the slots and drain together instead of one after another
+            while started and len(running) < self.concurrency:
+                started = False
+                for host in list(waiting):
+                    if len(running) >= self.concurrency:
+                        return
+                    if active.get(host, 0) >= self.per_host:
+                        continue
+                    host_jobs = waiting.pop(host)
+                    key, fn = host_jobs.popleft()
+                    queued -= 1
+                    active[host] = active.get(host, 0) + 1
+                    running[asyncio.ensure_future(run_job(key, fn))] = host
+                    if host_jobs:
+                        waiting[host] = host_jobs
+                    started = True
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                while queued < self.max_pending and not exhausted and not stop.is_set():
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    key, url, fn = job
+                    waiting.setdefault(urlparse(url).netloc.lower(), deque()).append((key, fn))
+                    queued += 1
+                    start_ready()
+                if stop.is_set():
+                    break
+                start_ready()
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    host = running.pop(task)
+                    active[host] -= 1
+                    if not active[host]:
+                        del active[host]
+                    task.result()
+            if running:
+                await asyncio.wait(running)
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import re
+
+# Tokens that change on every request without the page itself changing. They are blanked
+# out before hashing, so a page only counts as changed when its content does.
+_VOLATILE_PATTERNS = [
+    # CSRF / nonce values: <input name="csrf_token" value="...">, <meta name="csrf-token" content="...">
+    re.compile(
+        rb'''((?:name|id)\s*=\s*["']?[\w.\-]*(?:csrf|xsrf|token|nonce|authenticity)[\w.\-]*["']?[^>]*?\b(?:value|content)\s*=\s*)(["'])[^"']*\2''',
+        re.I,
+    ),
+    re.compile(
+        rb'''(\b(?:value|content)\s*=\s*)(["'])[^"']*\2(?=[^>]*?(?:name|id)\s*=\s*["']?[\w.\-]*(?:csrf|xsrf|token|nonce|authenticity))''',
+        re.I,
+    ),
+    # CSP nonces on script / style tags
+    re.compile(rb'''(\bnonce\s*=\s*)(["'])[^"']*\2''', re.I),
+    # Cache-busting query parameters on asset URLs (?v=1712345678, &_=..., ?ts=...)
+    re.compile(rb'''([?&](?:v|ver|version|t|ts|_|cb|cachebust|timestamp)=)[\w.\-]+''', re.I),
+    # ISO-8601 timestamps (generation times, "last updated" stamps in JSON blobs)
+    re.compile(rb'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?'),
+    # Unix timestamps in seconds or milliseconds (2001 - 2286)
+    re.compile(rb'(?<![\w.])1\d{9}(?:\d{3})?(?![\w.])'),
+]
+
+
+def _blank(match):
+    # Keep the attribute / parameter name, drop its value
+    return match.group(1) if match.lastindex else b''
+
+
+def normalize_body(body):
+    """Page bytes with volatile tokens removed (see _VOLATILE_PATTERNS)."""
+    if isinstance(body, str):
+        body = body.encode('utf-8', errors='replace')
+    for pattern in _VOLATILE_PATTERNS:
+        body = pattern.sub(_blank, body)
+    return body
+
+
+def content_fingerprint(body):
+    """Short hash of a fetched page that ignores CSRF tokens, nonces, timestamps and cache busters."""
+    return hashlib.blake2b(normalize_body(body), digest_size=16).hexdigest()
+
+
+def keyword_signature(primary_keyword, secondary_keywords, *settings):
+    """Hash of the keyword set a page was analyzed with (plus anything else that changes the results)."""
+    payload = json.dumps([primary_keyword, list(secondary_keywords), *settings], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
@@ -0,0 +1,305 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+HISTORY_FILE = "audit_history.db"
+
+
+def _int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _yes_no(value):
+    # "Yes" / "No" report strings -> 1 / 0; "N/A" (no keyword, failed fetch) -> NULL
+    return {"Yes": 1, "No": 0}.get(value)
+
+
+def _bool(value):
+    return int(value) if isinstance(value, bool) else None
+
+
+def _float(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _text(value):
+    return value if isinstance(value, str) and value != "N/A" else None
+
+
+# (column, result field, SQL type, converter): typed columns instead of report strings
+RESULT_COLUMNS = [
+    ("status_code", "Status_Code", "INTEGER", _int),
+    ("fetch_source", "Fetch_Source", "TEXT", _text),
+    ("retries", "Retries", "INTEGER", _int),
+    ("analysis", "Analysis", "TEXT", _text),
+    ("rendered", "Rendered", "TEXT", _text),
+    ("title", "Title", "TEXT", _text),
+    ("title_length", "Title_Length", "INTEGER", _int),
+    ("meta_desc_length", "Meta_Desc_Length", "INTEGER", _int),
+    ("canonical_type", "Canonical_Type", "TEXT", _text),
+    ("meta_robots", "Meta_Robots", "TEXT", _text),
+    ("h1_count", "H1_Count", "INTEGER", _int),
+    ("word_count", "Word_Count", "INTEGER", _int),
+    ("internal_links", "Internal_Links", "INTEGER", _int),
+    ("images", "Images", "INTEGER", _int),
+    ("missing_alt_count", "Missing_Alt_Count", "INTEGER", _int),
+    ("schema_types", "Schema_Types", "TEXT", _text),
+    ("schema_present", "Schema_Present", "INTEGER", _yes_no),
+    ("primary_in_title", "Primary_in_Title", "INTEGER", _yes_no),
+    ("primary_in_h1", "Primary_in_H1", "INTEGER", _yes_no),
+    ("primary_in_url", "Primary_in_URL", "INTEGER", _yes_no),
+    ("primary_in_content", "Primary_in_Content", "INTEGER", _yes_no),
+    ("primary_in_first_100", "Primary_in_First_100", "INTEGER", _yes_no),
+    ("primary_in_meta_desc", "Primary_in_Meta_Desc", "INTEGER", _yes_no),
+    ("has_critical_issues", "Has_Critical_Issues", "INTEGER", _bool),
+    ("dns_ms", "DNS_ms", "REAL", _float),
+    ("connect_ms", "Connect_ms", "REAL", _float),
+    ("tls_ms", "TLS_ms", "REAL", _float),
+    ("ttfb_ms", "TTFB_ms", "REAL", _float),
+    ("download_ms", "Download_ms", "REAL", _float),
+    ("fetch_ms", "Fetch_ms", "REAL", _float),
+    ("render_ms", "Render_ms", "REAL", _float),
+    ("parse_ms", "Parse_ms", "REAL", _float),
+    ("analyze_ms", "Analyze_ms", "REAL", _float),
+    ("bytes_transferred", "Bytes_Transferred", "INTEGER", _int),
+]
+_COLUMN_NAMES = ["run_id", "client", "url", "error"] + [c[0] for c in RESULT_COLUMNS] + ["issue_count"]
+
+# "Title too short (23 chars)" and "Title too short (41 chars)" are the same issue, and so
+# are "Missing Alt Text on 3 images" and "... on 5 images"
+_ISSUE_DETAIL = re.compile(r"\s*(?:\(.*\)|:.*)$")
+_ISSUE_NUMBER = re.compile(r"\d+")
+# PRAGMA user_version: bumped when issue_kind() changes, so stored issues get re-keyed
+_ISSUE_KINDS_VERSION = 1
+
+
+def issue_kind(issue):
+    """Issue text without its page-specific detail (counts, lengths, canonical target)."""
+    return _ISSUE_NUMBER.sub("#", _ISSUE_DETAIL.sub("", issue))
+
+
+class HistoryStore:
+    """
+    Append-only audit history (SQLite). Every run gets a row in `runs`; each audited URL
+    gets one typed row in `results` and one row per issue in `issues`. Both are clustered
+    by (client, run, url), so one client's run - or the last two, for a diff - is a
+    contiguous range read, however many runs are stored. Per-client run totals are kept in
+    `run_totals` when a run finishes, so trend queries read one row per run.
+
+        history = HistoryStore()
+        run_id = history.start_run("audit")
+        history.add(run_id, client, url, audit_res)   # per result
+        history.finish_run(run_id)
+    """
+
+    def __init__(self, path=HISTORY_FILE, flush_every=500):
+        self.path = path
+        self.flush_every = flush_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rows, self._issue_rows = [], []
+        self._run_clients = {}
+
+        conn = self._conn()
+        columns = ",\n".join(f"{name} {sql_type}" for name, _, sql_type, _ in RESULT_COLUMNS)
+        conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                mode TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id INTEGER NOT NULL,
+                client TEXT NOT NULL,
+                url TEXT NOT NULL,
+                error TEXT,
+                {columns},
+                issue_count INTEGER NOT NULL,
+                PRIMARY KEY (client, run_id, url)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_results_url ON results(client, url, run_id);
+            CREATE TABLE IF NOT EXISTS issues (
+                run_id INTEGER NOT NULL,
+                client TEXT NOT NULL,
+                url TEXT NOT NULL,
+                issue TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                PRIMARY KEY (client, run_id, url, issue)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS run_totals (
+                run_id INTEGER NOT NULL,
+                client TEXT NOT NULL,
+                urls INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                with_issues INTEGER NOT NULL,
+                issues INTEGER NOT NULL,
+                avg_word_count REAL,
+                PRIMARY KEY (client, run_id)
+            ) WITHOUT ROWID;
+        """)
+        # Stores created before a column existed get it added (NULL for older runs)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+        for name, _, sql_type, _ in RESULT_COLUMNS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE results ADD COLUMN {name} {sql_type}")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < _ISSUE_KINDS_VERSION:
+            self._rekey_issues(conn)
+            conn.execute(f"PRAGMA user_version = {_ISSUE_KINDS_VERSION}")
+        conn.commit()
+
+    @staticmethod
+    def _rekey_issues(conn):
+        """Stores written with an older issue_kind(): recompute the kinds that change."""
+        stale = [
+            (issue_kind(detail), client, run_id, url, issue)
+            for client, run_id, url, issue, detail in conn.execute("SELECT client, run_id, url, issue, detail FROM issues")
+            if issue_kind(detail) != issue
+        ]
+        conn.executemany(
+            "UPDATE OR REPLACE issues SET issue = ? WHERE client = ? AND run_id = ? AND url = ? AND issue = ?", stale
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writing a run ---
+    def start_run(self, mode="audit"):
+        conn = self._conn()
+        run_id = conn.execute(
+            "INSERT INTO runs (mode, started_at) VALUES (?, ?)", (mode, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        ).lastrowid
+        conn.commit()
+        with self._lock:
+            self._run_clients[run_id] = set()
+        return run_id
+
+    def add(self, run_id, client, url, audit_res):
+        """Queues one URL's result (written every `flush_every` results and by finish_run)."""
+        status = audit_res.get("Status_Code")
+        issues = audit_res.get("Issues_List") or []
+        row = [run_id, client, url, None if isinstance(status, int) else str(status)]
+        row += [convert(audit_res.get(field)) for _, field, _, convert in RESULT_COLUMNS]
+        row.append(len(issues))
+        # Several issues of the same kind on one page are kept as one row
+        issue_rows = {issue_kind(i): (run_id, client, url, issue_kind(i), i) for i in issues}
+        with self._lock:
+            self._rows.append(row)
+            self._issue_rows.extend(issue_rows.values())
+            self._run_clients.setdefault(run_id, set()).add(client)
+            due = len(self._rows) >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+            issue_rows, self._issue_rows = self._issue_rows, []
+        if not rows:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(_COLUMN_NAMES)}) VALUES ({', '.join('?' * len(_COLUMN_NAMES))})",
+                rows,
+            )
+            conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)", issue_rows)
+
+    def finish_run(self, run_id):
+        """Writes what's still queued, stamps the run and stores its per-client totals."""
+        self.flush()
+        with self._lock:
+            clients = self._run_clients.pop(run_id, set())
+        conn = self._conn()
+        with conn:
+            for client in clients:
+                conn.execute("""
+                    INSERT OR REPLACE INTO run_totals
+                    SELECT run_id, client, COUNT(*), SUM(status_code IS NOT 200),
+                           SUM(issue_count > 0), SUM(issue_count), AVG(word_count)
+                    FROM results WHERE client = ? AND run_id = ?
+                """, (client, run_id))
+            conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE id = ?", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), run_id)
+            )
+
+    # --- Queries ---
+    def runs(self, client, limit=50):
+        """Most recent runs that audited `client`, newest first, with their totals."""
+        rows = self._conn().execute("""
+            SELECT runs.id, runs.mode, runs.started_at, t.urls, t.failed, t.with_issues, t.issues, t.avg_word_count
+            FROM run_totals t JOIN runs ON runs.id = t.run_id
+            WHERE t.client = ? ORDER BY t.run_id DESC LIMIT ?
+        """, (client, limit))
+        keys = ("run_id", "mode", "started_at", "urls", "failed", "with_issues", "issues", "avg_word_count")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def trend(self, client, limit=50):
+        """runs() oldest first, ready to chart."""
+        return self.runs(client, limit)[::-1]
+
+    def previous_run(self, client, run_id):
+        """The run before `run_id` that audited `client` (None if this was the first)."""
+        row = self._conn().execute(
+            "SELECT MAX(run_id) FROM run_totals WHERE client = ? AND run_id < ?", (client, run_id)
+        ).fetchone()
+        return row[0]
+
+    def diff(self, client, run_id=None, since=None):
+        """
+        Which URLs gained or lost issues between two runs of a client (default: its last
+        two). Yields {'url', 'gained': [...], 'lost': [...]} per changed URL, streamed from
+        the issues table (only the two runs are read). Issues are compared by kind, so
+        "Title too short (23 chars)" -> "(25 chars)" or "Missing Alt Text on 3 images" ->
+        "on 5 images" is not a change; `gained` lists the full issue text. URLs that failed
+        in either run, or appear in only one, are left out.
+        """
+        conn = self._conn()
+        if run_id is None:
+            run_id = conn.execute("SELECT MAX(run_id) FROM run_totals WHERE client = ?", (client,)).fetchone()[0]
+        if run_id is not None and since is None:
+            since = self.previous_run(client, run_id)
+        if run_id is None or since is None:
+            return
+
+        rows = conn.execute("""
+            SELECT i.url, 'gained', i.detail FROM issues i
+            JOIN results r ON r.client = i.client AND r.run_id = ? AND r.url = i.url AND r.status_code = 200
+            WHERE i.client = ? AND i.run_id = ? AND NOT EXISTS (
+                SELECT 1 FROM issues o WHERE o.client = i.client AND o.run_id = ? AND o.url = i.url AND o.issue = i.issue
+            )
+            UNION ALL
+            SELECT i.url, 'lost', i.detail FROM issues i
+            JOIN results r ON r.client = i.client AND r.run_id = ? AND r.url = i.url AND r.status_code = 200
+            WHERE i.client = ? AND i.run_id = ? AND NOT EXISTS (
+                SELECT 1 FROM issues n WHERE n.client = i.client AND n.run_id = ? AND n.url = i.url AND n.issue = i.issue
+            )
+            ORDER BY 1
+        """, (since, client, run_id, since, run_id, client, since, run_id))
+
+        current = None
+        for url, change, detail in rows:
+            if current is not None and current["url"] != url:
+                yield current
+                current = None
+            if current is None:
+                current = {"url": url, "gained": [], "lost": []}
+            current[change].append(detail)
+        if current is not None:
+            yield current
+
+    def url_history(self, client, url, limit=50):
+        """One URL's typed results across runs, newest first."""
+        conn = self._conn()
+        cursor = conn.execute(
+            f"SELECT {', '.join(_COLUMN_NAMES)} FROM results WHERE client = ? AND url = ? ORDER BY run_id DESC LIMIT ?",
+            (client, url, limit),
+        )
+        return [dict(zip(_COLUMN_NAMES, row)) for row in cursor]
@@ -0,0 +1,405 @@
+import re
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, ProtocolError, ReadTimeoutError, SSLError
+from urllib3.response import _get_decoder
+from urllib3.util.request import ACCEPT_ENCODING
+
+from metrics import NETWORK_PHASES
+from response_cache import CachedResponse, CacheMiss, SOURCE_CACHE, SOURCE_NETWORK, SOURCE_REVALIDATED
+
+# HTTP/2 is optional: only used when httpx + h2 are installed and it's switched on
+try:
+    import httpx
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Network failures worth retrying (the scheduler retries them with backoff)
+TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+) + ((httpx.TransportError,) if HTTP2_AVAILABLE else ())
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Decompressed / on-the-wire size; real HTML stays far below this, zip bombs don't
+MAX_COMPRESSION_RATIO = 200
+CHUNK_SIZE = 64 * 1024
+
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+# Servers label HTML with these often enough that the body has to be sniffed
+AMBIGUOUS_TYPES = {"", "text/plain", "application/octet-stream", "application/xml", "text/xml"}
+_HTML_SNIFF = re.compile(rb"<(?:!doctype\s+html|html|head|body|title|meta|link|script|div|p)\b", re.I)
+
+
+class DownloadRejected(Exception):
+    """The response body was not downloaded (or not finished): too large, or not HTML"""
+
+
+# --- Per-request timings ---
+# get() times each of NETWORK_PHASES (seconds, summed over retries). Connections reused
+# from the keep-alive pool cost no dns / connect / tls time.
+_current = threading.local()
+
+
+def _timing():
+    # The timings dict of the get() running on this thread (None outside one)
+    return getattr(_current, 'timing', None)
+
+
+class _TimedConnectionMixin:
+    """urllib3 connection that books DNS / TCP connect / TLS handshake time to the current get()."""
+
+    def _new_conn(self):
+        timing = _timing()
+        if timing is None:
+            return super()._new_conn()
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = list(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)))
+        except OSError:
+            addresses = [host]  # let urllib3 resolve it again and raise its usual error
+        resolved = time.perf_counter()
+        timing['dns'] += resolved - started
+        # Connect to the resolved addresses (same fallback order as urllib3). Only for the
+        # duration of this call: `host` (Host header, SNI) reads the same attribute.
+        try:
+            for address in addresses[:-1]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError:
+                    continue
+            self._dns_host = addresses[-1]
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+            timing['connect'] += time.perf_counter() - resolved
+
+
+class _HttpxTrace:
+    """httpx `trace` extension: books TCP connect and TLS time (httpcore resolves DNS inside connect)."""
+
+    EVENTS = {'connection.connect_tcp': 'connect', 'connection.start_tls': 'tls'}
+
+    def __init__(self, timing):
+        self.timing = timing
+        self.started = {}
+
+    def __call__(self, event_name, info):
+        name, _, stage = event_name.rpartition('.')
+        phase = self.EVENTS.get(name)
+        if phase is None:
+            return
+        if stage == 'started':
+            self.started[phase] = time.perf_counter()
+        elif phase in self.started:
+            self.timing[phase] += time.perf_counter() - self.started.pop(phase)
+
+
+def _setup_time(timing):
+    return timing['dns'] + timing['connect'] + timing['tls'] if timing is not None else 0.0
+
+
+def _book_headers(timing, started, setup):
+    """Adds one request's TTFB (until its headers arrived, minus any connection setup). Returns the time."""
+    headers_at = time.perf_counter()
+    if timing is not None:
+        timing['ttfb'] += max(0.0, headers_at - started - (_setup_time(timing) - setup))
+    return headers_at
+
+
+def _book_body(timing, headers_at, wire_bytes):
+    if timing is not None:
+        timing['download'] += time.perf_counter() - headers_at
+        timing['wire_bytes'] += wire_bytes
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timing = _timing()
+        if timing is None:
+            return super().connect()
+        started = time.perf_counter()
+        before = timing['dns'] + timing['connect']
+        try:
+            return super().connect()
+        finally:
+            # Whatever connect() spent beyond _new_conn() is the TLS handshake
+            timing['tls'] += max(0.0, time.perf_counter() - started - (timing['dns'] + timing['connect'] - before))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+
+
+class _CountingBody:
+    """
+    Iterates a urllib3 response's body, decompressing it here instead of in urllib3 so the
+    bytes received can be counted as they arrive (`wire_bytes`). raw.tell() can't be used:
+    it stays 0 for chunked transfer-encoding, the usual way compressed pages are sent.
+    Decoding goes through urllib3's own decoders (the ones behind ACCEPT_ENCODING).
+    """
+
+    def __init__(self, raw, content_encoding):
+        self.raw = raw
+        self.wire_bytes = 0
+        encoding = content_encoding.strip().lower()
+        self._decoder = _get_decoder(encoding) if encoding not in ("", "identity") else None
+
+    def __iter__(self):
+        # Same exception mapping as requests' iter_content, so retries work as before
+        try:
+            for chunk in self.raw.stream(CHUNK_SIZE, decode_content=False):
+                self.wire_bytes += len(chunk)
+                chunk = self._decode(chunk)
+                if chunk:
+                    yield chunk
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e) from e
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        except SSLError as e:
+            raise requests.exceptions.SSLError(e) from e
+        if self._decoder is not None:
+            tail = self._decode(None)
+            if tail:
+                yield tail
+
+    def _decode(self, chunk):
+        # None: flush the decoder at the end of the body
+        if self._decoder is None:
+            return chunk
+        try:
+            return self._decoder.flush() if chunk is None else self._decoder.decompress(chunk)
+        except Exception as e:
+            raise requests.exceptions.ContentDecodingError(f"Failed to decode the response body: {e}") from e
+
+
+def looks_like_html(head):
+    """Content sniffing on the first bytes of a body with a missing / generic Content-Type."""
+    if b"\x00" in head:
+        return False  # binary
+    return bool(_HTML_SNIFF.search(head))
+
+
+class HttpClient:
+    """
+    Reusable HTTP client with per-host keep-alive connection pools.
+    Create one per analyzer (or per Streamlit session) and reuse it across audit runs
+    so URLs on the same domain share TCP + TLS connections.
+    """
+
+    def __init__(self, headers=None, pool_connections=32, pool_maxsize=8, http2=False, timeout=15, cache=None, scheduler=None,
+                 max_bytes=MAX_BODY_BYTES):
+        """
+        pool_connections: number of hosts to keep connection pools for
+        pool_maxsize: keep-alive connections kept open per host
+        http2: multiplex requests over HTTP/2 when the optional httpx[http2] extra is installed
+        cache: optional ResponseCache; fresh entries are served from disk, stale ones revalidated
+        scheduler: optional PoliteScheduler; paces and retries requests that go to the network
+        max_bytes: bodies are streamed and abandoned past this many (decompressed) bytes
+        """
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.scheduler = scheduler
+        # Offline mode: serve everything from the cache and never touch the network
+        self.offline = False
+        headers = dict(headers or {})
+        # Advertise every content-encoding we can actually decode (gzip/deflate, plus br/zstd when installed)
+        headers['Accept-Encoding'] = ACCEPT_ENCODING.replace(',', ', ')
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = _TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.http2 = bool(http2 and HTTP2_AVAILABLE)
+        self._h2_client = None
+        if self.http2:
+            self._h2_client = httpx.Client(
+                http2=True,
+                headers=headers,
+                follow_redirects=True,
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=pool_connections * pool_maxsize,
+                    max_keepalive_connections=pool_connections * pool_maxsize,
+                ),
+            )
+
+    def get(self, url, timeout=None):
+        """
+        Returns a response object exposing status_code, headers, content and text,
+        plus `fetch_source` (network / revalidated (304) / cache), `retries` and `timings`:
+        {phase: seconds} for NETWORK_PHASES, 'fetch' (the whole call, including pacing
+        waits and retries) and 'wire_bytes' (body bytes received from the network).
+        Exceptions raised here carry the same `timings`.
+        """
+        timing = _current.timing = dict.fromkeys(NETWORK_PHASES, 0.0)
+        timing['wire_bytes'] = 0
+        started = time.perf_counter()
+        try:
+            response = self._get(url, timeout)
+        except Exception as e:
+            timing['fetch'] = time.perf_counter() - started
+            e.timings = timing
+            raise
+        finally:
+            _current.timing = None
+        timing['fetch'] = time.perf_counter() - started
+        response.timings = timing
+        return response
+
+    def _get(self, url, timeout):
+        timeout = timeout or self.timeout
+        if self.cache is None:
+            response = self._send(url, timeout)
+            response.fetch_source = SOURCE_NETWORK
+            return response
+
+        entry = self.cache.get(url)
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"{url} is not cached (offline mode)")
+            return self._from_cache(url, entry, SOURCE_CACHE)
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._from_cache(url, entry, SOURCE_CACHE)
+
+        # Stale (or missing) entry: ask the server whether our copy is still current
+        conditional = {}
+        if entry is not None:
+            if entry['etag']:
+                conditional['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                conditional['If-Modified-Since'] = entry['last_modified']
+
+        response = self._send(url, timeout, conditional)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(url)
+            cached = self._from_cache(url, entry, SOURCE_REVALIDATED)
+            cached.retries = response.retries
+            return cached
+
+        if response.status_code == 200:
+            self.cache.put(url, response.status_code, response.headers, response.content)
+        self.cache.record(SOURCE_NETWORK)
+        response.fetch_source = SOURCE_NETWORK
+        return response
+
+    def _send(self, url, timeout, extra_headers=None):
+        if self.scheduler is None:
+            response = self._request(url, timeout, extra_headers)
+            response.retries = 0
+            return response
+        response, retries = self.scheduler.call(
+            url, lambda: self._request(url, timeout, extra_headers), self._fetch_text, TRANSIENT_ERRORS
+        )
+        response.retries = retries
+        return response
+
+    def _request(self, url, timeout, extra_headers=None):
+        # Streamed: headers are checked before any of the body is read, and the body is read
+        # in chunks under a size cap. The body ends up as `content` only (bytes, decoded once
+        # by the parser later).
+        timing = _timing()
+        started = time.perf_counter()
+        setup = _setup_time(timing)
+        if self._h2_client is not None:
+            extensions = {"trace": _HttpxTrace(timing)} if timing is not None else None
+            with self._h2_client.stream("GET", url, timeout=timeout, headers=extra_headers, extensions=extensions) as response:
+                headers_at = _book_headers(timing, started, setup)
+                try:
+                    response._content = self._read_body(
+                        url, response.status_code, response.headers,
+                        response.iter_bytes(CHUNK_SIZE), lambda: response.num_bytes_downloaded,
+                    )
+                finally:
+                    _book_body(timing, headers_at, response.num_bytes_downloaded)
+            return response
+        response = self.session.get(url, timeout=timeout, headers=extra_headers, stream=True)
+        headers_at = _book_headers(timing, started, setup)
+        body = _CountingBody(response.raw, response.headers.get("Content-Encoding", ""))
+        try:
+            response._content = self._read_body(
+                url, response.status_code, response.headers, body, lambda: body.wire_bytes,
+            )
+        finally:
+            # Bytes as received (compressed, chunked or not), not the decoded body's size
+            _book_body(timing, headers_at, body.wire_bytes)
+            response.close()
+        return response
+
+    def _read_body(self, url, status_code, headers, chunks, wire_bytes):
+        """
+        Reads a streamed body: rejects (DownloadRejected) non-HTML 200 responses before
+        reading them, anything over max_bytes, and compressed bodies that inflate
+        suspiciously (decompression bombs). Returns the bytes.
+        """
+        content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if status_code == 200 and content_type not in HTML_TYPES and content_type not in AMBIGUOUS_TYPES:
+            raise DownloadRejected(f"Not an HTML page ({content_type})")
+        declared = headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            raise DownloadRejected(f"Page too large ({int(declared) / 1048576:.1f} MB, limit {self.max_bytes / 1048576:.0f} MB)")
+
+        body = bytearray()
+        sniffed = status_code != 200 or content_type in HTML_TYPES
+        compressed = headers.get("Content-Encoding", "identity").lower() not in ("", "identity")
+        for chunk in chunks:
+            body += chunk
+            if not sniffed and len(body) >= 1024:
+                if not looks_like_html(body[:1024]):
+                    raise DownloadRejected(f"Not an HTML page ({content_type or 'no Content-Type'}, content sniffed)")
+                sniffed = True
+            if len(body) > self.max_bytes:
+                raise DownloadRejected(f"Page too large (over {self.max_bytes / 1048576:.0f} MB)")
+            # No wire count (0) means it's unknown: no ratio to judge by, the size cap still applies
+            if compressed and len(body) > 1048576 and 0 < wire_bytes() and len(body) > MAX_COMPRESSION_RATIO * wire_bytes():
+                raise DownloadRejected(f"Compressed body inflates over {MAX_COMPRESSION_RATIO}x (decompression bomb?)")
+        if not sniffed and body and not looks_like_html(bytes(body[:1024])):
+            raise DownloadRejected(f"Not an HTML page ({content_type or 'no Content-Type'}, content sniffed)")
+        return bytes(body)
+
+    def _fetch_text(self, url):
+        # robots.txt: plain one-off request, outside the cache, the scheduler and the page's timings
+        timing, _current.timing = _timing(), None
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        finally:
+            _current.timing = timing
+        return response.status_code, response.text
+
+    def _from_cache(self, url, entry, source):
+        self.cache.record(source, bytes_saved=entry['body_size'])
+        return CachedResponse(url, entry['status_code'], entry['headers'], entry['content'], source)
+
+    def close(self):
+        self.session.close()
+        if self._h2_client is not None:
+            self._h2_client.close()
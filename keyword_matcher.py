@@ -0,0 +1,166 @@
+import re
+from functools import lru_cache
+
+# The C automaton is optional: without pyahocorasick we fall back to a trie-shaped regex
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# substring: plain `keyword in text` / str.count semantics (the original behaviour)
+# word: keyword must start and end on a word boundary ("seo" no longer matches "seoul")
+# stem: word matching that also accepts the singular/plural of the last word ("seo tool(s)")
+MATCH_MODES = ('substring', 'word', 'stem')
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def _singular(word):
+    if len(word) > 3 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 2 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _plural(word):
+    if len(word) > 1 and word.endswith('y') and word[-2] not in 'aeiou':
+        return word[:-1] + 'ies'
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return word + 'es'
+    return word + 's'
+
+
+def keyword_variants(keyword, mode):
+    """Strings that count as a hit for `keyword` (the keyword itself, plus plural forms in stem mode)."""
+    if mode != 'stem':
+        return [keyword]
+    head, _, last = keyword.rpartition(' ')
+    if not last or not last[-1].isalpha():
+        return [keyword]
+    singular = _singular(last)
+    prefix = head + ' ' if head else ''
+    variants = [keyword]
+    for form in (singular, _plural(singular)):
+        if prefix + form not in variants:
+            variants.append(prefix + form)
+    return variants
+
+
+def _trie_pattern(strings):
+    """Regex alternation shaped like a trie, so the engine tries shared prefixes once."""
+    trie = {}
+    for s in strings:
+        node = trie
+        for ch in s:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    All keywords for a URL (or a whole client) compiled into one automaton.
+    Each text region is scanned once and every keyword's hit count comes out of that pass;
+    counts are non-overlapping per keyword, exactly like str.count.
+    Keywords and texts are expected lowercased already.
+    """
+
+    def __init__(self, keywords, mode='substring'):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown keyword match mode: {mode} (choose from {', '.join(MATCH_MODES)})")
+        self.mode = mode
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self._bounded = mode != 'substring'
+
+        # variant string -> indexes of the keywords it counts for
+        self._targets = {}
+        for i, keyword in enumerate(self.keywords):
+            for variant in keyword_variants(keyword, mode):
+                self._targets.setdefault(variant, []).append(i)
+
+        self._automaton = None
+        self._regex = None
+        if not self.keywords or (mode == 'substring' and not AHOCORASICK_AVAILABLE):
+            return  # nothing to compile: str.count is already the fastest single-keyword scan
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for variant in self._targets:
+                self._automaton.add_word(variant, variant)
+            self._automaton.make_automaton()
+        else:
+            # Lookahead so overlapping hits are all reported; the greedy trie returns the longest
+            # variant at each position, and every shorter variant that also starts there is a prefix of it
+            start = r'(?<!\w)' if self._bounded else ''
+            self._regex = re.compile(start + '(?=(' + _trie_pattern(self._targets) + '))')
+            self._prefixes = {
+                variant: [other for other in self._targets if variant.startswith(other)]
+                for variant in self._targets
+            }
+
+    def _hits(self, text):
+        """(start, variant) for every occurrence of every variant, overlaps included."""
+        if self._automaton is not None:
+            for end, variant in self._automaton.iter(text):
+                yield end - len(variant) + 1, variant
+        else:
+            for m in self._regex.finditer(text):
+                for variant in self._prefixes[m.group(1)]:
+                    yield m.start(), variant
+
+    def count(self, text):
+        """Returns {keyword: hit count} for one text."""
+        if not self.keywords:
+            return {}
+        if self._automaton is None and self._regex is None:
+            return {keyword: text.count(keyword) for keyword in self.keywords}
+
+        spans = [[] for _ in self.keywords]
+        text_len = len(text)
+        for start, variant in self._hits(text):
+            end = start + len(variant)
+            if self._bounded:
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if end < text_len and _is_word_char(text[end]):
+                    continue
+            for i in self._targets[variant]:
+                spans[i].append((start, end))
+
+        counts = {}
+        for keyword, keyword_spans in zip(self.keywords, spans):
+            # Non-overlapping, leftmost first (what str.count does)
+            n, last_end = 0, -1
+            for start, end in sorted(keyword_spans):
+                if start >= last_end:
+                    n += 1
+                    last_end = end
+            counts[keyword] = n
+        return counts
+
+    def scan(self, regions):
+        """regions: {name: lowercased text}. Returns {name: {keyword: hit count}}."""
+        return {name: self.count(text) for name, text in regions.items()}
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(keywords, mode):
+    return KeywordMatcher(keywords, mode)
+
+
+def get_matcher(keywords, mode='substring'):
+    """Compiled matcher for a keyword set, shared by every URL that tracks the same keywords."""
+    return _cached_matcher(tuple(keywords), mode)
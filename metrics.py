@@ -0,0 +1,279 @@
+import json
+import math
+import time
+from array import array
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# Per-URL phases, in pipeline order, and the result field (milliseconds) each is reported in.
+# fetch is the whole HttpClient.get() (network phases + pacing waits + retries).
+PHASE_FIELDS = {
+    'dns': 'DNS_ms',
+    'connect': 'Connect_ms',
+    'tls': 'TLS_ms',
+    'ttfb': 'TTFB_ms',
+    'download': 'Download_ms',
+    'fetch': 'Fetch_ms',
+    'render': 'Render_ms',
+    'parse': 'Parse_ms',
+    'analyze': 'Analyze_ms',
+}
+BYTES_FIELD = 'Bytes_Transferred'
+NETWORK_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download')
+# A URL's wall time in the run: its fetch plus everything done with the page afterwards
+TOTAL_PHASES = ('fetch', 'render', 'parse', 'analyze')
+# Phases that add up to that total: 'wait' is the rest of the fetch (pacing, backoff, cache I/O)
+LEAF_PHASES = NETWORK_PHASES + ('wait', 'render', 'parse', 'analyze')
+
+# Histogram bucket upper bounds, in seconds (Prometheus `le` labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Bucketed counts (for Prometheus) plus every sample, so quantiles are exact."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.samples = array('d')
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    def quantile(self, q):
+        """Linear-interpolated quantile (0 <= q <= 1) in seconds; None without samples."""
+        if not self.samples:
+            return None
+        values = sorted(self.samples)
+        pos = (len(values) - 1) * q
+        low, high = math.floor(pos), math.ceil(pos)
+        return values[low] + (values[high] - values[low]) * (pos - low)
+
+    def cumulative(self):
+        """[(le, cumulative count)], ending with +Inf"""
+        total, out = 0, []
+        for bound, n in zip(BUCKETS, self.counts):
+            total += n
+            out.append((bound, total))
+        out.append(("+Inf", self.count))
+        return out
+
+
+class RunMetrics:
+    """
+    Aggregates one audit run's per-URL timings (the PHASE_FIELDS / Bytes_Transferred result
+    fields): a histogram per phase (plus 'wait' and 'total' per URL, see LEAF_PHASES),
+    per-host totals, outcome counts and throughput. Exported as a JSON run summary or in
+    Prometheus text format.
+
+        metrics = RunMetrics()
+        for idx, audit_res in run_audit(..., metrics=metrics):
+            ...
+        metrics.write("run.json"); metrics.write("run.prom")
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self._finished = None
+        self.phases = {phase: Histogram() for phase in (*PHASE_FIELDS, 'wait', 'total')}
+        self.hosts = {}  # host -> {'pages', 'seconds', 'max', 'bytes', 'phases': {phase: seconds}}
+        self.outcomes = {}
+        self.pages = 0
+        self.bytes = 0
+
+    def observe(self, url, result, outcome=None):
+        """Adds one finished URL's result."""
+        self.pages += 1
+        if outcome:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        host = urlsplit(url).netloc.lower()
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = {'pages': 0, 'seconds': 0.0, 'max': 0.0, 'bytes': 0, 'phases': {}}
+
+        seconds = {}
+        for phase, field in PHASE_FIELDS.items():
+            value = result.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                seconds[phase] = value / 1000
+        if 'fetch' in seconds:
+            seconds['wait'] = max(0.0, seconds['fetch'] - sum(seconds.get(p, 0.0) for p in NETWORK_PHASES))
+        seconds['total'] = sum(seconds.get(p, 0.0) for p in TOTAL_PHASES)
+        for phase, value in seconds.items():
+            self.phases[phase].observe(value)
+            stats['phases'][phase] = stats['phases'].get(phase, 0.0) + value
+        total = seconds['total']
+        wire = result.get(BYTES_FIELD)
+        wire = wire if isinstance(wire, int) and not isinstance(wire, bool) else 0
+        self.bytes += wire
+        stats['pages'] += 1
+        stats['seconds'] += total
+        stats['max'] = max(stats['max'], total)
+        stats['bytes'] += wire
+
+    def finish(self):
+        if self._finished is None:
+            self._finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    # --- Views ---
+    def phase_summary(self):
+        """
+        Per phase: count, total seconds, share of all URL time (LEAF_PHASES only), mean and
+        p50/p95/p99/max (ms). Slowest first.
+        """
+        url_time = self.phases['total'].sum or 1.0
+        rows = []
+        for phase, hist in self.phases.items():
+            if phase == 'total' or not hist.count:
+                continue
+            row = {
+                'phase': phase,
+                'count': hist.count,
+                'total_s': round(hist.sum, 3),
+                'share': round(hist.sum / url_time, 3) if phase in LEAF_PHASES else None,
+                'mean_ms': _ms(hist.sum / hist.count),
+            }
+            row.update({f"p{int(q * 100)}_ms": _ms(hist.quantile(q)) for q in QUANTILES})
+            row['max_ms'] = _ms(max(hist.samples))
+            rows.append(row)
+        return sorted(rows, key=lambda r: r['total_s'], reverse=True)
+
+    def slowest_phase(self):
+        """The LEAF_PHASES row of phase_summary() with the most time in total (None before any URL)."""
+        return next((row for row in self.phase_summary() if row['share'] is not None), None)
+
+    def slowest_hosts(self, limit=10):
+        """Hosts by average time per URL, slowest first, with the phase that cost them most."""
+        rows = []
+        for host, stats in self.hosts.items():
+            network = {p: s for p, s in stats['phases'].items() if p in LEAF_PHASES}
+            rows.append({
+                'host': host,
+                'pages': stats['pages'],
+                'avg_ms': _ms(stats['seconds'] / stats['pages']),
+                'max_ms': _ms(stats['max']),
+                'total_s': round(stats['seconds'], 3),
+                'bytes': stats['bytes'],
+                'slowest_phase': max(network, key=network.get) if network else None,
+            })
+        return sorted(rows, key=lambda r: r['avg_ms'], reverse=True)[:limit]
+
+    def summary(self):
+        """JSON-serializable run summary."""
+        total = self.phases['total']
+        return {
+            'started_at': self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'elapsed_s': round(self.elapsed, 3),
+            'pages': self.pages,
+            'pages_per_sec': round(self.pages_per_sec, 2),
+            'bytes': self.bytes,
+            'outcomes': dict(self.outcomes),
+            'url_ms': {f"p{int(q * 100)}": _ms(total.quantile(q)) if total.count else None for q in QUANTILES},
+            'phases': self.phase_summary(),
+            'slowest_hosts': self.slowest_hosts(),
+        }
+
+    # --- Export ---
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, prefix="seo_audit"):
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent per URL in each phase (total = whole URL)",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        for phase, hist in self.phases.items():
+            if not hist.count:
+                continue
+            for le, n in hist.cumulative():
+                lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {n}')
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {hist.sum:.6f}')
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+        lines += [
+            f"# HELP {prefix}_phase_quantile_seconds Exact per-URL phase quantiles for the run",
+            f"# TYPE {prefix}_phase_quantile_seconds gauge",
+        ]
+        for phase, hist in self.phases.items():
+            if hist.count:
+                for q in QUANTILES:
+                    lines.append(f'{prefix}_phase_quantile_seconds{{phase="{phase}",quantile="{q}"}} {hist.quantile(q):.6f}')
+        lines += [f"# HELP {prefix}_pages_total URLs audited, by outcome", f"# TYPE {prefix}_pages_total counter"]
+        for outcome, n in (self.outcomes or {'all': self.pages}).items():
+            lines.append(f'{prefix}_pages_total{{outcome="{_label(outcome)}"}} {n}')
+        lines += [
+            f"# HELP {prefix}_bytes_total Page bytes received from the network",
+            f"# TYPE {prefix}_bytes_total counter",
+            f"{prefix}_bytes_total {self.bytes}",
+            f"# HELP {prefix}_run_seconds Wall time of the run",
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {self.elapsed:.3f}",
+            f"# HELP {prefix}_pages_per_second Throughput of the run",
+            f"# TYPE {prefix}_pages_per_second gauge",
+            f"{prefix}_pages_per_second {self.pages_per_sec:.3f}",
+            f"# HELP {prefix}_host_seconds_total Time spent on each host's URLs",
+            f"# TYPE {prefix}_host_seconds_total counter",
+        ]
+        for host, stats in self.hosts.items():
+            lines.append(f'{prefix}_host_seconds_total{{host="{_label(host)}"}} {stats["seconds"]:.6f}')
+        lines += [f"# HELP {prefix}_host_pages_total URLs audited per host", f"# TYPE {prefix}_host_pages_total counter"]
+        for host, stats in self.hosts.items():
+            lines.append(f'{prefix}_host_pages_total{{host="{_label(host)}"}} {stats["pages"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes the run summary: JSON for .json paths, Prometheus text format otherwise."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json() if path.lower().endswith(".json") else self.to_prometheus())
+
+
+class RerunTimer:
+    """
+    Wall time of one Streamlit script run, split into phases: mark(phase) ends the phase
+    that has been running since the previous mark (or since the timer was created).
+
+        timer = RerunTimer()
+        ...                      # load data
+        timer.mark("data")
+        ...                      # draw the sidebar
+        timer.mark("sidebar")
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = []  # [(phase, ms), ...]
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, _ms(now - self._last)))
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return _ms(self._last - self.started)
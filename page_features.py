@@ -0,0 +1,524 @@
+import html
+import re
+from dataclasses import dataclass, field
+from html.entities import html5 as HTML5_ENTITIES
+from html.parser import HTMLParser
+
+
+# Tree-building rules mirrored from BeautifulSoup's html.parser builder, so the single
+# pass sees exactly the same elements and strings the old find/find_all calls did.
+VOID_ELEMENTS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+    'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid',
+    'param', 'source', 'spacer', 'track', 'wbr',
+}
+# Text inside these is script/markup source, not page content (excluded from get_text)
+NON_CONTENT_CONTAINERS = {'script', 'style', 'template', 'rt', 'rp'}
+PRESERVE_WHITESPACE = {'pre', 'textarea'}
+ASCII_SPACES = ' \n\t\x0c\r'
+HEADINGS = ('h1', 'h2', 'h3')
+
+SCHEMA_TYPE_RE = re.compile(r'"@type":\s*"([^"]+)"')
+
+# What extract_features() can collect, in groups a caller asks for (`needs`):
+#   head      title, meta description, canonical, meta robots (always collected)
+#   headings  h1/h2/h3 texts
+#   text      page text (word count, first 100 words, keyword content checks)
+#   links     <a href> targets
+#   images    image count and files missing alt text
+#   schema    microdata / JSON-LD @type declarations
+#   scripts   inline script size and external script count
+FEATURE_GROUPS = ('head', 'headings', 'text', 'links', 'images', 'schema', 'scripts')
+# If only these are needed, everything after <body> can usually be skipped
+HEAD_GROUPS = frozenset({'head'})
+_BODY_START_RE = re.compile(r'<body[\s>/]', re.IGNORECASE)
+# head feature -> (its value when not found, text any later declaration of it must contain)
+_HEAD_MARKERS = {
+    'title': ("", '<title'),
+    'meta_description': ("", 'description'),
+    'canonical_url': ("", 'canonical'),
+    'meta_robots': ("index, follow", 'robots'),
+}
+
+
+@dataclass
+class PageFeatures:
+    """Every on-page signal the analyzer needs, collected in one walk over the document."""
+    title: str = ""
+    meta_description: str = ""
+    canonical_url: str = ""
+    meta_robots: str = "index, follow"
+    h1_texts: list = field(default_factory=list)
+    h2_texts: list = field(default_factory=list)
+    h3_texts: list = field(default_factory=list)
+    text_content: str = ""
+    link_hrefs: list = field(default_factory=list)
+    image_count: int = 0
+    missing_alt_files: list = field(default_factory=list)
+    schema_types: list = field(default_factory=list)
+    # Script payload: inline <script> text (characters) and external <script src> count
+    script_bytes: int = 0
+    script_srcs: int = 0
+    parser_backend: str = ""
+    # FEATURE_GROUPS that were collected (the others keep their empty defaults)
+    groups: frozenset = frozenset(FEATURE_GROUPS)
+
+    @property
+    def words(self):
+        return self.text_content.split()
+
+
+class FeatureBuilder:
+    """
+    Turns tree events (start/end/data) into PageFeatures without building a tree.
+    Keeps only a stack of open tag names to reproduce how BeautifulSoup nests elements.
+    Parser backends drive it; see PARSER_BACKENDS below.
+    needs: FEATURE_GROUPS to collect (None = all); skipping text collection is most of the saving.
+    """
+
+    def __init__(self, needs=None):
+        groups = frozenset(FEATURE_GROUPS) if needs is None else HEAD_GROUPS | frozenset(needs)
+        self.features = PageFeatures(groups=groups)
+        self._want_headings = 'headings' in groups
+        self._want_text = 'text' in groups
+        self._want_links = 'links' in groups
+        self._want_images = 'images' in groups
+        self._want_schema = 'schema' in groups
+        self._want_scripts = 'scripts' in groups
+        self._stack = []
+        self._open_counts = {}
+        self._current_data = []
+        self._text_parts = []
+        self._non_content_depth = 0
+        self._preserve_depth = 0
+        # Open h1/h2/h3 elements: (stack_depth, target list, slot index, stripped strings)
+        self._headings = []
+        # First <title>: children are tracked (as a tiny tree) to reproduce Tag.string
+        self._title_depth = None
+        self._title_done = False
+        self._title_nodes = []
+        self._seen_description = False
+        self._seen_robots = False
+        self._seen_canonical = False
+
+    # --- Tree events ---
+    def start(self, tag, attrs):
+        """attrs: dict of attribute values ("" for valueless attributes)"""
+        self._end_data()
+        self._start(tag, attrs)
+
+    def end(self, tag):
+        self._end_data()
+        if not self._open_counts.get(tag):
+            return  # stray end tag: BeautifulSoup ignores it
+        while self._stack:
+            if self._pop() == tag:
+                break
+
+    def data(self, data):
+        self._current_data.append(data)
+
+    def string(self, s, content):
+        """A standalone string: comments/doctypes (content=False) or CDATA (content=True)"""
+        self._end_data()
+        self._add_string(s, content)
+
+    def close(self):
+        self._end_data()
+        while self._stack:
+            self._pop()
+        self.features.text_content = " ".join(self._text_parts)
+        return self.features
+
+    # --- Internals ---
+    def _start(self, tag, a):
+        self._stack.append(tag)
+        self._open_counts[tag] = self._open_counts.get(tag, 0) + 1
+        if tag in NON_CONTENT_CONTAINERS:
+            self._non_content_depth += 1
+        if tag in PRESERVE_WHITESPACE:
+            self._preserve_depth += 1
+        if self._title_depth is not None:
+            child = []
+            self._title_nodes[-1].append(child)
+            self._title_nodes.append(child)
+
+        f = self.features
+        if tag == 'title' and not self._title_done and self._title_depth is None:
+            self._title_depth = len(self._stack)
+            self._title_nodes = [[]]
+        elif tag == 'meta':
+            name = a.get('name')
+            if name == 'description' and not self._seen_description:
+                self._seen_description = True
+                f.meta_description = a['content'].strip() if a.get('content') else ""
+            elif name == 'robots' and not self._seen_robots:
+                self._seen_robots = True
+                f.meta_robots = a.get('content', "index, follow")
+        elif tag == 'link' and not self._seen_canonical and 'canonical' in a.get('rel', '').split():
+            self._seen_canonical = True
+            f.canonical_url = a.get('href', "")
+        elif tag in HEADINGS and self._want_headings:
+            # Reserve the slot now so nested headings keep document order
+            texts = getattr(f, f"{tag}_texts")
+            texts.append("")
+            self._headings.append((len(self._stack), texts, len(texts) - 1, []))
+        elif tag == 'a' and 'href' in a and self._want_links:
+            f.link_hrefs.append(a['href'])
+        elif tag == 'img' and self._want_images:
+            f.image_count += 1
+            if not a.get('alt'):
+                f.missing_alt_files.append(a.get('src', 'unknown_src').split('/')[-1])
+        elif tag == 'script' and a.get('src') and self._want_scripts:
+            f.script_srcs += 1
+
+        # script/style elements never count as microdata (they were dropped before the lookup)
+        if 'itemtype' in a and self._want_schema and tag not in ('script', 'style'):
+            f.schema_types.append(a['itemtype'].split('/')[-1])
+
+    def _pop(self):
+        depth = len(self._stack)
+        tag = self._stack.pop()
+        self._open_counts[tag] -= 1
+        if tag in NON_CONTENT_CONTAINERS:
+            self._non_content_depth -= 1
+        if tag in PRESERVE_WHITESPACE:
+            self._preserve_depth -= 1
+
+        while self._headings and self._headings[-1][0] >= depth:
+            _, texts, slot, strings = self._headings.pop()
+            texts[slot] = "".join(strings)
+
+        if self._title_depth is not None:
+            if depth == self._title_depth:
+                self.features.title = _single_string(self._title_nodes[0]).strip()
+                self._title_depth = None
+                self._title_done = True
+            else:
+                self._title_nodes.pop()
+        return tag
+
+    def _end_data(self):
+        if not self._current_data:
+            return
+        data = "".join(self._current_data)
+        self._current_data = []
+        if not self._preserve_depth and not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        self._add_string(data, content=self._non_content_depth == 0)
+
+    def _add_string(self, s, content):
+        if self._title_depth is not None:
+            self._title_nodes[-1].append(s)
+        if not content:
+            if self._want_scripts and self._stack and self._stack[-1] == 'script':
+                self.features.script_bytes += len(s)
+            return
+        if self._want_text:
+            self._text_parts.append(s)
+        if self._headings:
+            stripped = s.strip()
+            if stripped:
+                for heading in self._headings:
+                    heading[3].append(stripped)
+
+
+def _single_string(children):
+    """Tag.string semantics: the lone child string, recursing into a lone child tag."""
+    if len(children) != 1:
+        return ""
+    child = children[0]
+    if isinstance(child, str):
+        return child
+    return _single_string(child)
+
+
+def decode_html(content):
+    """Decodes raw bytes the same way BeautifulSoup does (BOM, declared charset, sniffing)."""
+    if isinstance(content, str):
+        return content
+    # Imported here: the dashboard imports this module (via rules) without ever decoding a page
+    from bs4.dammit import UnicodeDammit
+
+    markup = UnicodeDammit(content, is_html=True).unicode_markup
+    return markup if markup is not None else content.decode('utf-8', errors='replace')
+
+
+# --- Parser backends ---
+# Each backend parses the markup and drives a FeatureBuilder. html.parser is the reference
+# (it's what the original analyzer used); lxml gives identical metrics and hands anything it
+# would build differently back to html.parser by raising MalformedMarkup.
+
+class MalformedMarkup(Exception):
+    """Raised by a backend whose tree would differ from the html.parser reference"""
+
+
+class _HtmlParserDriver(HTMLParser):
+    """Python's html.parser, with BeautifulSoup's handling of void elements and entities."""
+
+    def __init__(self, builder):
+        super().__init__(convert_charrefs=False)
+        self.builder = builder
+        self._already_closed = []
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, _attr_dict(attrs))
+        if tag in VOID_ELEMENTS:
+            self.builder.end(tag)
+            self._already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.builder.start(tag, _attr_dict(attrs))
+        self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._already_closed:
+            self._already_closed.remove(tag)
+        else:
+            self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+    def handle_charref(self, name):
+        self.builder.data(html.unescape(f"&#{name};"))
+
+    def handle_entityref(self, name):
+        self.builder.data(HTML5_ENTITIES.get(name + ';', '&' + name))
+
+    def handle_comment(self, data):
+        self.builder.string(data, content=False)
+
+    def handle_decl(self, decl):
+        self.builder.string(decl, content=False)
+
+    def handle_pi(self, data):
+        self.builder.string(data, content=False)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            # CDATA blocks count as page text, even inside <script>/<template>
+            self.builder.string(data[len('CDATA['):], content=True)
+        else:
+            self.builder.string(data, content=False)
+
+
+def _attr_dict(attrs):
+    a = {}
+    for key, value in attrs:
+        a[key] = "" if value is None else value  # duplicate attributes: last one wins
+    return a
+
+
+def _parse_html_parser(markup, needs=None):
+    builder = FeatureBuilder(needs)
+    driver = _HtmlParserDriver(builder)
+    driver.feed(markup)
+    driver.close()
+    return builder.close()
+
+
+# Markup libxml2 handles differently from html.parser *without* logging an error
+_RAW_TEXT_WITH_TAGS_RE = re.compile(
+    r'<(title|textarea|xmp|iframe|noembed|noframes|plaintext)\b[^>]*>(?![^<]*</\1\s*>)',
+    re.IGNORECASE,
+)
+# XHTML-style <script src="..."/>: html.parser treats it as empty, libxml2 as an open raw-text block
+_SELF_CLOSED_RAW_TEXT_RE = re.compile(r'<(script|style)\b[^>]*/>', re.IGNORECASE)
+_HEADING_START_RE = re.compile(r'<(h[1-3])[\s/>]', re.IGNORECASE)
+_HEADING_END_RE = re.compile(r'</(h[1-3])\s*>', re.IGNORECASE)
+_NAMED_ENTITY_RE = re.compile(r'&([A-Za-z][A-Za-z0-9]*);')
+
+
+def _has_unclosed_headings(markup):
+    starts = sorted(tag.lower() for tag in _HEADING_START_RE.findall(markup))
+    ends = sorted(tag.lower() for tag in _HEADING_END_RE.findall(markup))
+    return starts != ends
+
+
+def _has_cdata_outside_scripts(markup):
+    if '<![' not in markup:
+        return False
+    lower = markup.lower()
+    pos = lower.find('<![cdata[')
+    while pos != -1:
+        # CDATA inside <script>/<style> (the common `//<![CDATA[` idiom) is just script text
+        opened = max(lower.rfind('<script', 0, pos), lower.rfind('<style', 0, pos))
+        closed = max(lower.rfind('</script', 0, pos), lower.rfind('</style', 0, pos))
+        if opened <= closed:
+            return True
+        pos = lower.find('<![cdata[', pos + 9)
+    return False
+
+
+def _parse_lxml(markup, needs=None):
+    from lxml import etree
+
+    # libxml2 reads these elements' content as raw text (like HTML5) where html.parser
+    # still sees tags, and it doesn't report that as an error
+    if _RAW_TEXT_WITH_TAGS_RE.search(markup) or _SELF_CLOSED_RAW_TEXT_RE.search(markup):
+        raise MalformedMarkup("markup inside a raw-text element")
+    # ...it closes an unclosed heading when a block starts (html.parser keeps it open)...
+    if _has_unclosed_headings(markup):
+        raise MalformedMarkup("unclosed heading")
+    # ...and it drops CDATA sections, which html.parser keeps as text
+    if _has_cdata_outside_scripts(markup):
+        raise MalformedMarkup("CDATA section in page content")
+    # ...and it keeps unknown entity references ("&foo;") verbatim, html.parser drops the ";"
+    if '&' in markup and any(name + ';' not in HTML5_ENTITIES for name in set(_NAMED_ENTITY_RE.findall(markup))):
+        raise MalformedMarkup("unknown entity reference")
+
+    parser = etree.HTMLParser(huge_tree=True)
+    root = etree.fromstring(markup, parser)
+    # libxml2 repairs broken nesting differently from html.parser; any structural error
+    # means the result could differ, so let the caller fall back to the reference parser
+    if len(parser.error_log):
+        raise MalformedMarkup(parser.error_log[0].message)
+    if root is None:
+        raise MalformedMarkup("empty document")
+
+    builder = FeatureBuilder(needs)
+    for event, el in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            builder.start(el.tag, dict(el.attrib))
+            if el.text:
+                builder.data(el.text)
+            continue
+        if event == 'end':
+            builder.end(el.tag)
+        else:
+            builder.string(el.text or "", content=False)
+        if el.tail:
+            builder.data(el.tail)
+    return builder.close()
+
+
+def _parse_selectolax(markup, needs=None):
+    """
+    Lexbor builds a spec-compliant HTML5 tree: invalid nesting gets repaired (tables, p/li/a,
+    headings) and <template> contents are hidden, so metrics can differ from html.parser on
+    sloppy markup. Opt-in only; 'auto' never picks it.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    builder = FeatureBuilder(needs)
+    root = LexborHTMLParser(markup).root
+    if root is None:
+        raise MalformedMarkup("empty document")
+
+    # Iterative walk (deep pages would blow the recursion limit)
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        tag = node.tag
+        if closing:
+            builder.end(tag)
+        elif tag == '-text':
+            builder.data(node.text_content or "")
+        elif tag == '-comment':
+            builder.string(node.comment_content or "", content=False)
+        elif not tag.startswith(('-', '!')):
+            builder.start(tag, {k: ("" if v is None else v) for k, v in node.attributes.items()})
+            stack.append((node, True))
+            children = []
+            child = node.child
+            while child is not None:
+                children.append(child)
+                child = child.next
+            stack.extend((c, False) for c in reversed(children))
+    return builder.close()
+
+
+PARSER_BACKENDS = {
+    'lxml': _parse_lxml,
+    'selectolax': _parse_selectolax,
+    'html.parser': _parse_html_parser,
+}
+# 'auto' order: fastest first, html.parser as the correctness fallback. selectolax is
+# opt-in only: lexbor silently repairs broken markup the HTML5 way, so unlike lxml it can't
+# tell us when its tree would differ from html.parser's.
+AUTO_ORDER = ('lxml', 'html.parser')
+
+
+def _backend_installed(name):
+    module = {'lxml': 'lxml.etree', 'selectolax': 'selectolax.lexbor'}.get(name)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends():
+    return [name for name in PARSER_BACKENDS if _backend_installed(name)]
+
+
+def resolve_backend(backend='auto'):
+    """Returns the backend name 'auto' maps to, or validates an explicit choice."""
+    if backend == 'auto':
+        return next(name for name in AUTO_ORDER if _backend_installed(name))
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend} (choose from {', '.join(PARSER_BACKENDS)})")
+    if not _backend_installed(backend):
+        raise ValueError(f"Parser backend '{backend}' is not installed")
+    return backend
+
+
+def extract_features(markup, backend='auto', needs=None):
+    """
+    Single pass over an HTML document (str or bytes) returning PageFeatures.
+    backend: 'auto', 'lxml', 'selectolax' or 'html.parser'. If the chosen backend fails
+    (or flags the markup as malformed) it falls back to html.parser.
+    needs: FEATURE_GROUPS to collect (None = all). Head-only requests stop at <body> when
+    nothing after it could change the result.
+    """
+    markup = decode_html(markup)
+    if needs is not None and frozenset(needs) <= HEAD_GROUPS:
+        features = _extract_head(markup, backend)
+        if features is not None:
+            return features
+
+    features = _parse(markup, backend, needs)
+    # Fallback: regex search for Schema.org types if no microdata was found
+    if 'schema' in features.groups and not features.schema_types:
+        features.schema_types = SCHEMA_TYPE_RE.findall(markup)
+    return features
+
+
+def _parse(markup, backend, needs):
+    chain = [resolve_backend(backend)]
+    if chain[0] != 'html.parser':
+        chain.append('html.parser')
+
+    for name in chain:
+        try:
+            features = PARSER_BACKENDS[name](markup, needs)
+            features.parser_backend = name
+            return features
+        except Exception:
+            if name == chain[-1]:
+                raise
+
+
+def _extract_head(markup, backend):
+    """
+    Head features from the markup before <body>, or None when the rest of the document
+    could still change them: the first <title> / meta / canonical wins, so a value found in
+    the head is final, and one that wasn't found can only come from a body that mentions it.
+    """
+    match = _BODY_START_RE.search(markup)
+    if match is None:
+        return None
+    head = markup[:match.start()]
+    features = _parse(head, backend, HEAD_GROUPS)
+    if features.title and '</title' not in head.lower():
+        return None  # unclosed <title>: its text runs on into the body
+    tail = None
+    for name, (default, marker) in _HEAD_MARKERS.items():
+        if getattr(features, name) == default:
+            tail = markup[match.start():].lower() if tail is None else tail
+            if marker in tail:
+                return None
+    return features
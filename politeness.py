@@ -0,0 +1,236 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Worth another try: the host is overloaded / rate limiting us, or a proxy hiccuped
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# ...and these two also mean "slow down"
+THROTTLE_STATUS = {429, 503}
+
+
+class RobotsDisallowed(Exception):
+    """Raised (with obey_robots on) for URLs the host's robots.txt disallows"""
+
+
+def parse_retry_after(value):
+    """Retry-After header (delta-seconds or HTTP date) -> seconds to wait, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    """
+    Request pacing for one host. `rate` requests/second on average, bursts of up to `burst`.
+    Reservations may run the bucket into debt, which is how callers learn how long to wait.
+    Adapts AIMD-style: successes raise the rate by about one request/second per second of
+    traffic (up to max_rate); a throttling response halves it - once per burst, not once per
+    rejected request - and can pause the host entirely until its Retry-After has passed.
+    """
+
+    def __init__(self, rate, burst, min_rate, max_rate):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.crawl_delay = None
+
+    def reserve(self):
+        """Takes one token; returns how many seconds the caller has to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate, self.paused_until - now)
+
+    def cap(self, max_rate):
+        self.max_rate = min(self.max_rate, max_rate)
+        self.rate = min(self.rate, self.max_rate)
+        self.min_rate = min(self.min_rate, self.max_rate)
+
+    def succeeded(self):
+        self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+
+    def throttled(self, retry_after=None):
+        now = time.monotonic()
+        # Requests already in flight when the host pushed back will be rejected too;
+        # count them as the same signal
+        if now - self.last_decrease >= max(1.0, 1.0 / self.rate):
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.last_decrease = now
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+    def pause_left(self):
+        return self.paused_until - time.monotonic()
+
+
+class PoliteScheduler:
+    """
+    Sits in front of HttpClient's network requests: paces each host with its own adaptive
+    TokenBucket, honours robots.txt Crawl-delay / Request-rate (cached per host), and retries
+    transient failures (connection errors, timeouts, 429/5xx) with jittered exponential
+    backoff, waiting at least as long as any Retry-After header asks.
+    """
+
+    def __init__(self, rate=10.0, burst=8, min_rate=0.2, max_rate=50.0, max_retries=3,
+                 backoff_base=0.5, backoff_cap=30.0, max_retry_after=120.0,
+                 robots=True, obey_robots=False, robots_ttl=24 * 3600, user_agent="*"):
+        """
+        rate / burst: starting requests per second per host, and how many may go back to back
+        max_retries: extra attempts per URL after the first one
+        max_retry_after: a host asking us to wait longer than this is not retried (run continues)
+        robots: fetch robots.txt once per host for its Crawl-delay / Request-rate
+        obey_robots: also skip URLs it disallows (off by default: audited pages are the client's own)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.robots = robots or obey_robots
+        self.obey_robots = obey_robots
+        self.robots_ttl = robots_ttl
+        self.user_agent = user_agent
+        self._buckets = {}
+        self._robots = {}  # host -> (RobotFileParser or None, fetched_at)
+        self._robots_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"retries": 0, "throttled": 0, "waited": 0.0}
+
+    @staticmethod
+    def _host(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst, self.min_rate, self.max_rate)
+        return bucket
+
+    # --- robots.txt ---
+    def _robots_policy(self, host, fetch_text):
+        cached = self._robots.get(host)
+        if cached and time.time() - cached[1] < self.robots_ttl:
+            return cached[0]
+        with self._lock:
+            host_lock = self._robots_locks.setdefault(host, threading.Lock())
+        with host_lock:  # one fetch per host, the other threads wait for it
+            cached = self._robots.get(host)
+            if cached and time.time() - cached[1] < self.robots_ttl:
+                return cached[0]
+            parser = None
+            try:
+                status, text = fetch_text(f"{host}/robots.txt")
+            except Exception:
+                status, text = None, ""
+            if status is not None:
+                parser = RobotFileParser()
+                if status in (401, 403):
+                    parser.disallow_all = True
+                elif status < 400:
+                    parser.parse(text.splitlines())
+                else:
+                    parser.allow_all = True
+            with self._lock:
+                self._robots[host] = (parser, time.time())
+                if parser is not None:
+                    bucket = self._bucket(host)
+                    delay = parser.crawl_delay(self.user_agent)
+                    if delay:
+                        bucket.crawl_delay = float(delay)
+                        bucket.cap(1.0 / float(delay))
+                    request_rate = parser.request_rate(self.user_agent)
+                    if request_rate and request_rate.seconds:
+                        bucket.cap(request_rate.requests / request_rate.seconds)
+            return parser
+
+    # --- Scheduling ---
+    def _wait_turn(self, host):
+        with self._lock:
+            bucket = self._bucket(host)
+            delay = bucket.reserve()
+        while delay > 0:
+            with self._lock:
+                self.stats["waited"] += delay
+            time.sleep(delay)
+            # The host may have asked for a pause while we slept
+            with self._lock:
+                delay = bucket.pause_left()
+
+    def wait_turn(self, url):
+        """Blocks until `url`'s host may take another request (for requests made outside call())."""
+        self._wait_turn(self._host(url))
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, but never sooner than Retry-After."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, url, send, fetch_text, transient_errors=()):
+        """
+        Runs send() (one network request for `url`) under this host's pacing, retrying
+        transient failures. Returns (response, retries); an exception that outlived every
+        retry is re-raised with a `retries` attribute.
+        fetch_text(url) -> (status_code, text): used for robots.txt.
+        """
+        host = self._host(url)
+        if self.robots:
+            policy = self._robots_policy(host, fetch_text)
+            if self.obey_robots and policy is not None and not policy.can_fetch(self.user_agent, url):
+                raise RobotsDisallowed(f"Blocked by robots.txt: {url}")
+
+        attempt = 0
+        while True:
+            self._wait_turn(host)
+            retry_after = None
+            try:
+                response = send()
+            except transient_errors as e:
+                if attempt >= self.max_retries:
+                    e.retries = attempt
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    with self._lock:
+                        self._bucket(host).succeeded()
+                    return response, attempt
+                if response.status_code in THROTTLE_STATUS:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    with self._lock:
+                        self._bucket(host).throttled(retry_after)
+                        self.stats["throttled"] += 1
+                if attempt >= self.max_retries or (retry_after or 0) > self.max_retry_after:
+                    return response, attempt
+            delay = self.backoff(attempt, retry_after)
+            attempt += 1
+            with self._lock:
+                self.stats["retries"] += 1
+            time.sleep(delay)
+
+    def host_rates(self):
+        """{host: current requests/second} (adapted rates, for progress / diagnostics)"""
+        with self._lock:
+            return {host: round(bucket.rate, 2) for host, bucket in self._buckets.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"retries": 0, "throttled": 0, "waited": 0.0}
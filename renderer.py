@@ -0,0 +1,172 @@
+import asyncio
+import atexit
+import threading
+
+# Rendering is optional: needs playwright plus a browser (`playwright install chromium`)
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# Never downloaded while rendering: they don't change the DOM, and they're most of the bytes
+BLOCKED_RESOURCES = frozenset({"image", "font", "media"})
+
+# Static HTML this thin (words) is an empty shell if it ships any script at all...
+SHELL_MAX_WORDS = 50
+# ...and a page without an H1 is worth rendering when it carries this much inline script
+SHELL_MIN_SCRIPT_BYTES = 50 * 1024
+# Page feature groups looks_client_rendered() reads (see page_features.FEATURE_GROUPS)
+RENDER_NEEDS = frozenset({'headings', 'text', 'scripts'})
+
+
+class RenderError(Exception):
+    """The browser couldn't render the page (not installed, navigation failed, non-200)"""
+
+
+def looks_client_rendered(page):
+    """
+    Whether an extract_page() record looks like a client-rendered (JavaScript) page whose
+    static HTML is missing the real content: a near-empty body next to script, or no H1
+    next to a large inline script payload (hydration state, inlined bundles).
+    """
+    results = page['results']
+    script_bytes = page.get('script_bytes', 0)
+    if results['Word_Count'] < SHELL_MAX_WORDS and (script_bytes or page.get('script_srcs', 0)):
+        return True
+    return not results['H1'] and script_bytes >= SHELL_MIN_SCRIPT_BYTES
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium for rendering JavaScript pages. The browser and `size`
+    browser contexts are started on first use and kept until close(), so startup is paid
+    once per run (or Streamlit session), not per URL. Images, fonts and media are blocked.
+
+    Thread-safe: render() / submit() can be called from any thread; Playwright itself runs
+    on the pool's own event-loop thread, at most `size` pages at a time.
+    """
+
+    def __init__(self, size=2, timeout=20, settle=3, user_agent=None, scheduler=None, blocked=BLOCKED_RESOURCES):
+        """
+        timeout: seconds allowed for navigation (until the load event)
+        settle: extra seconds to wait for the network to go idle (XHR-driven content)
+        scheduler: optional PoliteScheduler; renders count against the host's pacing
+        """
+        self.size = size
+        self.timeout = timeout
+        self.settle = settle
+        self.user_agent = user_agent
+        self.scheduler = scheduler
+        self.blocked = blocked
+        self.stats = {"rendered": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = None
+        self._start_error = None
+
+    # --- Lifecycle ---
+    def _ensure_started(self):
+        with self._lock:
+            if self._start_error is not None:
+                # Don't retry a launch that failed (e.g. no browser installed) for every URL
+                raise RenderError(self._start_error)
+            if self._loop is not None:
+                return
+            if not PLAYWRIGHT_AVAILABLE:
+                self._start_error = "playwright is not installed"
+                raise RenderError(self._start_error)
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+            except Exception as e:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                self._start_error = f"Browser failed to start: {str(e).splitlines()[0]}"
+                raise RenderError(self._start_error)
+            self._loop, self._thread = loop, thread
+            atexit.register(self.close)
+
+    async def _start(self):
+        self._playwright = await async_playwright().start()
+        try:
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        except Exception:
+            await self._playwright.stop()
+            raise
+        self._contexts = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self._browser.new_context(user_agent=self.user_agent)
+            await context.route("**/*", self._route)
+            self._contexts.put_nowait(context)
+
+    async def _route(self, route):
+        if route.request.resource_type in self.blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), loop).result(timeout=30)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+
+    async def _stop(self):
+        await self._browser.close()
+        await self._playwright.stop()
+
+    # --- Rendering ---
+    async def _render(self, url):
+        if self.scheduler is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.scheduler.wait_turn, url)
+        context = await self._contexts.get()
+        page = None
+        try:
+            page = await context.new_page()
+            response = await page.goto(url, wait_until="load", timeout=self.timeout * 1000)
+            if response is not None and response.status != 200:
+                raise RenderError(f"Rendered page returned {response.status}")
+            try:
+                await page.wait_for_load_state("networkidle", timeout=self.settle * 1000)
+            except PlaywrightTimeout:
+                pass  # long-polling / analytics beacons: take the DOM as it is
+            return await page.content()
+        finally:
+            if page is not None:
+                await page.close()
+            self._contexts.put_nowait(context)
+
+    def submit(self, url):
+        """Starts rendering `url`; returns a concurrent.futures.Future of the rendered HTML."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._render(url), self._loop)
+
+    def render(self, url):
+        """The page's DOM (HTML string) after scripts have run. Raises RenderError on failure."""
+        try:
+            html = self.submit(url).result()
+        except RenderError:
+            self._count("failed")
+            raise
+        except Exception as e:
+            self._count("failed")
+            raise RenderError(f"Render failed: {str(e).splitlines()[0]}") from e
+        self._count("rendered")
+        return html
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
@@ -0,0 +1,119 @@
+import csv
+import os
+
+# Left out of every exported report (internal / duplicated fields)
+REPORT_DROP_COLUMNS = ('secondary_keywords', 'Config_Secondary_Keywords', 'Missing_Alt_Files', 'notes', 'Your_Secondary_Keywords')
+
+# Analyzer result fields, in report order (see SEOAnalyzer.analyze_url)
+AUDIT_COLUMNS = (
+    'Status_Code', 'Fetch_Source', 'Retries', 'Analysis', 'Rendered',
+    'Title', 'Title_Length', 'Meta_Description', 'Meta_Desc_Length', 'Canonical_URL', 'Canonical_Type', 'Meta_Robots',
+    'H1', 'H1_Count', 'Word_Count', 'Internal_Links', 'Images', 'Missing_Alt_Count', 'Missing_Alt_Files',
+    'Schema_Types', 'Schema_Present', 'Entity_Schema_Present',
+    'Primary_Keyword', 'Primary_in_Title', 'Primary_in_H1', 'Primary_in_URL', 'Primary_in_Content',
+    'Primary_in_First_100', 'Primary_in_Meta_Desc',
+    'Secondary_Keywords', 'Secondary_in_H2', 'Secondary_in_H3', 'Secondary_in_Content_List',
+    'Issues_List', 'Has_Critical_Issues',
+    'DNS_ms', 'Connect_ms', 'TLS_ms', 'TTFB_ms', 'Download_ms', 'Fetch_ms', 'Render_ms', 'Parse_ms', 'Analyze_ms',
+    'Bytes_Transferred',
+)
+
+# Excel sheet names: max 31 chars, none of these
+_SHEET_NAME_BAD = str.maketrans({c: "_" for c in '[]:*?/\\'})
+
+
+def report_columns(items, client_column=False, drop=REPORT_DROP_COLUMNS):
+    """
+    Header for a report over these URL entries: their own fields (first-seen order), the
+    audit fields, then 'Client'. Fixed before the first row so rows can be streamed out.
+    """
+    columns = list(dict.fromkeys(key for item in items for key in item))
+    columns += [c for c in AUDIT_COLUMNS if c not in columns]
+    if client_column:
+        columns.append('Client')
+    return [c for c in columns if c not in drop]
+
+
+def _cell(value):
+    # None stays None: an empty CSV field, and no cell at all in the sheet
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(v) for v in value)
+    return value
+
+
+class ReportWriter:
+    """
+    Writes report rows to disk as they arrive, in constant memory: .csv line by line, .xlsx
+    with openpyxl's write-only workbook (one sheet per `sheet_by` value, e.g. per client,
+    plus a Summary sheet). Rows are dicts; keys outside `columns` are ignored.
+
+        with ReportWriter("audit.xlsx", report_columns(items), sheet_by="Client") as report:
+            for row in rows:
+                report.write(row)
+    """
+
+    def __init__(self, path, columns, sheet_by=None, sheet_name="Audit"):
+        self.path = path
+        self.columns = list(columns)
+        self.sheet_by = sheet_by
+        self.sheet_name = sheet_name
+        self.rows = 0
+        self._totals = {}  # sheet -> [urls, failed, with issues]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.xlsx = path.lower().endswith(".xlsx")
+        if self.xlsx:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+            self._illegal = ILLEGAL_CHARACTERS_RE
+            self._workbook = Workbook(write_only=True)
+            self._summary = self._workbook.create_sheet("Summary")
+            self._sheets = {}
+            self._sheet_names = {"summary"}
+        else:
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+
+    def write(self, row):
+        values = [_cell(row.get(c)) for c in self.columns]
+        group = str(row.get(self.sheet_by, "")) if self.sheet_by else self.sheet_name
+        totals = self._totals.setdefault(group, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += row.get('Status_Code') != 200
+        totals[2] += bool(row.get('Issues_List'))
+        self.rows += 1
+        if not self.xlsx:
+            self._csv.writerow(values)
+            return
+        sheet = self._sheets.get(group)
+        if sheet is None:
+            sheet = self._sheets[group] = self._workbook.create_sheet(self._unique_sheet_name(group))
+            sheet.append(self.columns)
+        sheet.append([self._illegal.sub("", v) if isinstance(v, str) else v for v in values])
+
+    def _unique_sheet_name(self, group):
+        base = (group.translate(_SHEET_NAME_BAD).strip("'") or self.sheet_name)[:31]
+        name, n = base, 2
+        while name.lower() in self._sheet_names:
+            suffix = f" ({n})"
+            name, n = base[:31 - len(suffix)] + suffix, n + 1
+        self._sheet_names.add(name.lower())
+        return name
+
+    def close(self):
+        if not self.xlsx:
+            self._file.close()
+            return
+        self._summary.append([self.sheet_by or "Report", "URLs", "Failed", "With Issues"])
+        for group, (urls, failed, with_issues) in self._totals.items():
+            self._summary.append([group, urls, failed, with_issues])
+        self._workbook.save(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from requests.structures import CaseInsensitiveDict
+
+CACHE_FILE = "http_cache.db"
+
+# Where a response came from (reported per URL as 'Fetch_Source')
+SOURCE_NETWORK = "network"
+SOURCE_REVALIDATED = "revalidated (304)"
+SOURCE_CACHE = "cache"
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL has never been cached"""
+
+
+def normalize_url(url):
+    """
+    Cache key for a URL: lowercase scheme/host, no default port, no fragment, sorted query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class CachedResponse:
+    """Minimal response object served from the cache (same fields analyze_url reads)"""
+
+    def __init__(self, url, status_code, headers, content, fetch_source):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.fetch_source = fetch_source
+        self.retries = 0
+
+    @property
+    def text(self):
+        encoding = "utf-8"
+        content_type = self.headers.get("Content-Type", "")
+        if "charset=" in content_type:
+            encoding = content_type.split("charset=")[-1].split(";")[0].strip() or encoding
+        try:
+            return self.content.decode(encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache (SQLite), keyed by normalized URL.
+    Bodies are stored zlib-compressed. Entries younger than `ttl` seconds are served
+    directly; older ones are revalidated with If-None-Match / If-Modified-Since.
+    Total body size is capped at `max_bytes` with least-recently-used eviction.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=3600, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"network": 0, "revalidated": 0, "cache": 0, "bytes_saved": 0}
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                body_size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        conn.commit()
+        self._total = conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+
+    def _conn(self):
+        # sqlite connections can't be shared across threads; the fetch engine uses many
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url):
+        """Returns the cached entry as a dict (or None) and marks it as recently used"""
+        key = normalize_url(url)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT status_code, headers, body, body_size, etag, last_modified, stored_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        status_code, headers, body, body_size, etag, last_modified, stored_at = row
+        return {
+            "status_code": status_code,
+            "headers": json.loads(headers),
+            "content": zlib.decompress(body),
+            "body_size": body_size,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def is_fresh(self, entry):
+        return (time.time() - entry["stored_at"]) < self.ttl
+
+    def put(self, url, status_code, headers, content):
+        headers = CaseInsensitiveDict(headers)
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return
+        body = zlib.compress(content, 6)
+        now = time.time()
+        conn = self._conn()
+        old = conn.execute("SELECT LENGTH(body) FROM responses WHERE key = ?", (normalize_url(url),)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                normalize_url(url), status_code, json.dumps(dict(headers)), body, len(content),
+                headers.get("ETag"),
+                headers.get("Last-Modified"),
+                now, now,
+            ),
+        )
+        conn.commit()
+        with self._lock:
+            self._total += len(body) - (old[0] if old else 0)
+            over_limit = self._total > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def refresh(self, url):
+        """Marks an entry as fresh again after the server answered 304 Not Modified"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, normalize_url(url)))
+        conn.commit()
+
+    def evict(self):
+        """Drops least-recently-used entries until the cache fits in max_bytes again"""
+        conn = self._conn()
+        with self._lock:
+            self._total = conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+            if self._total <= self.max_bytes:
+                return
+            target = self.max_bytes * 0.9  # leave some headroom so we don't evict on every put
+            rows = conn.execute("SELECT key, LENGTH(body) FROM responses ORDER BY last_access ASC")
+            doomed = []
+            for key, size in rows:
+                if self._total <= target:
+                    break
+                doomed.append((key,))
+                self._total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            conn.commit()
+
+    def record(self, source, bytes_saved=0):
+        with self._lock:
+            if source == SOURCE_CACHE:
+                self.stats["cache"] += 1
+            elif source == SOURCE_REVALIDATED:
+                self.stats["revalidated"] += 1
+            else:
+                self.stats["network"] += 1
+            self.stats["bytes_saved"] += bytes_saved
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"network": 0, "revalidated": 0, "cache": 0, "bytes_saved": 0}
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+        with self._lock:
+            self._total = 0
+
+    def size_on_disk(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
@@ -0,0 +1,206 @@
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from fingerprint import keyword_signature
+from page_features import FEATURE_GROUPS
+
+# Declarative on-page checks. Each rule reads finished report fields (see analyzer.score_page),
+# declares the page feature groups (page_features.FEATURE_GROUPS) those fields come from, and
+# has tunable thresholds. A profile picks the rules to run (and any feature groups the report
+# needs beyond them); the analyzer only extracts what the compiled RuleSet needs.
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    label: str
+    needs: frozenset
+    # check(results, params) -> issue text, or None when the page passes
+    check: object
+    params: dict = field(default_factory=dict)
+
+
+def _length_issue(value, label, missing, params):
+    if not value:
+        return missing
+    if len(value) < params['min_length']:
+        return f"{label} too short ({len(value)} chars)"
+    if len(value) > params['max_length']:
+        return f"{label} too long ({len(value)} chars)"
+    return None
+
+
+def _check_title(r, params):
+    return _length_issue(r['Title'], "Title", "Missing Page Title", params)
+
+
+def _check_meta_description(r, params):
+    return _length_issue(r['Meta_Description'], "Meta Description", "Missing Meta Description", params)
+
+
+def _check_canonical(r, params):
+    if not r['Canonical_URL']:
+        return "Missing Canonical URL"
+    if r['Canonical_Type'] == "Canonicalized":
+        return f"Page is canonicalized to: {r['Canonical_URL']}"
+    return None
+
+
+def _check_h1(r, params):
+    if not r['H1']:
+        return "Missing H1 Tag"
+    if r['H1_Count'] > params['max_count']:
+        return f"Multiple H1 Tags found ({r['H1_Count']})"
+    return None
+
+
+def _check_thin_content(r, params):
+    if r['Word_Count'] < params['min_words']:
+        return f"Thin Content (Only {r['Word_Count']} words)"
+    return None
+
+
+def _check_image_alt(r, params):
+    if r['Missing_Alt_Count'] > 0:
+        return f"Missing Alt Text on {r['Missing_Alt_Count']} images"
+    return None
+
+
+def _check_schema(r, params):
+    return "No Schema Markup detected" if r['Schema_Present'] == "No" else None
+
+
+# Keyword checks: "N/A" (no primary keyword, or the region wasn't extracted) is never an issue
+def _check_primary_in_title(r, params):
+    return "Primary Keyword missing from Title" if r['Primary_in_Title'] == "No" else None
+
+
+def _check_primary_in_h1(r, params):
+    return "Primary Keyword missing from H1" if r['Primary_in_H1'] == "No" else None
+
+
+def _check_primary_in_first_100(r, params):
+    return "Primary Keyword missing from First 100 Words" if r['Primary_in_First_100'] == "No" else None
+
+
+def _check_primary_in_meta_desc(r, params):
+    return "Primary Keyword missing from Meta Description" if r['Primary_in_Meta_Desc'] == "No" else None
+
+
+HEAD = frozenset({'head'})
+
+# Every check, in the order issues are reported
+RULES = {
+    rule.name: rule for rule in (
+        Rule('title', "Title length", HEAD, _check_title, {'min_length': 30, 'max_length': 60}),
+        Rule('meta_description', "Meta description length", HEAD, _check_meta_description,
+             {'min_length': 50, 'max_length': 160}),
+        Rule('canonical', "Canonical URL", HEAD, _check_canonical),
+        Rule('h1', "Single H1", frozenset({'headings'}), _check_h1, {'max_count': 1}),
+        Rule('thin_content', "Thin content", frozenset({'text'}), _check_thin_content, {'min_words': 300}),
+        Rule('image_alt', "Image alt text", frozenset({'images'}), _check_image_alt),
+        Rule('schema', "Schema markup", frozenset({'schema'}), _check_schema),
+        Rule('primary_in_title', "Primary keyword in title", HEAD, _check_primary_in_title),
+        Rule('primary_in_h1', "Primary keyword in H1", frozenset({'headings'}), _check_primary_in_h1),
+        Rule('primary_in_first_100', "Primary keyword in first 100 words", frozenset({'text'}),
+             _check_primary_in_first_100),
+        Rule('primary_in_meta_desc', "Primary keyword in meta description", HEAD, _check_primary_in_meta_desc),
+    )
+}
+
+# Built-in profiles: the rules they run, plus feature groups collected for the report alone
+PROFILES = {
+    'full': {'rules': tuple(RULES), 'collect': FEATURE_GROUPS},
+    'technical': {'rules': ('title', 'meta_description', 'canonical', 'h1', 'thin_content', 'image_alt', 'schema'),
+                  'collect': FEATURE_GROUPS},
+    # Head tags only: no body text, headings or schema are extracted at all
+    'meta-only': {'rules': ('title', 'meta_description', 'canonical', 'primary_in_title', 'primary_in_meta_desc'),
+                  'collect': ()},
+}
+DEFAULT_PROFILE = 'full'
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    A compiled profile: the active rules with their final thresholds, and the feature
+    groups the page has to be extracted with. Build with rule_set(); instances are cached
+    and shared, and picklable for analysis worker processes.
+    """
+    name: str
+    checks: tuple  # ((Rule, params), ...) in report order
+    needs: frozenset
+    signature: str
+
+    def issues(self, results):
+        issues = []
+        for rule, params in self.checks:
+            issue = rule.check(results, params)
+            if issue:
+                issues.append(issue)
+        return issues
+
+    def requiring(self, groups):
+        """The same checks, extracting `groups` as well (e.g. for render detection)."""
+        groups = frozenset(groups)
+        if groups <= self.needs:
+            return self
+        return _compile(self.name, self.checks, self.needs | groups)
+
+    @property
+    def rule_names(self):
+        return [rule.name for rule, _ in self.checks]
+
+
+def rule_set(profile=None):
+    """
+    Compiles (once) and returns the RuleSet for a profile:
+    None / a built-in profile name, or a dict customizing one (JSON, as stored per client):
+
+        {"profile": "full",                          # base profile (default: full)
+         "disable": ["thin_content"],                # rules to drop
+         "enable": ["h1"],                           # rules to add
+         "params": {"title": {"max_length": 70}}}    # threshold overrides
+
+    Raises ValueError for unknown profiles, rules or parameters.
+    """
+    if profile is None or isinstance(profile, str):
+        profile = {'profile': profile or DEFAULT_PROFILE}
+    return _rule_set(json.dumps(profile, sort_keys=True))
+
+
+@lru_cache(maxsize=256)
+def _rule_set(spec):
+    spec = json.loads(spec)
+    unknown_keys = set(spec) - {'profile', 'disable', 'enable', 'params'}
+    if unknown_keys:
+        raise ValueError(f"Unknown profile setting(s): {', '.join(sorted(unknown_keys))}")
+    base = spec.get('profile') or DEFAULT_PROFILE
+    if base not in PROFILES:
+        raise ValueError(f"Unknown rule profile: {base} (choose from {', '.join(PROFILES)})")
+    overrides = spec.get('params') or {}
+    for name in [*(spec.get('disable') or ()), *(spec.get('enable') or ()), *overrides]:
+        if name not in RULES:
+            raise ValueError(f"Unknown rule: {name} (choose from {', '.join(RULES)})")
+    for name, values in overrides.items():
+        unknown = set(values) - set(RULES[name].params)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s) for rule {name}: {', '.join(sorted(unknown))}")
+
+    active = (set(PROFILES[base]['rules']) | set(spec.get('enable') or ())) - set(spec.get('disable') or ())
+    checks = tuple(
+        (rule, {**rule.params, **overrides.get(name, {})}) for name, rule in RULES.items() if name in active
+    )
+    needs = frozenset(PROFILES[base]['collect']).union(*(rule.needs for rule, _ in checks))
+    customized = any(spec.get(k) for k in ('disable', 'enable', 'params'))
+    return _compile(f"{base} (custom)" if customized else base, checks, needs)
+
+
+def _compile(name, checks, needs):
+    needs = frozenset(needs) | HEAD
+    signature = keyword_signature(name, [[rule.name, params] for rule, params in checks], *sorted(needs))
+    return RuleSet(name, checks, needs, signature)
+
+
+DEFAULT_RULES = rule_set()
@@ -0,0 +1,420 @@
+"""
+End-to-end scale test of the global audit, without touching any real site: starts a local
+synthetic site (SyntheticSite: thousands of generated pages with configurable size, latency,
+error rate, 429 throttling, redirects and JSON-LD density), imports N URLs into a fresh
+DataManager database and drives the real audit flow over them (run_audit with SEOAnalyzer,
+response cache, feature store and history store, exactly as audit_cli.py does). For every
+scale it reports throughput, per-URL latency percentiles, peak memory and storage I/O, and
+where throughput stops keeping up.
+
+    python scale_harness.py                                   # 100, 1k, 10k and 50k URLs
+    python scale_harness.py --scale 1000 --latency 50 --error-rate 0.02 --throttle-rate 0.01
+    python scale_harness.py --scale 10000 --executor process --json scale.json
+    python scale_harness.py --scale 1000 --baseline scale.json    # flag regressions
+
+Each scale runs in a fresh process (so its peak memory is its own) against the same site
+process. All data lives in a temporary directory that is removed afterwards (--keep to look at it).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SCALES = (100, 1000, 10000, 50000)
+# Throughput below this share of the smallest scale's counts as "stopped scaling"
+SCALING_THRESHOLD = 0.75
+
+KEYWORDS = ("seo audit", "site speed", "keyword research", "link building", "meta tags", "schema markup")
+WORDS = (
+    "search", "engine", "ranking", "content", "page", "crawl", "index", "visitor", "traffic", "report",
+    "audit", "speed", "mobile", "title", "heading", "image", "link", "schema", "markup", "keyword",
+    "research", "building", "meta", "tags", "site", "structure", "quality", "signal", "user", "intent",
+)
+# Distinct page bodies; pages share them (their head, H1 and JSON-LD are still per URL)
+TEMPLATES = 32
+
+
+def _roll(n, salt):
+    """Deterministic 0 <= x < 1 for page n: the same URL always behaves the same way"""
+    return zlib.crc32(f"{salt}:{n}".encode()) / 2 ** 32
+
+
+# --- Synthetic site ---
+class SyntheticSite:
+    """
+    Generated pages at /p/<n> on `hosts` local ports (one HTTP/1.1 keep-alive server each, so
+    per-host pacing and connection pools behave as they do against separate sites).
+
+    page_kb: approximate HTML size per page
+    latency_ms: mean server think time before answering (exponentially distributed: long tail)
+    error_rate: share of URLs that always answer 500 (retried, then reported as failed)
+    throttle_rate: share of requests answered 429 with Retry-After: retry_after
+    redirect_rate: share of URLs that 301 to their final address first
+    jsonld: JSON-LD blocks per page
+    """
+
+    def __init__(self, hosts=4, page_kb=30, latency_ms=20, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 redirect_rate=0.0, jsonld=2):
+        self.hosts = hosts
+        self.page_kb = page_kb
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.redirect_rate = redirect_rate
+        self.jsonld = jsonld
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "redirects": 0}
+        self._servers = []
+        self._lock = threading.Lock()
+        self._bodies = [self._body(i) for i in range(TEMPLATES)]
+
+    def _body(self, seed):
+        rng = random.Random(seed)
+        parts, size = [], 0
+        while size < self.page_kb * 1024:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+            if rng.random() < 0.2:
+                part = f"<h2>{sentence[:40].title()}</h2>"
+            elif rng.random() < 0.1:
+                part = f'<p><img src="/img/{rng.randint(1, 500)}.png" alt="{sentence[:30]}"> <a href="/p/{rng.randint(0, 99999)}">{sentence[:25]}</a></p>'
+            else:
+                part = f"<p>{sentence.capitalize()}.</p>"
+            parts.append(part)
+            size += len(part)
+        return "\n".join(parts)
+
+    def page(self, n, url):
+        """HTML for page n (served at url)"""
+        keyword = KEYWORDS[n % len(KEYWORDS)]
+        jsonld = "".join(
+            f'<script type="application/ld+json">{json.dumps({"@context": "https://schema.org", "@type": kind, "name": f"{keyword} {n}", "url": url})}</script>'
+            for kind in (("Article", "Organization", "BreadcrumbList", "WebPage", "FAQPage") * self.jsonld)[:self.jsonld]
+        )
+        return (
+            f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+            f"<title>{keyword.title()} guide {n}</title>"
+            f'<meta name="description" content="Everything about {keyword}: page {n} of the synthetic site.">'
+            f'<link rel="canonical" href="{url}">{jsonld}</head>'
+            f"<body><h1>{keyword.title()} for page {n}</h1>"
+            f"<p>This page covers {keyword} in depth.</p>\n{self._bodies[n % TEMPLATES]}</body></html>"
+        )
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                site._count("requests")
+                if self.path == "/robots.txt":
+                    return self._send(200, b"User-agent: *\nAllow: /\n", [("Content-Type", "text/plain")])
+                parts = self.path.strip("/").split("/")
+                if len(parts) < 2 or parts[0] != "p" or not parts[1].isdigit():
+                    return self._send(404, b"Not found", [("Content-Type", "text/plain")])
+                n = int(parts[1])
+
+                if site.latency_ms:
+                    time.sleep(random.expovariate(1000 / site.latency_ms))
+                if site.throttle_rate and random.random() < site.throttle_rate:
+                    site._count("throttled")
+                    return self._send(429, b"Slow down", [("Retry-After", str(site.retry_after))])
+                if _roll(n, "error") < site.error_rate:
+                    site._count("errors")
+                    return self._send(500, b"Internal error", [("Content-Type", "text/plain")])
+                if len(parts) == 2 and _roll(n, "redirect") < site.redirect_rate:
+                    site._count("redirects")
+                    return self._send(301, headers=[("Location", f"/p/{n}/moved")])
+                url = f"http://{self.headers.get('Host')}{self.path}"
+                self._send(200, site.page(n, url).encode(), [("Content-Type", "text/html; charset=utf-8")])
+
+        return Handler
+
+    def start(self):
+        """Starts the servers (daemon threads); returns their base URLs."""
+        handler = self._handler()
+        for _ in range(self.hosts):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            server.request_queue_size = 1024
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        return [f"http://127.0.0.1:{server.server_address[1]}" for server in self._servers]
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+
+def _serve(config, ready, stop):
+    """Site process: starts a SyntheticSite, reports its base URLs, serves until told to stop."""
+    site = SyntheticSite(**config)
+    ready.put(site.start())
+    stop.wait()
+    site.stop()
+    ready.put(site.stats)
+
+
+# --- One scale ---
+def synthetic_rows(bases, count, urls_per_client=100):
+    """(client_name, url_data) rows for DataManager.import_rows(): `count` URLs spread over the hosts"""
+    for n in range(count):
+        keyword = KEYWORDS[n % len(KEYWORDS)]
+        yield f"Client {n // urls_per_client + 1:05d}", {
+            "url": f"{bases[n % len(bases)]}/p/{n}",
+            "primary_keyword": keyword,
+            "secondary_keywords": [WORDS[n % len(WORDS)], WORDS[(n * 7) % len(WORDS)], "content"],
+        }
+
+
+def _proc_io():
+    """Bytes this process read from / wrote to storage (Linux only; None elsewhere)"""
+    try:
+        with open("/proc/self/io") as f:
+            stats = dict(line.split(": ") for line in f.read().splitlines())
+        return int(stats["read_bytes"]), int(stats["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def run_scale(bases, count, workdir, concurrency=32, per_host=4, executor="thread", workers=None, rate=200.0,
+              max_retries=2, urls_per_client=100, time_budget=None):
+    """
+    Audits `count` synthetic URLs with the real pipeline, storing everything under workdir.
+    Returns the scale's measurements (JSON-serializable).
+    """
+    from analyzer import SEOAnalyzer
+    from audit_runner import OUTCOMES, collect_tasks, outcome, run_audit
+    from data_manager import DataManager
+    from history_store import HistoryStore
+    from metrics import RunMetrics
+    from politeness import PoliteScheduler
+
+    io_before = _proc_io()
+    started = time.monotonic()
+    dm = DataManager(db_path=os.path.join(workdir, "clients_data.db"), json_path=os.path.join(workdir, "clients_data.json"))
+    dm.import_rows(synthetic_rows(bases, count, urls_per_client))
+    imported = time.monotonic()
+    tasks = collect_tasks(dm.load_data())
+    loaded = time.monotonic()
+
+    scheduler = PoliteScheduler(rate=rate, burst=max(8, per_host), max_rate=rate, max_retries=max_retries, backoff_base=0.1)
+    analyzer = SEOAnalyzer(cache_path=os.path.join(workdir, "http_cache.db"), scheduler=scheduler,
+                           features_path=os.path.join(workdir, "page_features.db"))
+    history = HistoryStore(os.path.join(workdir, "audit_history.db"))
+    metrics = RunMetrics()
+    counts = dict.fromkeys(OUTCOMES, 0)
+    for idx, audit_res in run_audit(dm, analyzer, tasks, concurrency=concurrency, per_host=per_host, executor=executor,
+                                    workers=workers, time_budget=time_budget, history=history, metrics=metrics):
+        counts[outcome(audit_res)] += 1
+    finished = time.monotonic()
+
+    io_after = _proc_io()
+    summary = metrics.summary()
+    slowest = metrics.slowest_phase()
+    return {
+        "urls": count,
+        "audited": metrics.pages,
+        "outcomes": counts,
+        "import_s": round(imported - started, 3),
+        "load_s": round(loaded - imported, 3),
+        "audit_s": round(finished - loaded, 3),
+        "pages_per_sec": summary["pages_per_sec"],
+        "url_ms": summary["url_ms"],
+        "slowest_phase": slowest and slowest["phase"],
+        "retries": scheduler.stats["retries"],
+        "throttled": scheduler.stats["throttled"],
+        # ru_maxrss is KB on Linux, bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1048576), 1)
+        if resource else None,
+        "disk_read_mb": round((io_after[0] - io_before[0]) / 1048576, 2) if io_before and io_after else None,
+        "disk_write_mb": round((io_after[1] - io_before[1]) / 1048576, 2) if io_before and io_after else None,
+        "storage_mb": round(_dir_bytes(workdir) / 1048576, 2),
+    }
+
+
+# --- Report ---
+def print_results(results):
+    print(f"\n{'URLs':>7} {'audited':>8} {'failed':>7} {'pages/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'peak MB':>8} {'disk MB':>8} {'db MB':>7} {'import s':>9} {'slowest':>9}")
+    for r in results:
+        print(f"{r['urls']:>7} {r['audited']:>8} {r['outcomes']['failed']:>7} {r['pages_per_sec']:>8} "
+              f"{r['url_ms']['p50']!s:>8} {r['url_ms']['p95']!s:>8} {r['url_ms']['p99']!s:>8} {r['peak_rss_mb']!s:>8} "
+              f"{r['disk_write_mb']!s:>8} {r['storage_mb']:>7} {r['import_s']:>9} {r['slowest_phase']!s:>9}")
+
+
+def scaling_limit(results, threshold=SCALING_THRESHOLD):
+    """The first result whose throughput fell below threshold x the smallest scale's (None if none did)"""
+    if not results or not results[0]["pages_per_sec"]:
+        return None
+    reference = results[0]["pages_per_sec"]
+    return next((r for r in results[1:] if r["pages_per_sec"] < reference * threshold), None)
+
+
+def compare(results, baseline, tolerance):
+    """Prints each scale against the same scale in a baseline run; returns the regressions."""
+    previous = {r["urls"]: r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        base = previous.get(r["urls"])
+        if base is None:
+            continue
+        for label, current, before, higher_is_better in (
+            ("pages/s", r["pages_per_sec"], base["pages_per_sec"], True),
+            ("p95 ms", r["url_ms"]["p95"], base["url_ms"]["p95"], False),
+            ("peak MB", r["peak_rss_mb"], base["peak_rss_mb"], False),
+        ):
+            if not current or not before:
+                continue
+            change = (before - current) / before if higher_is_better else (current - before) / before
+            worse = change > tolerance
+            print(f"{'❌' if worse else '✅'} {r['urls']} URLs {label}: {current} "
+                  f"(baseline {before}, {abs(change):.0%} {'worse' if change > 0 else 'better'})")
+            if worse:
+                regressions.append(f"{r['urls']} URLs {label}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scale-test the global audit against a local synthetic site.")
+    parser.add_argument("--scale", type=int, action="append", dest="scales", metavar="URLS",
+                        help=f"URLs to audit (repeatable; default: {', '.join(map(str, DEFAULT_SCALES))})")
+    site = parser.add_argument_group("synthetic site")
+    site.add_argument("--hosts", type=int, default=4, help="Separate hosts (ports) the URLs are spread over (default: 4)")
+    site.add_argument("--page-kb", type=int, default=30, help="Approximate page size in KB (default: 30)")
+    site.add_argument("--latency", type=float, default=20, metavar="MS", help="Mean server latency (default: 20 ms)")
+    site.add_argument("--error-rate", type=float, default=0.0, help="Share of URLs answering 500 (default: 0)")
+    site.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429 (default: 0)")
+    site.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429s (default: 1)")
+    site.add_argument("--redirect-rate", type=float, default=0.0, help="Share of URLs that redirect first (default: 0)")
+    site.add_argument("--jsonld", type=int, default=2, help="JSON-LD blocks per page (default: 2)")
+    audit = parser.add_argument_group("audit")
+    audit.add_argument("-c", "--concurrency", type=int, default=32, help="URLs in flight at once (default: 32)")
+    audit.add_argument("--per-host", type=int, default=8, help="Max URLs in flight per host (default: 8)")
+    audit.add_argument("--executor", choices=("thread", "process"), default="thread")
+    audit.add_argument("--workers", type=int, help="Analysis processes for --executor process")
+    audit.add_argument("--rate", type=float, default=200.0, help="Requests/second per host (default: 200)")
+    audit.add_argument("--max-retries", type=int, default=2, help="Retries per URL (default: 2)")
+    audit.add_argument("--urls-per-client", type=int, default=100, help="URLs per synthetic client (default: 100)")
+    audit.add_argument("--time-budget", type=float, metavar="SECONDS", help="Per-scale time budget")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON (usable as a --baseline later)")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with a previous --json run; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed change before a regression (default: 0.25)")
+    parser.add_argument("--keep", action="store_true", help="Keep each scale's databases (path is printed)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scales = sorted(args.scales or DEFAULT_SCALES)
+    site_config = {
+        "hosts": args.hosts, "page_kb": args.page_kb, "latency_ms": args.latency, "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate, "retry_after": args.retry_after, "redirect_rate": args.redirect_rate,
+        "jsonld": args.jsonld,
+    }
+    audit_config = {
+        "concurrency": args.concurrency, "per_host": args.per_host, "executor": args.executor, "workers": args.workers,
+        "rate": args.rate, "max_retries": args.max_retries, "urls_per_client": args.urls_per_client,
+        "time_budget": args.time_budget,
+    }
+
+    # The site gets its own process so serving pages doesn't compete with the audit for the GIL
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Queue(), context.Event()
+    server = context.Process(target=_serve, args=(site_config, ready, stop), daemon=True)
+    server.start()
+    bases = ready.get(timeout=30)
+    print(f"Synthetic site on {', '.join(bases)}")
+
+    results = []
+    try:
+        for count in scales:
+            workdir = tempfile.mkdtemp(prefix=f"scale_{count}_")
+            print(f"Auditing {count} URLs...", flush=True)
+            try:
+                # A fresh process per scale: its peak memory is this scale's alone
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(run_scale, bases, count, workdir, **audit_config).result()
+            except KeyboardInterrupt:
+                print("Interrupted.", file=sys.stderr)
+                break
+            finally:
+                if args.keep:
+                    print(f"   data kept in {workdir}")
+                else:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            results.append(result)
+            print(f"   {result['pages_per_sec']} pages/s, p99 {result['url_ms']['p99']} ms, peak {result['peak_rss_mb']} MB")
+    finally:
+        stop.set()
+        try:
+            site_stats = ready.get(timeout=10)
+        except Exception:
+            site_stats = None
+        server.join(timeout=10)
+
+    print_results(results)
+    if site_stats:
+        print(f"\nSite served {site_stats['requests']} requests: {site_stats['errors']} errors, "
+              f"{site_stats['throttled']} throttled, {site_stats['redirects']} redirects")
+    limit = scaling_limit(results)
+    if limit:
+        print(f"Stops scaling at {limit['urls']} URLs: {limit['pages_per_sec']} pages/s, "
+              f"{limit['pages_per_sec'] / results[0]['pages_per_sec']:.0%} of the {results[0]['urls']}-URL rate")
+    elif len(results) > 1:
+        print(f"Throughput held up to {results[-1]['urls']} URLs")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"site": site_config, "audit": audit_config, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        if (baseline.get("site"), baseline.get("audit")) != (site_config, audit_config):
+            print("⚠️ The baseline was run with different site / audit options; differences may not be regressions")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
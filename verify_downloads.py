@@ -0,0 +1,112 @@
+"""
+Offline check of HttpClient's streamed downloads against a local server: compressed pages
+(with Content-Length and chunked) come back intact with their on-the-wire size reported in
+timings['wire_bytes'], and the size cap, the non-HTML check
+and the decompression-bomb check reject what they should.
+
+    python verify_downloads.py
+"""
+import gzip
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_client import MAX_BODY_BYTES, DownloadRejected, HttpClient
+
+
+def _page(size):
+    """HTML that compresses like a real page (~4x with gzip), about `size` bytes long."""
+    rng = random.Random(size)
+    words = [f"word{i}" for i in range(5000)]
+    paragraphs = []
+    length = 0
+    while length < size:
+        text = " ".join(rng.choice(words) for _ in range(60))
+        paragraphs.append(f"<p>{text}</p>")
+        length += len(text) + 7
+    return f"<!doctype html><html><head><title>Page</title></head><body>{''.join(paragraphs)}</body></html>".encode()
+
+
+PAGE = _page(2_300_000)
+# name -> (content type, body as sent, gzipped?, chunked?)
+RESPONSES = {
+    "gzip-length": ("text/html", gzip.compress(PAGE), True, False),
+    "gzip-chunked": ("text/html", gzip.compress(PAGE), True, True),
+    "plain-chunked": ("text/html", PAGE, False, True),
+    "bomb-chunked": ("text/html", gzip.compress(b"<html><body>" + b"\0" * (8 * 1024 * 1024)), True, True),
+    "too-large": ("text/html", b"<html><body>" + b"x" * (MAX_BODY_BYTES + 1024), False, True),
+    "pdf": ("application/pdf", b"%PDF-1.4", False, False),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        content_type, body, gzipped, chunked = RESPONSES[self.path.strip("/")]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if not chunked:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(body), 16384):
+            piece = body[i:i + 16384]
+            self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # rejected downloads are abandoned mid-body: the client resets the connection
+
+
+def test_downloads():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = HttpClient()
+    failures = 0
+
+    def check(name, ok, detail=""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}{f': {detail}' if detail else ''}")
+
+    try:
+        for name in ("gzip-length", "gzip-chunked", "plain-chunked"):
+            try:
+                response = client.get(f"{base}/{name}")
+            except (DownloadRejected, requests.RequestException) as e:
+                check(f"{name} accepted", False, repr(e))
+                continue
+            check(f"{name} accepted", response.content == PAGE, f"{len(response.content)} bytes")
+            sent = len(RESPONSES[name][1])
+            wire = response.timings['wire_bytes']
+            check(f"{name} wire bytes", wire == sent, f"{wire} counted, {sent} sent")
+
+        for name, reason in (("bomb-chunked", "inflates"), ("too-large", "too large"), ("pdf", "Not an HTML page")):
+            try:
+                client.get(f"{base}/{name}")
+                check(f"{name} rejected", False, "was downloaded")
+            except DownloadRejected as e:
+                check(f"{name} rejected", reason in str(e), str(e))
+    finally:
+        client.close()
+        server.shutdown()
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_downloads() else 1)
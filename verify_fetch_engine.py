@@ -0,0 +1,74 @@
+"""
+Offline check of AsyncFetchEngine's scheduling: input sorted by host (as collect_tasks
+produces it, one client's URLs after another's) must keep every global slot busy and
+finish about as fast as the same jobs shuffled, without exceeding the per-host limit.
+
+    python verify_fetch_engine.py
+"""
+import random
+import sys
+import threading
+import time
+
+from fetch_engine import AsyncFetchEngine
+
+HOSTS = 10
+JOBS_PER_HOST = 200
+JOB_SECONDS = 0.02
+CONCURRENCY = 16
+PER_HOST = 4
+
+
+def _run(order):
+    """(jobs finished, seconds, peak jobs in flight, peak jobs in flight on one host)"""
+    lock = threading.Lock()
+    in_flight = {"all": 0, "peak": 0, "host_peak": 0}
+    per_host = {}
+
+    def fetch(host):
+        with lock:
+            in_flight["all"] += 1
+            per_host[host] = per_host.get(host, 0) + 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["all"])
+            in_flight["host_peak"] = max(in_flight["host_peak"], per_host[host])
+        time.sleep(JOB_SECONDS)
+        with lock:
+            in_flight["all"] -= 1
+            per_host[host] -= 1
+
+    jobs = [(key, f"https://site{host}.example/page{key}", lambda host=host: fetch(host)) for key, host in order]
+    engine = AsyncFetchEngine(concurrency=CONCURRENCY, per_host=PER_HOST)
+    start = time.monotonic()
+    finished = sum(1 for _ in engine.run(jobs))
+    return finished, time.monotonic() - start, in_flight["peak"], in_flight["host_peak"]
+
+
+def test_fetch_engine():
+    host_sorted = [(host * JOBS_PER_HOST + i, host) for host in range(HOSTS) for i in range(JOBS_PER_HOST)]
+    shuffled = host_sorted[:]
+    random.Random(0).shuffle(shuffled)
+    ideal = len(host_sorted) * JOB_SECONDS / CONCURRENCY
+    failures = 0
+
+    def check(name, ok, detail=""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}{f': {detail}' if detail else ''}")
+
+    timings = {}
+    for name, order in (("host-sorted", host_sorted), ("shuffled", shuffled)):
+        finished, seconds, peak, host_peak = _run(order)
+        timings[name] = seconds
+        check(f"{name} finished", finished == len(order), f"{finished} of {len(order)} jobs")
+        check(f"{name} global concurrency", peak == CONCURRENCY, f"peak {peak} of {CONCURRENCY}")
+        check(f"{name} per-host limit", host_peak <= PER_HOST, f"peak {host_peak} of {PER_HOST}")
+        # Full concurrency the whole way through, give or take scheduling overhead
+        check(f"{name} time", seconds < ideal * 1.5, f"{seconds:.2f}s (ideal {ideal:.2f}s)")
+
+    ratio = timings["host-sorted"] / timings["shuffled"]
+    check("host-sorted as fast as shuffled", ratio < 1.25, f"{ratio:.2f}x")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_fetch_engine() else 1)
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+from analyzer import SEOAnalyzer
+from page_features import AUTO_ORDER, available_backends
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_corpus():
+    """Returns the fixture entries (page file, url and keywords) with their HTML loaded."""
+    with open(os.path.join(FIXTURES_DIR, "corpus.json")) as f:
+        corpus = json.load(f)
+    for entry in corpus:
+        with open(os.path.join(FIXTURES_DIR, entry["file"]), "rb") as f:
+            entry["content"] = f.read()
+    return corpus
+
+
+def test_fixtures(parser='auto'):
+    """
+    Offline regression check: every fixture page must produce exactly the results
+    recorded in fixtures/expected/ (captured from the original BeautifulSoup analyzer).
+    """
+    print(f"Checking analyzer output against the fixture corpus (parser: {parser})...")
+    analyzer = SEOAnalyzer(cache_path=None, parser=parser)
+    failures = 0
+
+    for entry in load_corpus():
+        res = analyzer.analyze_html(entry["url"], entry["content"], entry["primary_keyword"], entry["secondary_keywords"])
+        with open(os.path.join(FIXTURES_DIR, "expected", f"{entry['name']}.json")) as f:
+            expected = json.load(f)
+
+        diffs = sorted(k for k in set(res) | set(expected) if res.get(k) != expected.get(k))
+        if diffs:
+            failures += 1
+            print(f"❌ {entry['name']}: {len(diffs)} field(s) differ")
+            for k in diffs:
+                print(f"   {k}: expected {expected.get(k)!r}, got {res.get(k)!r}")
+        else:
+            print(f"✅ {entry['name']}")
+
+    return failures == 0
+
+
+def test_all_backends():
+    """Every backend 'auto' can pick must give identical results (selectolax is opt-in, see page_features)"""
+    ok = True
+    for parser in AUTO_ORDER:
+        if parser in available_backends():
+            ok = test_fixtures(parser) and ok
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_all_backends() else 1)
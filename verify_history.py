@@ -0,0 +1,82 @@
+"""
+Offline check of HistoryStore.diff(): issues whose text only differs by a page-specific
+number (title length, word count, images missing alt text) are the same issue, so they
+must not show up as gained + lost; real changes must. Stores written before issue_kind()
+learned about numbers are re-keyed when opened.
+
+    python verify_history.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+from history_store import HistoryStore
+from rules import DEFAULT_RULES
+
+# Enough of a result for every rule in the full profile
+PAGE = {
+    "Status_Code": 200, "Title": "T" * 50, "Title_Length": 50, "Meta_Description": "D" * 130, "Meta_Desc_Length": 130,
+    "Canonical_Type": "Self", "Canonical_URL": "https://acme.example/", "H1": "Heading", "H1_Count": 1,
+    "Word_Count": 900, "Images": 10, "Missing_Alt_Count": 0, "Schema_Present": "Yes", "Primary_in_Title": "Yes", "Primary_in_H1": "Yes",
+    "Primary_in_First_100": "Yes", "Primary_in_Meta_Desc": "Yes",
+}
+
+
+def _audit(history, pages):
+    """Records one run over {url: changed fields}; returns the run id."""
+    run_id = history.start_run()
+    for url, changes in pages.items():
+        result = {**PAGE, **changes}
+        result["Issues_List"] = DEFAULT_RULES.issues(result)
+        history.add(run_id, "Acme", url, result)
+    history.finish_run(run_id)
+    return run_id
+
+
+def test_history():
+    failures = 0
+
+    def check(name, ok, detail=""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}{f': {detail}' if detail else ''}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        history = HistoryStore(path)
+        _audit(history, {
+            "/alt": {"Missing_Alt_Count": 3},
+            "/title": {"Title": "Short", "Title_Length": 5},
+            "/thin": {"Word_Count": 120},
+            "/fixed": {"Missing_Alt_Count": 2},
+            "/broke": {},
+        })
+        _audit(history, {
+            "/alt": {"Missing_Alt_Count": 5},
+            "/title": {"Title": "Shorter", "Title_Length": 7},
+            "/thin": {"Word_Count": 80},
+            "/fixed": {},
+            "/broke": {"H1": "", "H1_Count": 0},
+        })
+        changes = {change["url"]: change for change in history.diff("Acme")}
+        for url in ("/alt", "/title", "/thin"):
+            check(f"{url} count change is not a diff", url not in changes, str(changes.get(url, "")))
+        fixed = changes.get("/fixed", {})
+        check("/fixed lost its alt text issue", fixed.get("lost") == ["Missing Alt Text on 2 images"], str(fixed))
+        broke = changes.get("/broke", {})
+        check("/broke gained a missing H1", broke.get("gained") == ["Missing H1 Tag"], str(broke))
+
+        # A store keyed the old way (numbers kept in the kind) is re-keyed on open
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("UPDATE issues SET issue = detail WHERE url = '/alt'")
+            conn.execute("PRAGMA user_version = 0")
+        conn.close()
+        changes = {change["url"]: change for change in HistoryStore(path).diff("Acme")}
+        check("old store re-keyed", "/alt" not in changes, str(changes.get("/alt", "")))
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_history() else 1)